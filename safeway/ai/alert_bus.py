@@ -0,0 +1,282 @@
+"""
+Bus d'événements d'alerte pour SafeWay
+
+La boucle de traitement publie les alertes sans jamais attendre: chaque
+sortie (son, voix, incrustation, fichier, socket locale...) est un
+consommateur avec sa propre file bornée, sa politique de débordement et ses
+compteurs. Un consommateur lent ou bloqué ne perd que ses propres événements.
+"""
+import json
+import socket
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+from core.logger import setup_logger
+
+logger = setup_logger("AlertBus")
+
+# Politiques de débordement d'une file pleine
+DROP_OLDEST = 'drop_oldest'  # L'événement le plus ancien est abandonné
+DROP_NEWEST = 'drop_newest'  # Le nouvel événement est refusé
+
+class AlertSink(ABC):
+    """
+    Consommateur d'alertes avec file bornée et thread dédié
+
+    Les sous-classes définissent handle() (CallbackSink pour une simple
+    fonction). Avec threaded=False, la file est vidée par poll() depuis le
+    thread qui possède la ressource (ex: l'incrustation, dessinée par la
+    boucle de rendu).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_queue: int = 16,
+        policy: str = DROP_OLDEST,
+        threaded: bool = True
+    ):
+        """
+        Initialise le consommateur
+
+        Args:
+            name: Nom du consommateur (statistiques, logs)
+            max_queue: Taille maximale de la file
+            policy: DROP_OLDEST ou DROP_NEWEST quand la file est pleine
+            threaded: Consommer la file dans un thread dédié
+        """
+        if policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Politique de débordement inconnue: {policy}")
+        self.name = name
+        self.max_queue = max_queue
+        self.policy = policy
+        self.threaded = threaded
+
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self._queue: deque = deque()
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Démarre le thread du consommateur"""
+        if not self.threaded or self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"AlertSink-{self.name}", daemon=True)
+        self._thread.start()
+
+    def offer(self, event: Dict) -> bool:
+        """
+        Dépose un événement sans bloquer
+
+        Args:
+            event: Événement d'alerte
+
+        Returns:
+            True si l'événement a été accepté
+        """
+        with self._condition:
+            self.received += 1
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return False
+                self._queue.popleft()
+            self._queue.append(event)
+            self._condition.notify()
+        return True
+
+    def _take_all(self, wait: bool) -> List[Dict]:
+        """Retire tous les événements en attente (en attendant s'il le faut)"""
+        with self._condition:
+            while wait and self._running and not self._queue:
+                self._condition.wait()
+            events = list(self._queue)
+            self._queue.clear()
+            return events
+
+    def _deliver(self, events: List[Dict]):
+        """Transmet un lot d'événements à handle()"""
+        for event in events:
+            try:
+                self.handle(event)
+                self.delivered += 1
+            except Exception as e:
+                self.failed += 1
+                if self.failed == 1:
+                    logger.error(f"Consommateur '{self.name}': {e}")
+        if events:
+            self.flush()
+
+    def _run(self):
+        """Boucle du thread du consommateur"""
+        while self._running:
+            self._deliver(self._take_all(wait=True))
+        # Dernier lot déposé avant l'arrêt
+        self._deliver(self._take_all(wait=False))
+
+    def poll(self):
+        """Traite les événements en attente dans le thread appelant"""
+        self._deliver(self._take_all(wait=False))
+
+    @abstractmethod
+    def handle(self, event: Dict):
+        """Traite un événement"""
+
+    def flush(self):
+        """Appelé après chaque lot d'événements traités"""
+
+    def stop(self):
+        """Arrête le thread après avoir traité les événements en attente"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.close()
+
+    def close(self):
+        """Libère les ressources du consommateur"""
+
+    def stats(self) -> Dict[str, int]:
+        """Compteurs du consommateur"""
+        return {
+            'received': self.received,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'pending': len(self._queue)
+        }
+
+class CallbackSink(AlertSink):
+    """
+    Consommateur qui transmet chaque événement à une fonction
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Dict], None],
+        max_queue: int = 16,
+        policy: str = DROP_OLDEST,
+        threaded: bool = True
+    ):
+        """
+        Args:
+            name: Nom du consommateur (statistiques, logs)
+            handler: Fonction appelée pour chaque événement
+            max_queue: Taille maximale de la file
+            policy: DROP_OLDEST ou DROP_NEWEST quand la file est pleine
+            threaded: Consommer la file dans un thread dédié
+        """
+        super().__init__(name, max_queue, policy, threaded)
+        self.handler = handler
+
+    def handle(self, event: Dict):
+        self.handler(event)
+
+class FileSink(AlertSink):
+    """
+    Enregistre les alertes en JSON (une ligne par alerte) pour la télématique
+    """
+
+    def __init__(self, path: Union[str, Path], max_queue: int = 256):
+        """
+        Args:
+            path: Fichier de destination (ouvert en ajout)
+            max_queue: Taille maximale de la file
+        """
+        super().__init__("file", max_queue=max_queue, policy=DROP_OLDEST)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def handle(self, event: Dict):
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class UnixSocketSink(AlertSink):
+    """
+    Envoie les alertes en datagrammes JSON sur une socket Unix locale
+
+    Les envois ne bloquent pas: sans processus à l'écoute, l'événement est
+    compté en échec et abandonné.
+    """
+
+    def __init__(self, socket_path: Union[str, Path], max_queue: int = 64):
+        """
+        Args:
+            socket_path: Chemin de la socket du processus destinataire
+            max_queue: Taille maximale de la file
+        """
+        super().__init__("ipc", max_queue=max_queue, policy=DROP_OLDEST)
+        self.socket_path = str(socket_path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def handle(self, event: Dict):
+        self._socket.sendto(json.dumps(event, ensure_ascii=False).encode("utf-8"), self.socket_path)
+
+    def close(self):
+        self._socket.close()
+
+class AlertBus:
+    """
+    Diffuse chaque alerte publiée à tous les consommateurs enregistrés
+    """
+
+    def __init__(self):
+        """Initialise le bus"""
+        self.sinks: List[AlertSink] = []
+
+    def add_sink(self, sink: AlertSink) -> AlertSink:
+        """
+        Enregistre et démarre un consommateur
+
+        Args:
+            sink: Consommateur à ajouter
+
+        Returns:
+            Le consommateur ajouté
+        """
+        self.sinks.append(sink)
+        sink.start()
+        logger.info(f"Consommateur d'alertes '{sink.name}' ajouté")
+        return sink
+
+    def publish(self, event: Dict):
+        """
+        Publie un événement (ne bloque jamais)
+
+        Args:
+            event: Événement d'alerte
+        """
+        for sink in self.sinks:
+            sink.offer(event)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Compteurs de chaque consommateur"""
+        return {sink.name: sink.stats() for sink in self.sinks}
+
+    def close(self):
+        """Arrête tous les consommateurs"""
+        for sink in self.sinks:
+            sink.stop()
+        for name, stats in self.stats().items():
+            if stats['dropped'] or stats['failed']:
+                logger.warning(f"Consommateur '{name}': {stats['dropped']} alertes abandonnées, "
+                               f"{stats['failed']} échecs")
+        self.sinks = []
@@ -2,16 +2,27 @@
 Module de gestion des alertes pour SafeWay
 """
 import cv2
-import pygame
-import time
+import socket
 import numpy as np
-import threading
-import subprocess
-import platform
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 from pathlib import Path
-from config.settings import ALERT_SOUND_ENABLED, ALERT_VISUAL_ENABLED, ALERT_VOICE_ENABLED
+from config.settings import (
+    ALERT_SOUND_ENABLED,
+    ALERT_VISUAL_ENABLED,
+    ALERT_VOICE_ENABLED,
+    ALERT_SOUND_CHANNELS,
+    ALERT_EVENTS_FILE,
+    ALERT_IPC_SOCKET
+)
+from ai.alert_bus import AlertBus, AlertSink, CallbackSink, FileSink, UnixSocketSink
+from ai.speech import SpeechWorker
 from core.logger import setup_logger
+from core.overlay import OverlayCompositor
+from core.sprites import Sprite, SpriteCache
+from core.utils import get_monotonic_timestamp
+
+if TYPE_CHECKING:
+    import pygame
 
 logger = setup_logger("AlertManager")
 
@@ -26,45 +37,113 @@ ALERT_MESSAGES = {
     'excessive_movement': "Mouvements excessifs détectés, restez concentré"
 }
 
+# Bips d'alerte par sévérité: (fréquence Hz, durée ms)
+ALERT_TONES = {
+    'high': (800, 500),
+    'medium': (600, 300),
+    'low': (400, 200)
+}
+SAMPLE_RATE = 22050
+
 class AlertManager:
     """
     Gère les alertes visuelles, sonores et vocales
+    
+    Les alertes sont publiées sur un bus: chaque sortie les consomme depuis
+    sa propre file, sans jamais bloquer la boucle de traitement.
     """
     
-    def __init__(self):
-        """Initialise le gestionnaire d'alertes"""
+    def __init__(self, clock: Callable[[], float] = get_monotonic_timestamp):
+        """
+        Initialise le gestionnaire d'alertes
+        
+        Args:
+            clock: Horloge (secondes) utilisée quand aucun timestamp de frame n'est fourni
+        """
+        self.clock = clock
         self.sound_enabled = ALERT_SOUND_ENABLED
         self.visual_enabled = ALERT_VISUAL_ENABLED
         self.voice_enabled = ALERT_VOICE_ENABLED
         
-        # Initialiser pygame pour les sons
+        # Initialiser pygame pour les sons (bips pré-générés, canaux réservés)
+        self.tones: Dict[str, "pygame.mixer.Sound"] = {}
+        self.sound_channels: List["pygame.mixer.Channel"] = []
+        self.voice_channel: Optional["pygame.mixer.Channel"] = None
+        self.next_channel = 0
         if self.sound_enabled:
             try:
-                pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+                # Import différé: pygame n'est chargé que si le son est activé
+                import pygame
+                pygame.mixer.init(frequency=SAMPLE_RATE, size=-16, channels=2, buffer=512)
+                self._init_sounds()
                 logger.info("Pygame mixer initialisé")
             except Exception as e:
                 logger.warning(f"Impossible d'initialiser pygame mixer: {e}")
                 self.sound_enabled = False
         
-        # Initialiser TTS (Text-to-Speech)
+        # Initialiser TTS (Text-to-Speech): thread unique, messages fixes pré-rendus
+        self.speech: Optional[SpeechWorker] = None
         self.tts_enabled = False
-        self.tts_lock = threading.Lock()
         if self.voice_enabled:
-            self._init_tts()
+            self.speech = SpeechWorker(list(ALERT_MESSAGES.values()), self.voice_channel)
+            self.tts_enabled = self.speech.enabled
         
         # Dernière alerte pour éviter les répétitions
         self.last_alert_time: Dict[str, float] = {}
         self.alert_cooldown = 3.0  # Secondes entre deux alertes du même type
         self.last_spoken_message = None
-        self.last_speech_time = 0.0
+        self.last_speech_time: Optional[float] = None
+        
+        # Bandeaux d'alerte pré-rendus (par message, sévérité et résolution)
+        self.sprites = SpriteCache()
+        
+        # Bus d'alertes et ses consommateurs
+        self.bus = AlertBus()
+        if self.sound_enabled:
+            self.bus.add_sink(CallbackSink("sound", lambda event: self._play_sound(event['severity']), max_queue=4))
+        if self.tts_enabled:
+            self.bus.add_sink(CallbackSink("voice", self._speak_event, max_queue=4))
+        # Incrustation: file vidée par la boucle de rendu, seule à dessiner dans la frame
+        self.visual_sink: Optional[AlertSink] = None
+        self._visual_target: Optional[Tuple] = None
+        if self.visual_enabled:
+            self.visual_sink = self.bus.add_sink(
+                CallbackSink("overlay", self._render_event, max_queue=8, threaded=False)
+            )
+        if ALERT_EVENTS_FILE is not None:
+            self.bus.add_sink(FileSink(ALERT_EVENTS_FILE))
+        if ALERT_IPC_SOCKET is not None and hasattr(socket, 'AF_UNIX'):
+            self.bus.add_sink(UnixSocketSink(ALERT_IPC_SOCKET))
     
-    def trigger_alert(self, alert: Dict, frame: Optional[cv2.typing.MatLike] = None) -> Optional[cv2.typing.MatLike]:
+    def add_sink(self, sink: AlertSink) -> AlertSink:
+        """
+        Ajoute une sortie d'alertes (ex: message CAN, télématique)
+        
+        Args:
+            sink: Consommateur à brancher sur le bus
+            
+        Returns:
+            Le consommateur ajouté
+        """
+        return self.bus.add_sink(sink)
+    
+    def trigger_alert(
+        self,
+        alert: Dict,
+        frame: Optional[cv2.typing.MatLike] = None,
+        overlay: Optional[OverlayCompositor] = None,
+        timestamp: Optional[float] = None
+    ) -> Optional[cv2.typing.MatLike]:
         """
         Déclenche une alerte
         
         Args:
             alert: Dictionnaire avec les informations de l'alerte
             frame: Image sur laquelle dessiner l'alerte (optionnel)
+            overlay: Compositeur de la frame; si fourni, l'alerte y est ajoutée
+                au lieu d'être dessinée directement sur frame
+            timestamp: Instant de capture de la frame en secondes (défaut: horloge);
+                le cooldown et le clignotement suivent le temps de la vidéo
             
         Returns:
             Image avec alerte dessinée (si frame fourni)
@@ -76,7 +155,7 @@ class AlertManager:
         message = ALERT_MESSAGES.get(alert_type, alert.get('message', 'Alerte de sécurité'))
         
         # Vérifier le cooldown
-        current_time = time.time()
+        current_time = self.clock() if timestamp is None else timestamp
         if alert_type in self.last_alert_time:
             if current_time - self.last_alert_time[alert_type] < self.alert_cooldown:
                 return frame
@@ -85,151 +164,138 @@ class AlertManager:
         
         logger.warning(f"ALERTE: {message} (Type: {alert_type}, Sévérité: {severity})")
         
-        # Alerte sonore
-        if self.sound_enabled:
-            self._play_sound(severity)
-        
-        # Alerte visuelle
-        if self.visual_enabled and frame is not None:
-            frame = self._draw_visual_alert(frame, message, severity)
+        # Publication non bloquante: son, voix, fichier et IPC consomment dans leurs threads
+        self.bus.publish({
+            'type': alert_type,
+            'severity': severity,
+            'message': message,
+            'timestamp': current_time
+        })
         
-        # Alerte vocale (TTS)
-        if self.voice_enabled and self.tts_enabled:
-            # Éviter de répéter le même message trop souvent
-            if message != self.last_spoken_message or (current_time - self.last_speech_time) > 5.0:
-                self._speak_message(message)
-                self.last_spoken_message = message
-                self.last_speech_time = current_time
+        # Alerte visuelle: la frame courante vide la file d'incrustation
+        if self.visual_sink is not None and frame is not None:
+            self._visual_target = (overlay if overlay is not None else frame, frame.shape, current_time)
+            self.visual_sink.poll()
+            self._visual_target = None
         
         return frame
     
-    def _play_sound(self, severity: str):
+    def _render_event(self, event: Dict):
         """
-        Joue un son d'alerte
+        Consommateur d'incrustation: dessine l'alerte sur la cible de la frame courante
         
         Args:
-            severity: Niveau de sévérité (low, medium, high)
+            event: Événement d'alerte
         """
-        try:
-            if severity == 'high':
-                frequency = 800
-                duration = 500  # ms
-            elif severity == 'medium':
-                frequency = 600
-                duration = 300
-            else:
-                frequency = 400
-                duration = 200
-            
-            # Générer un bip avec pygame (utiliser numpy array correctement)
-            sample_rate = 22050
-            frames = int(duration * sample_rate / 1000)
-            
+        target, frame_shape, timestamp = self._visual_target
+        # Alerte publiée sans frame à annoter depuis trop longtemps: périmée
+        if timestamp - event['timestamp'] > self.alert_cooldown:
+            return
+        if isinstance(target, OverlayCompositor):
+            self._add_visual_alert(target, event['message'], event['severity'], frame_shape, timestamp)
+        else:
+            self._draw_visual_alert(target, event['message'], event['severity'], timestamp)
+    
+    def _speak_event(self, event: Dict):
+        """
+        Consommateur vocal: énonce l'alerte sauf si le même message vient d'être dit
+        
+        Args:
+            event: Événement d'alerte
+        """
+        message = event['message']
+        current_time = event['timestamp']
+        # Éviter de répéter le même message trop souvent
+        if (message != self.last_spoken_message or self.last_speech_time is None
+                or (current_time - self.last_speech_time) > 5.0):
+            self._speak_message(message, event['severity'])
+            self.last_spoken_message = message
+            self.last_speech_time = current_time
+    
+    def _init_sounds(self):
+        """Génère une fois les bips de chaque sévérité et réserve les canaux du mixer"""
+        import pygame
+        
+        for severity, (frequency, duration) in ALERT_TONES.items():
             # Générer une onde sinusoïdale avec numpy (vectorisé pour performance)
-            t = np.arange(frames, dtype=np.float32) / sample_rate
+            frames = int(duration * SAMPLE_RATE / 1000)
+            t = np.arange(frames, dtype=np.float32) / SAMPLE_RATE
             samples = (32767.0 * 0.4 * np.sin(2.0 * np.pi * frequency * t)).astype(np.int16)
-            
-            # Créer un array stéréo
-            arr = np.zeros((frames, 2), dtype=np.int16)
-            arr[:, 0] = samples
-            arr[:, 1] = samples
-            
-            # Convertir en format pygame (transposer si nécessaire)
             try:
-                sound = pygame.sndarray.make_sound(arr)
-                sound.play()
-            except Exception as e:
-                # Fallback: essayer avec un format mono
-                try:
-                    sound = pygame.sndarray.make_sound(samples)
-                    sound.play()
-                except:
-                    logger.warning(f"Impossible de jouer le son: {e}")
-            
-        except Exception as e:
-            logger.error(f"Erreur lors de la lecture du son: {e}")
+                # Array stéréo (deux canaux identiques)
+                self.tones[severity] = pygame.sndarray.make_sound(np.repeat(samples[:, None], 2, axis=1))
+            except Exception:
+                # Fallback: mixer mono
+                self.tones[severity] = pygame.sndarray.make_sound(samples)
+        
+        # Canaux réservés aux alertes (bips + voix): jamais pris par d'autres sons
+        reserved = ALERT_SOUND_CHANNELS + 1
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), reserved))
+        pygame.mixer.set_reserved(reserved)
+        self.sound_channels = [pygame.mixer.Channel(i) for i in range(ALERT_SOUND_CHANNELS)]
+        self.voice_channel = pygame.mixer.Channel(ALERT_SOUND_CHANNELS)
     
-    def _init_tts(self):
-        """Initialise le système de synthèse vocale"""
+    def _play_sound(self, severity: str):
+        """
+        Joue un son d'alerte (bip pré-généré, lecture non bloquante)
+        
+        Args:
+            severity: Niveau de sévérité (low, medium, high)
+        """
+        sound = self.tones.get(severity, self.tones.get('low'))
+        if sound is None or not self.sound_channels:
+            return
         try:
-            # Sur macOS, utiliser la commande 'say' native
-            if platform.system() == 'Darwin':
-                self.tts_enabled = True
-                self.tts_method = 'say'
-                logger.info("TTS initialisé avec 'say' (macOS)")
+            # Premier canal libre, sinon interrompre les canaux à tour de rôle
+            for channel in self.sound_channels:
+                if not channel.get_busy():
+                    break
             else:
-                # Essayer pyttsx3 pour autres systèmes
-                try:
-                    import pyttsx3
-                    self.tts_engine = pyttsx3.init()
-                    # Configurer la voix française si disponible
-                    voices = self.tts_engine.getProperty('voices')
-                    for voice in voices:
-                        if 'french' in voice.name.lower() or 'fr' in voice.id.lower():
-                            self.tts_engine.setProperty('voice', voice.id)
-                            break
-                    self.tts_engine.setProperty('rate', 150)  # Vitesse de parole
-                    self.tts_enabled = True
-                    self.tts_method = 'pyttsx3'
-                    logger.info("TTS initialisé avec pyttsx3")
-                except ImportError:
-                    logger.warning("pyttsx3 non disponible, TTS désactivé")
-                    self.tts_enabled = False
+                channel = self.sound_channels[self.next_channel]
+                self.next_channel = (self.next_channel + 1) % len(self.sound_channels)
+            channel.play(sound)
         except Exception as e:
-            logger.warning(f"Impossible d'initialiser TTS: {e}")
-            self.tts_enabled = False
+            logger.error(f"Erreur lors de la lecture du son: {e}")
     
-    def _speak_message(self, message: str):
+    def _speak_message(self, message: str, severity: str = 'medium'):
         """
-        Énonce un message vocal
+        Énonce un message vocal (mis en file, non bloquant)
         
         Args:
             message: Message à énoncer
+            severity: Niveau de sévérité (priorité dans la file de synthèse)
         """
         if not self.tts_enabled:
             return
-        
-        def speak():
-            try:
-                with self.tts_lock:
-                    if self.tts_method == 'say':
-                        # Utiliser la commande 'say' de macOS
-                        subprocess.run(['say', '-v', 'Thomas', message], 
-                                     check=False, timeout=10)
-                    elif self.tts_method == 'pyttsx3':
-                        self.tts_engine.say(message)
-                        self.tts_engine.runAndWait()
-            except Exception as e:
-                logger.error(f"Erreur lors de la synthèse vocale: {e}")
-        
-        # Lancer dans un thread pour ne pas bloquer
-        thread = threading.Thread(target=speak, daemon=True)
-        thread.start()
+        self.speech.say(message, severity)
     
-    def _draw_visual_alert(self, frame: cv2.typing.MatLike, message: str, severity: str) -> cv2.typing.MatLike:
+    def _severity_colors(self, severity: str) -> Tuple[Tuple[int, int, int], Tuple[int, int, int]]:
         """
-        Dessine une alerte visuelle sur l'image
+        Retourne les couleurs (bordure, fond) d'une alerte selon sa sévérité
         
         Args:
-            frame: Image BGR
-            message: Message d'alerte
             severity: Niveau de sévérité
             
         Returns:
-            Image avec alerte dessinée
+            Tuple (couleur, couleur de fond) en BGR
         """
-        h, w = frame.shape[:2]
-        
-        # Couleur selon la sévérité
         if severity == 'high':
-            color = (0, 0, 255)  # Rouge
-            bg_color = (0, 0, 200)
+            return (0, 0, 255), (0, 0, 200)  # Rouge
         elif severity == 'medium':
-            color = (0, 165, 255)  # Orange
-            bg_color = (0, 140, 200)
-        else:
-            color = (0, 255, 255)  # Jaune
-            bg_color = (0, 200, 200)
+            return (0, 165, 255), (0, 140, 200)  # Orange
+        return (0, 255, 255), (0, 200, 200)  # Jaune
+    
+    def _draw_banner(self, frame: cv2.typing.MatLike, message: str, severity: str):
+        """
+        Dessine le bandeau d'alerte (fond, bordure et texte centré)
+        
+        Args:
+            frame: Image BGR (modifiée en place)
+            message: Message d'alerte
+            severity: Niveau de sévérité
+        """
+        w = frame.shape[1]
+        color, bg_color = self._severity_colors(severity)
         
         # Rectangle de fond
         cv2.rectangle(frame, (10, 10), (w - 10, 80), bg_color, -1)
@@ -246,23 +312,90 @@ class AlertManager:
         text_y = 50
         
         cv2.putText(frame, message, (text_x, text_y), font, font_scale, (255, 255, 255), thickness)
+    
+    def _banner_sprite(self, message: str, severity: str, frame_shape: Tuple[int, ...]) -> Sprite:
+        """
+        Retourne le bandeau d'alerte pré-rendu (une fois par message, sévérité et résolution)
+        
+        Args:
+            message: Message d'alerte
+            severity: Niveau de sévérité
+            frame_shape: Dimensions de l'image
+            
+        Returns:
+            Sprite du bandeau
+        """
+        return self.sprites.get_layer(
+            f"alert:{severity}:{message}",
+            lambda canvas: self._draw_banner(canvas, message, severity),
+            frame_shape
+        )
+    
+    def _add_visual_alert(
+        self,
+        overlay: OverlayCompositor,
+        message: str,
+        severity: str,
+        frame_shape: Tuple[int, ...],
+        timestamp: float
+    ):
+        """
+        Ajoute une alerte visuelle au compositeur
+        
+        Args:
+            overlay: Compositeur de la frame
+            message: Message d'alerte
+            severity: Niveau de sévérité
+            frame_shape: Dimensions de l'image
+            timestamp: Instant de la frame (secondes)
+        """
+        overlay.add_sprite(self._banner_sprite(message, severity, frame_shape))
         
         # Indicateur clignotant (simplifié)
-        if int(time.time() * 2) % 2 == 0:  # Clignote toutes les 0.5s
+        if int(timestamp * 2) % 2 == 0:  # Clignote toutes les 0.5s
+            color, _ = self._severity_colors(severity)
+            overlay.add_circles(np.array([(frame_shape[1] - 30, 40)]), 15, color, -1)
+    
+    def _draw_visual_alert(
+        self,
+        frame: cv2.typing.MatLike,
+        message: str,
+        severity: str,
+        timestamp: float
+    ) -> cv2.typing.MatLike:
+        """
+        Dessine une alerte visuelle sur l'image
+        
+        Args:
+            frame: Image BGR
+            message: Message d'alerte
+            severity: Niveau de sévérité
+            timestamp: Instant de la frame (secondes)
+            
+        Returns:
+            Image avec alerte dessinée
+        """
+        w = frame.shape[1]
+        self._banner_sprite(message, severity, frame.shape).blit(frame)
+        
+        # Indicateur clignotant (simplifié)
+        if int(timestamp * 2) % 2 == 0:  # Clignote toutes les 0.5s
+            color, _ = self._severity_colors(severity)
             cv2.circle(frame, (w - 30, 40), 15, color, -1)
         
         return frame
     
     def release(self):
         """Libère les ressources"""
+        self.bus.close()
+        if self.speech is not None:
+            self.speech.stop()
         if self.sound_enabled:
             try:
+                import pygame
+                self.sound_channels = []
+                self.tones.clear()
                 pygame.mixer.quit()
             except:
                 pass
-        if hasattr(self, 'tts_engine') and self.tts_method == 'pyttsx3':
-            try:
-                self.tts_engine.stop()
-            except:
-                pass
 
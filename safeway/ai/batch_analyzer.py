@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+"""
+Analyse vectorisée de l'état du conducteur sur des timelines complètes
+
+Pour les audits de flotte: au lieu d'appeler StateAnalyzer.analyze frame par
+frame, les règles du moteur (DEFAULT_RULES ou règles de flotte, voir
+ai.rule_engine) sont évaluées sur des tableaux colonnes (timestamps, EAR, MAR,
+position de la tête, téléphone, présence du visage) avec des opérations de
+run-length et de fenêtres glissantes numpy. Chaque type de règle du moteur a
+son équivalent vectorisé; une règle sur un signal absent des colonnes (mains)
+est refusée à la construction. Les événements produits sont identiques à ceux
+de l'analyseur en flux.
+"""
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import (
+    EYE_CLOSED_THRESHOLD,
+    MOUTH_OPEN_THRESHOLD,
+    RULE_WINDOW_MAX_EVENTS
+)
+from ai.rule_engine import RuleEngine
+from core.feature_log import HEAD_POSITIONS, read_feature_log
+from core.logger import setup_logger
+
+logger = setup_logger("BatchAnalyzer")
+
+# Signaux de rule_engine.SIGNALS disponibles dans les colonnes d'une timeline
+BATCH_SIGNALS = (
+    'face_detected', 'eyes_open', 'left_eye_open', 'right_eye_open', 'mouth_open',
+    'head_position', 'left_ear', 'right_ear', 'mar', 'phone_detected'
+)
+
+def encode_head_positions(positions: Sequence[str]) -> np.ndarray:
+    """
+    Convertit des positions de tête textuelles en codes entiers
+
+    Args:
+        positions: Positions ('center', 'left', 'right', 'down')
+
+    Returns:
+        Tableau de codes (index dans HEAD_POSITIONS)
+    """
+    positions = np.asarray(positions)
+    codes = np.zeros(len(positions), dtype=np.int8)
+    for code, name in enumerate(HEAD_POSITIONS):
+        codes[positions == name] = code
+    return codes
+
+def _run_starts(values: np.ndarray) -> np.ndarray:
+    """
+    Pour chaque élément, index du début de sa série de valeurs identiques consécutives
+
+    Args:
+        values: Tableau 1D
+
+    Returns:
+        Tableau d'index de début de série
+    """
+    n = len(values)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    change = np.empty(n, dtype=bool)
+    change[0] = True
+    change[1:] = values[1:] != values[:-1]
+    return np.maximum.accumulate(np.where(change, np.arange(n), 0))
+
+def _window_start(event_times: np.ndarray, query_times: np.ndarray, window_s: float) -> np.ndarray:
+    """
+    Index du premier événement encore dans la fenêtre pour chaque instant de requête
+
+    Reproduit exactement le test d'expiration de EventWindow
+    (now - timestamp > window_s), arrondis flottants compris.
+
+    Args:
+        event_times: Instants des événements (croissants)
+        query_times: Instants de requête
+        window_s: Durée de la fenêtre en secondes
+
+    Returns:
+        Index du premier événement non expiré pour chaque requête
+    """
+    n = len(event_times)
+    index = np.searchsorted(event_times, query_times - window_s, side='left')
+
+    def in_window(i: np.ndarray) -> np.ndarray:
+        return (query_times - event_times[np.minimum(i, n - 1)]) <= window_s
+
+    if n == 0:
+        return index
+    # Corriger les écarts d'arrondi de query_times - window_s
+    while True:
+        step = (index > 0) & in_window(index - 1)
+        if not step.any():
+            break
+        index[step] -= 1
+    while True:
+        step = (index < n) & ~in_window(index)
+        if not step.any():
+            break
+        index[step] += 1
+    return index
+
+def _duration(when: Dict, x: np.ndarray, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Règle 'duration': durée depuis le début de la série de valeurs identiques actives"""
+    active = np.isin(x, when['values'])
+    duration_ms = (t - t[_run_starts(x)]) * 1000
+    return active & (duration_ms > when['min_ms']), duration_ms
+
+def _edge_window(when: Dict, x: np.ndarray, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fenêtre d'événements de transition (équivalent de EventWindow)
+
+    Returns:
+        Tuple (nombre d'événements conservés, index du plus ancien, instants des événements)
+    """
+    hits = x == when['edge']
+    events = hits.copy()
+    events[1:] &= ~hits[:-1]
+    if len(x) and when.get('initial') == when['edge']:
+        events[0] = False
+    total = np.cumsum(events)
+    event_times = t[events]
+    first = np.maximum(total - (when.get('maxlen') or RULE_WINDOW_MAX_EVENTS), 0)
+    if when.get('window_s') is not None:
+        first = np.maximum(first, _window_start(event_times, t, when['window_s']))
+    return total - first, first, event_times
+
+def _edge_count(when: Dict, x: np.ndarray, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Règle 'edge_count': nombre d'événements dans la fenêtre"""
+    count, _, _ = _edge_window(when, x, t)
+    return count >= when['min_count'], count
+
+def _edge_rate(when: Dict, x: np.ndarray, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Règle 'edge_rate': événements par seconde depuis le plus ancien conservé"""
+    count, first, event_times = _edge_window(when, x, t)
+    oldest = np.zeros(len(t))
+    has_events = count > 0
+    oldest[has_events] = event_times[first[has_events]]
+    time_window = t - oldest
+    rated = (count >= 2) & (time_window > 0)
+    rate = np.full(len(t), np.inf)
+    rate[rated] = count[rated] / time_window[rated]
+    return rated & (rate < when['max_rate']), rate
+
+def _changes(when: Dict, x: np.ndarray, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Règle 'changes': changements de valeur sur les dernières transitions"""
+    changes = np.concatenate(([0], np.cumsum(x[1:] != x[:-1])))
+    positions = np.arange(len(x))
+    count = changes - changes[np.maximum(positions - when['transitions'], 0)]
+    return count >= when['min_changes'], count
+
+def _flag(when: Dict, x: np.ndarray, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Règle 'flag': valeur courante parmi les valeurs actives"""
+    return np.isin(x, when['values']), x
+
+# Équivalents vectorisés des types de règles de rule_engine._RULE_KINDS
+_BATCH_KINDS: Dict[str, Callable] = {
+    'duration': _duration,
+    'edge_count': _edge_count,
+    'edge_rate': _edge_rate,
+    'changes': _changes,
+    'flag': _flag,
+}
+
+class BatchStateAnalyzer:
+    """
+    Évalue les règles de StateAnalyzer sur des timelines complètes en une passe vectorisée
+    """
+
+    def __init__(self, rules: Optional[List[Dict]] = None):
+        """
+        Prépare l'évaluation des règles
+
+        Args:
+            rules: Règles de détection déclaratives (défaut: rule_engine.DEFAULT_RULES)
+
+        Raises:
+            ValueError: Si une règle porte sur un signal absent des colonnes
+                ou sur un type de règle sans équivalent vectorisé
+        """
+        # Même compilation que l'analyseur en flux (validation des types et des signaux)
+        engine = RuleEngine(rules)
+        self.rules = engine.specs
+        self.state_keys = list(dict.fromkeys(engine.state_keys))
+        for spec in self.rules:
+            kind = spec['when']['kind']
+            if kind not in _BATCH_KINDS:
+                raise ValueError(f"Type de règle non supporté par l'analyse vectorisée: {kind}")
+        unsupported = sorted(set(engine.signals) - set(BATCH_SIGNALS))
+        if unsupported:
+            raise ValueError(f"Signaux absents des timelines: {', '.join(unsupported)} "
+                             f"(disponibles: {', '.join(BATCH_SIGNALS)})")
+
+    def analyze(
+        self,
+        timestamps: np.ndarray,
+        left_ear: np.ndarray,
+        right_ear: np.ndarray,
+        mar: np.ndarray,
+        head_position: np.ndarray,
+        phone_detected: np.ndarray,
+        face_detected: np.ndarray,
+        frame_usable: Optional[np.ndarray] = None
+    ) -> Dict:
+        """
+        Analyse une timeline complète
+
+        Comme dans StateAnalyzer, les frames inexploitables n'ont pas d'état et
+        le temps qu'elles couvrent est retiré de l'horloge des règles.
+
+        Args:
+            timestamps: Instants de capture (secondes, croissants)
+            left_ear: EAR de l'œil gauche
+            right_ear: EAR de l'œil droit
+            mar: MAR de la bouche
+            head_position: Positions de tête (codes HEAD_POSITIONS ou textes)
+            phone_detected: Téléphone détecté
+            face_detected: Visage détecté
+            frame_usable: Frame exploitable (défaut: toutes)
+
+        Returns:
+            Dictionnaire avec les états par frame ('state') et la liste des
+            alertes ('alerts') sous forme de tuples (index de frame, alerte)
+        """
+        t = np.asarray(timestamps, dtype=np.float64)
+        n = len(t)
+        if frame_usable is not None:
+            usable = np.asarray(frame_usable, dtype=bool)
+            if not usable.all():
+                return self._analyze_usable(t, usable, left_ear, right_ear, mar, head_position,
+                                            phone_detected, face_detected)
+        head = np.asarray(head_position)
+        if head.dtype.kind not in ('U', 'S', 'O'):
+            head = np.asarray(HEAD_POSITIONS)[head]
+        left_ear = np.asarray(left_ear)
+        right_ear = np.asarray(right_ear)
+        mar = np.asarray(mar)
+        left_open = left_ear > EYE_CLOSED_THRESHOLD
+        right_open = right_ear > EYE_CLOSED_THRESHOLD
+        signals = {
+            'face_detected': np.asarray(face_detected, dtype=bool),
+            'eyes_open': left_open & right_open,
+            'left_eye_open': left_open,
+            'right_eye_open': right_open,
+            'mouth_open': mar > MOUTH_OPEN_THRESHOLD,
+            'head_position': head.astype(str),
+            'left_ear': left_ear,
+            'right_ear': right_ear,
+            'mar': mar,
+            'phone_detected': np.asarray(phone_detected, dtype=bool)
+        }
+
+        state = {key: np.zeros(n, dtype=bool) for key in self.state_keys}
+        matches = []
+        for rank, spec in enumerate(self.rules):
+            when = spec['when']
+            x = signals[when['signal']]
+            gate = spec.get('gate')
+            if gate is None:
+                matched, value = _BATCH_KINDS[when['kind']](when, x, t)
+            else:
+                # Fenêtres mises à jour et règle évaluée sur les seules frames du signal de garde;
+                # l'historique traverse les autres frames
+                gate_values = signals[gate]
+                index = np.flatnonzero(gate_values != '' if gate_values.dtype.kind == 'U' else gate_values)
+                gated, gated_value = _BATCH_KINDS[when['kind']](when, x[index], t[index])
+                matched = np.zeros(n, dtype=bool)
+                matched[index] = gated
+                value = np.zeros(n, dtype=gated_value.dtype)
+                value[index] = gated_value
+            if spec.get('state'):
+                state[spec['state']] |= matched
+            if spec.get('alert'):
+                matches.append((rank, np.flatnonzero(matched), value))
+
+        return {
+            'state': state,
+            'alerts': self._collect_alerts(matches),
+            'timestamps': t
+        }
+
+    def _analyze_usable(self, t: np.ndarray, usable: np.ndarray, *columns: np.ndarray) -> Dict:
+        """
+        Analyse les seules frames exploitables sur l'horloge suspendue de StateAnalyzer
+
+        Chaque série de frames inexploitables suivie d'une frame exploitable
+        retire (début de la série -> frame exploitable) de l'horloge, dans le
+        même ordre d'additions que StateAnalyzer (résultats identiques au bit près).
+        """
+        index = np.flatnonzero(usable)
+        gaps = np.zeros(len(t))
+        resumed = index[(index > 0) & ~usable[np.maximum(index - 1, 0)]]
+        gaps[resumed] = t[resumed] - t[_run_starts(usable)[resumed - 1]]
+        paused = np.cumsum(gaps)
+        result = self.analyze(t[index] - paused[index], *(np.asarray(c)[index] for c in columns))
+
+        n = len(t)
+        state = {}
+        for key, values in result['state'].items():
+            state[key] = np.zeros(n, dtype=bool)
+            state[key][index] = values
+        return {
+            'state': state,
+            'alerts': [(int(index[i]), alert) for i, alert in result['alerts']],
+            'timestamps': t
+        }
+
+    def _collect_alerts(self, matches: List[Tuple[int, np.ndarray, np.ndarray]]) -> List[Tuple[int, Dict]]:
+        """
+        Construit la liste ordonnée des alertes (ordre des frames, puis ordre des règles)
+
+        Args:
+            matches: Pour chaque règle à alerte, (rang dans self.rules, frames
+                où elle est vérifiée, valeur par frame pour le message)
+
+        Returns:
+            Liste de tuples (index de frame, alerte)
+        """
+        if not matches:
+            return []
+        values = {rank: value for rank, _, value in matches}
+        frames = np.concatenate([index for _, index, _ in matches])
+        ranks = np.concatenate([np.full(len(index), rank) for rank, index, _ in matches])
+        order = np.lexsort((ranks, frames))
+
+        # Seuls les messages avec {value} sont formatés frame par frame
+        formatted = {rank for rank in values if '{' in self.rules[rank]['alert']['message']}
+        alerts = []
+        for frame_index, rank in zip(frames[order].tolist(), ranks[order].tolist()):
+            alert = dict(self.rules[rank]['alert'])
+            if rank in formatted:
+                alert['message'] = alert['message'].format(value=values[rank][frame_index].item())
+            alerts.append((frame_index, alert))
+        return alerts
+
+def replay_streaming(columns: Dict[str, np.ndarray], rules: Optional[List[Dict]] = None) -> List[Tuple[int, Dict]]:
+    """
+    Rejoue une timeline avec StateAnalyzer, frame par frame (référence)
+
+    Args:
+        columns: Tableaux colonnes (mêmes clés que les arguments de BatchStateAnalyzer.analyze)
+        rules: Règles de détection déclaratives (défaut: rule_engine.DEFAULT_RULES)
+
+    Returns:
+        Liste de tuples (index de frame, alerte)
+    """
+    from ai.state_analyzer import StateAnalyzer
+
+    analyzer = StateAnalyzer(rules=rules)
+    head = np.asarray(columns['head_position'])
+    if head.dtype.kind not in ('U', 'S', 'O'):
+        head = np.asarray(HEAD_POSITIONS)[head]
+    alerts = []
+    for i in range(len(columns['timestamps'])):
+        left_ear = float(columns['left_ear'][i])
+        right_ear = float(columns['right_ear'][i])
+        mar = float(columns['mar'][i])
+        left_open = left_ear > EYE_CLOSED_THRESHOLD
+        right_open = right_ear > EYE_CLOSED_THRESHOLD
+        face_results = {
+            'face_detected': bool(columns['face_detected'][i]),
+            'eyes_open': left_open and right_open,
+            'left_eye_open': left_open,
+            'right_eye_open': right_open,
+            'mouth_open': mar > MOUTH_OPEN_THRESHOLD,
+            'head_position': str(head[i]),
+            'left_ear': left_ear,
+            'right_ear': right_ear,
+            'mar': mar
+        }
+        if 'frame_usable' in columns:
+            face_results['frame_usable'] = bool(columns['frame_usable'][i])
+        yolo_results = {'phone_detected': bool(columns['phone_detected'][i])}
+        analysis = analyzer.analyze(face_results, {}, yolo_results, float(columns['timestamps'][i]))
+        alerts.extend((i, alert) for alert in analysis['alerts'])
+    return alerts
+
+def verify_against_streaming(columns: Dict[str, np.ndarray], rules: Optional[List[Dict]] = None) -> bool:
+    """
+    Vérifie que l'analyse vectorisée produit exactement les alertes de StateAnalyzer
+
+    Args:
+        columns: Tableaux colonnes d'une timeline
+        rules: Règles de détection déclaratives (défaut: rule_engine.DEFAULT_RULES)
+
+    Returns:
+        True si les deux analyses sont identiques
+    """
+    batch_alerts = BatchStateAnalyzer(rules).analyze(**columns)['alerts']
+    stream_alerts = replay_streaming(columns, rules)
+    if batch_alerts == stream_alerts:
+        return True
+    for i, (batch, stream) in enumerate(zip(batch_alerts, stream_alerts)):
+        if batch != stream:
+            logger.error(f"Première divergence (alerte {i}): batch={batch} flux={stream}")
+            break
+    else:
+        logger.error(f"Nombre d'alertes différent: batch={len(batch_alerts)} flux={len(stream_alerts)}")
+    return False
+
+def columns_from_feature_log(path: Union[str, Path]) -> Dict[str, np.ndarray]:
+    """
+    Charge une timeline depuis un journal de caractéristiques (voir core.feature_log)
+
+    Les frames inexploitables sont conservées avec la colonne 'frame_usable'
+    (horloge des règles suspendue, comme dans StateAnalyzer).
+
+    Args:
+        path: Chemin du journal enregistré pendant le trajet
+
+    Returns:
+        Tableaux colonnes acceptés par BatchStateAnalyzer.analyze
+    """
+    records = read_feature_log(path)
+    columns = {
+        'timestamps': records['timestamp'].astype(np.float64),
+        'left_ear': records['left_ear'].astype(np.float64),
+        'right_ear': records['right_ear'].astype(np.float64),
+        'mar': records['mar'].astype(np.float64),
+        'head_position': np.asarray(records['head_position'], dtype=np.int8),
+        'phone_detected': np.asarray(records['phone_detected']),
+        'face_detected': np.asarray(records['face_detected'])
+    }
+    if 'frame_usable' in records.dtype.names:
+        columns['frame_usable'] = np.asarray(records['frame_usable'])
+    return columns
+
+def summarize_feature_log(path: Union[str, Path], rules: Optional[List[Dict]] = None) -> Dict[str, int]:
+    """
+    Rejoue les règles sur un trajet enregistré et affiche le nombre d'alertes par type
+
+    Args:
+        path: Chemin du journal de caractéristiques
+        rules: Règles de détection déclaratives (défaut: rule_engine.DEFAULT_RULES)
+
+    Returns:
+        Nombre d'alertes par type
+    """
+    import time
+
+    start = time.perf_counter()
+    columns = columns_from_feature_log(path)
+    result = BatchStateAnalyzer(rules).analyze(**columns)
+    elapsed = time.perf_counter() - start
+    counts: Dict[str, int] = {}
+    for _, alert in result['alerts']:
+        counts[alert['type']] = counts.get(alert['type'], 0) + 1
+    logger.info(f"{len(columns['timestamps'])} frames analysées en {elapsed:.2f}s")
+    for alert_type, count in sorted(counts.items()):
+        logger.info(f"  {alert_type}: {count} alertes")
+    return counts
+
+def generate_synthetic_timeline(n_frames: int, fps: float = 15.0, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Génère une timeline synthétique réaliste (clignements, bâillements, absences...)
+
+    Args:
+        n_frames: Nombre de frames
+        fps: Fréquence d'images
+        seed: Graine aléatoire
+
+    Returns:
+        Tableaux colonnes
+    """
+    rng = np.random.default_rng(seed)
+    # Intervalles irréguliers (frames perdues) autour de 1/fps
+    intervals = rng.gamma(8.0, 1.0 / (8.0 * fps), n_frames)
+    timestamps = np.cumsum(intervals)
+
+    def episodes(probability, mean_length: float) -> np.ndarray:
+        """Séries aléatoires de frames actives (probabilité de début par frame)"""
+        active = np.zeros(n_frames, dtype=bool)
+        starts = np.flatnonzero(rng.random(n_frames) < probability)
+        for start, length in zip(starts, rng.geometric(1.0 / mean_length, len(starts))):
+            active[start:start + length] = True
+        return active
+
+    # Périodes de somnolence: clignements rares et longues fermetures des yeux
+    drowsy = episodes(0.0002, 3000)
+    eyes_closed = episodes(np.where(drowsy, 0.002, 0.03), 3) | episodes(0.0005, 30)
+    left_ear = np.where(eyes_closed, rng.uniform(0.05, 0.2, n_frames), rng.uniform(0.23, 0.4, n_frames))
+    right_ear = np.where(eyes_closed, rng.uniform(0.05, 0.2, n_frames), rng.uniform(0.23, 0.4, n_frames))
+    mar = np.where(episodes(np.where(drowsy, 0.002, 0.0002), 20),
+                   rng.uniform(0.55, 0.9, n_frames), rng.uniform(0.1, 0.4, n_frames))
+    head_position = np.zeros(n_frames, dtype=np.int8)
+    for code in range(1, len(HEAD_POSITIONS)):
+        head_position[episodes(0.004, 25)] = code
+    # Mouvements de tête erratiques
+    jitter = episodes(0.001, 8)
+    head_position[jitter] = rng.integers(0, len(HEAD_POSITIONS), int(jitter.sum()))
+
+    return {
+        'timestamps': timestamps,
+        'left_ear': left_ear,
+        'right_ear': right_ear,
+        'mar': mar,
+        'head_position': head_position,
+        'phone_detected': episodes(0.001, 10),
+        'face_detected': ~episodes(0.002, 50),
+        # Tunnels, éblouissements: frames inexploitables
+        'frame_usable': ~(episodes(0.0005, 40) | (rng.random(n_frames) < 0.02))
+    }
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Vérifier l'analyse vectorisée contre StateAnalyzer")
+    parser.add_argument("--frames", type=int, default=200000,
+                       help="Nombre de frames par timeline synthétique")
+    parser.add_argument("--runs", type=int, default=5,
+                       help="Nombre de timelines à vérifier")
+    parser.add_argument("--log", type=str, default=None,
+                       help="Analyser un journal de caractéristiques enregistré au lieu de timelines synthétiques")
+    parser.add_argument("--rules", type=str, default=None,
+                       help="Règles de flotte (YAML, voir rule_engine.load_rules)")
+    args = parser.parse_args()
+
+    rules = None
+    try:
+        if args.rules:
+            from ai.rule_engine import load_rules
+            rules = load_rules(args.rules)
+        analyzer = BatchStateAnalyzer(rules)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    if args.log:
+        summarize_feature_log(args.log, rules)
+        sys.exit(0)
+
+    all_ok = True
+    for seed in range(args.runs):
+        columns = generate_synthetic_timeline(args.frames, seed=seed)
+        start = time.perf_counter()
+        batch_alerts = analyzer.analyze(**columns)['alerts']
+        batch_time = time.perf_counter() - start
+        start = time.perf_counter()
+        stream_alerts = replay_streaming(columns, rules)
+        stream_time = time.perf_counter() - start
+        ok = batch_alerts == stream_alerts or verify_against_streaming(columns, rules)
+        all_ok &= ok
+        logger.info(f"Timeline {seed}: {len(batch_alerts)} alertes, "
+                    f"batch {batch_time:.2f}s / flux {stream_time:.2f}s -> {'OK' if ok else 'DIVERGENCE'}")
+
+    sys.exit(0 if all_ok else 1)
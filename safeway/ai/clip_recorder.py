@@ -0,0 +1,209 @@
+"""
+Enregistrement de clips vidéo autour des alertes pour SafeWay
+
+La boucle de traitement dépose chaque frame dans un anneau borné en mémoire
+(frames réduites et compressées en JPEG, CLIP_FPS par seconde au maximum):
+seules les CLIP_PRE_ROLL dernières secondes sont conservées. Branché sur le
+bus d'alertes, ClipRecorder ouvre un clip à chaque alerte avec les frames de
+l'anneau, le complète pendant CLIP_POST_ROLL secondes (les alertes qui
+arrivent entre-temps prolongent le même clip), puis l'encode dans un thread
+dédié: la boucle ne fait jamais que réduire et compresser une petite image.
+"""
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from config.settings import (
+    CLIPS_DIR,
+    CLIP_PRE_ROLL,
+    CLIP_POST_ROLL,
+    CLIP_MAX_DURATION,
+    CLIP_FPS,
+    CLIP_SIZE,
+    CLIP_JPEG_QUALITY,
+    CLIP_MAX_PENDING
+)
+from ai.alert_bus import AlertSink, DROP_OLDEST
+from core.logger import setup_logger
+
+logger = setup_logger("ClipRecorder")
+
+class _Clip:
+    """Clip en cours: frames (timestamp, JPEG) et alertes couvertes"""
+
+    def __init__(self, frames: List[Tuple[float, bytes]], event: Dict, end: float):
+        self.frames = frames
+        self.events = [event]
+        self.start = frames[0][0] if frames else event['timestamp']
+        self.end = end
+
+class ClipRecorder(AlertSink):
+    """
+    Anneau de frames pré-alerte et écriture des clips en arrière-plan
+    """
+
+    def __init__(
+        self,
+        output_dir: Path = CLIPS_DIR,
+        pre_roll: float = CLIP_PRE_ROLL,
+        post_roll: float = CLIP_POST_ROLL,
+        max_duration: float = CLIP_MAX_DURATION,
+        fps: float = CLIP_FPS,
+        size: Tuple[int, int] = CLIP_SIZE,
+        jpeg_quality: int = CLIP_JPEG_QUALITY,
+        max_pending: int = CLIP_MAX_PENDING
+    ):
+        """
+        Initialise l'enregistreur
+
+        Args:
+            output_dir: Dossier des clips (.mp4 et description .json)
+            pre_roll: Secondes conservées avant l'alerte
+            post_roll: Secondes enregistrées après la dernière alerte du clip
+            max_duration: Durée maximum d'un clip
+            fps: Frames par seconde conservées
+            size: Résolution des frames conservées (largeur, hauteur)
+            jpeg_quality: Qualité JPEG des frames de l'anneau
+            max_pending: Clips terminés en attente d'encodage au maximum
+        """
+        super().__init__("clips", max_queue=8, policy=DROP_OLDEST)
+        self.output_dir = Path(output_dir)
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.max_duration = max_duration
+        self.fps = fps
+        self.size = size
+        self.max_pending = max_pending
+        self._encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        # Tampon de réduction réutilisé (aucune allocation de pleine taille par frame)
+        self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+
+        # Anneau de taille fixe: (timestamp, JPEG)
+        self._ring: deque = deque(maxlen=max(int(pre_roll * fps), 1))
+        self._last_push: Optional[float] = None
+        self._active: Optional[_Clip] = None
+        self._lock = threading.Lock()
+
+        # Clips terminés, encodés par le thread d'écriture
+        self._ready: deque = deque()
+        self._ready_condition = threading.Condition()
+        self._writer_running = True
+        self._writer = threading.Thread(target=self._write_loop, name="ClipWriter", daemon=True)
+        self._writer.start()
+
+        self.clips_written = 0
+        self.clips_dropped = 0
+
+    def push(self, frame: np.ndarray, timestamp: float):
+        """
+        Dépose une frame de la boucle de traitement (réduite et compressée)
+
+        Args:
+            frame: Image BGR
+            timestamp: Instant de capture en secondes
+        """
+        if self._last_push is not None and timestamp - self._last_push < 1.0 / self.fps:
+            return
+        self._last_push = timestamp
+        cv2.resize(frame, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        ok, encoded = cv2.imencode(".jpg", self._small, self._encode_params)
+        if not ok:
+            return
+        item = (timestamp, encoded.tobytes())
+
+        with self._lock:
+            self._ring.append(item)
+            clip = self._active
+            if clip is None:
+                return
+            clip.frames.append(item)
+            if timestamp < clip.end:
+                return
+            self._active = None
+        self._submit(clip)
+
+    def handle(self, event: Dict):
+        """
+        Ouvre un clip pour l'alerte, ou prolonge le clip en cours
+
+        Args:
+            event: Événement d'alerte (timestamp sur la même horloge que push)
+        """
+        timestamp = event['timestamp']
+        with self._lock:
+            expired = self._active
+            if expired is not None and timestamp <= expired.end:
+                expired.events.append(event)
+                expired.end = min(timestamp + self.post_roll, expired.start + self.max_duration)
+                return
+            # Clip précédent terminé mais pas encore clos par push (frame suivante non retenue)
+            self._active = _Clip([item for item in self._ring if item[0] >= timestamp - self.pre_roll],
+                                 event, timestamp + self.post_roll)
+        if expired is not None:
+            self._submit(expired)
+
+    def _submit(self, clip: _Clip):
+        """Transmet un clip terminé au thread d'écriture"""
+        with self._ready_condition:
+            if len(self._ready) >= self.max_pending:
+                self._ready.popleft()
+                self.clips_dropped += 1
+                logger.warning("Encodage des clips en retard: clip le plus ancien abandonné")
+            self._ready.append(clip)
+            self._ready_condition.notify()
+
+    def _write_loop(self):
+        """Boucle du thread d'écriture"""
+        while True:
+            with self._ready_condition:
+                while self._writer_running and not self._ready:
+                    self._ready_condition.wait()
+                if not self._ready:
+                    return
+                clip = self._ready.popleft()
+            try:
+                self._write_clip(clip)
+            except Exception as e:
+                logger.error(f"Écriture du clip impossible: {e}")
+
+    def _write_clip(self, clip: _Clip):
+        """Décode les frames du clip et l'écrit en MP4 avec sa description JSON"""
+        if not clip.frames:
+            return
+        first = clip.events[0]
+        name = f"{time.strftime('%Y%m%d_%H%M%S')}_{self.clips_written:03d}_{first['type']}"
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        video_path = self.output_dir / f"{name}.mp4"
+        writer = cv2.VideoWriter(str(video_path), cv2.VideoWriter_fourcc(*"mp4v"), self.fps, self.size)
+        try:
+            for _, data in clip.frames:
+                writer.write(cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR))
+        finally:
+            writer.release()
+        description = {
+            'video': video_path.name,
+            'start': clip.frames[0][0],
+            'end': clip.frames[-1][0],
+            'frames': len(clip.frames),
+            'alerts': clip.events
+        }
+        (self.output_dir / f"{name}.json").write_text(json.dumps(description, indent=2, ensure_ascii=False))
+        self.clips_written += 1
+        logger.info(f"Clip enregistré: {video_path} ({len(clip.frames)} frames, {len(clip.events)} alerte(s))")
+
+    def close(self):
+        """Termine le clip en cours avec les frames disponibles et attend l'écriture"""
+        with self._lock:
+            clip, self._active = self._active, None
+        if clip is not None:
+            self._submit(clip)
+        with self._ready_condition:
+            self._writer_running = False
+            self._ready_condition.notify()
+        self._writer.join(timeout=10.0)
+        if self.clips_dropped:
+            logger.warning(f"{self.clips_dropped} clip(s) abandonné(s)")
@@ -3,11 +3,19 @@ Module de détection du visage et analyse des yeux/bouche pour SafeWay
 """
 import cv2
 import numpy as np
-import mediapipe as mp
 from typing import Optional, Dict, List, Tuple
-from config.settings import EYE_CLOSED_THRESHOLD
+from config.settings import (
+    EYE_CLOSED_THRESHOLD,
+    MOUTH_OPEN_THRESHOLD,
+    MAX_NUM_FACES,
+    DRIVER_SEAT_REGION,
+    FRAME_WIDTH,
+    FRAME_HEIGHT
+)
 from core.logger import setup_logger
-from core.utils import calculate_eye_aspect_ratio, calculate_mouth_aspect_ratio
+from core.overlay import OverlayCompositor
+from core.utils import calculate_eye_aspect_ratio_batch, calculate_mouth_aspect_ratio_batch
+from ai.face_tracker import FaceTracker
 
 logger = setup_logger("FaceDetector")
 
@@ -16,12 +24,25 @@ class FaceDetector:
     Détecte le visage et analyse les yeux et la bouche avec MediaPipe
     """
     
-    def __init__(self):
-        """Initialise le détecteur de visage MediaPipe"""
+    def __init__(
+        self,
+        max_num_faces: int = MAX_NUM_FACES,
+        seat_region: Tuple[float, float, float, float] = DRIVER_SEAT_REGION
+    ):
+        """
+        Initialise le détecteur de visage MediaPipe
+        
+        Args:
+            max_num_faces: Nombre maximum de visages détectés par frame
+            seat_region: Zone du conducteur (x1, y1, x2, y2) en coordonnées normalisées
+        """
+        # Import différé: mediapipe n'est chargé qu'à la création du détecteur
+        import mediapipe as mp
+        
         self.mp_face_mesh = mp.solutions.face_mesh
         self.face_mesh = self.mp_face_mesh.FaceMesh(
             static_image_mode=False,
-            max_num_faces=1,
+            max_num_faces=max_num_faces,
             refine_landmarks=True,
             min_detection_confidence=0.6,  # Augmenté pour meilleure précision
             min_tracking_confidence=0.6    # Augmenté pour meilleure précision
@@ -44,18 +65,72 @@ class FaceDetector:
         self.RIGHT_EYE_EAR_INDICES = [362, 385, 387, 263, 373, 380]
         # Bouche (8 points pour MAR)
         self.MOUTH_MAR_INDICES = [61, 84, 17, 314, 405, 320, 307, 375]
+        # Nez (position de la tête) et extrémités du contour (boîte englobante)
+        self.NOSE_TIP_INDEX = 1
+        self.FACE_BOUNDS_INDICES = [10, 152, 234, 454]
+        # Seuls ces landmarks sont extraits des résultats MediaPipe
+        self.KEY_INDICES = (
+            self.LEFT_EYE_EAR_INDICES + self.RIGHT_EYE_EAR_INDICES +
+            self.MOUTH_MAR_INDICES + [self.NOSE_TIP_INDEX] + self.FACE_BOUNDS_INDICES
+        )
+        
+        # Contours du visage sous forme de segments indexés (pour le compositeur)
+        connections = np.array(sorted(self.mp_face_mesh.FACEMESH_CONTOURS), dtype=np.int32)
+        self.CONTOUR_POINT_INDICES = np.unique(connections).tolist()
+        self.CONTOUR_SEGMENTS = np.searchsorted(self.CONTOUR_POINT_INDICES, connections)
+        self.CONTOUR_COLOR = (224, 224, 224)
+        self.EYE_POINT_INDICES = self.LEFT_EYE_EAR_INDICES + self.RIGHT_EYE_EAR_INDICES
+        
+        # Suivi des visages et sélection du conducteur
+        self.tracker = FaceTracker(seat_region=seat_region)
         
     def detect(self, frame: np.ndarray) -> Dict:
         """
-        Détecte le visage et analyse les yeux et la bouche
+        Détecte les visages et analyse les yeux et la bouche du conducteur
         
         Args:
             frame: Image BGR (OpenCV)
             
         Returns:
-            Dictionnaire avec les résultats de détection
+            Dictionnaire avec les résultats du conducteur, complété par la liste
+            de tous les visages ('faces') et l'ID du conducteur ('driver_id')
         """
-        results = {
+        results = self._empty_results()
+        results['faces'] = []
+        results['driver_id'] = None
+        results['num_faces'] = 0
+        
+        if frame is None:
+            return results
+        
+        # Convertir BGR en RGB pour MediaPipe
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        
+        # Détection
+        face_results = self.face_mesh.process(rgb_frame)
+        
+        if not face_results.multi_face_landmarks:
+            self.tracker.update(np.empty((0, 2)))
+            return results
+        
+        faces = self._analyze_faces(face_results.multi_face_landmarks, frame.shape[:2])
+        results['faces'] = faces
+        results['num_faces'] = len(faces)
+        
+        # Sélectionner le conducteur d'après la zone du siège
+        face_ids = [face['face_id'] for face in faces]
+        bboxes = np.array([face['bbox'] for face in faces], dtype=np.float32)
+        driver_index = self.tracker.select_driver(face_ids, bboxes)
+        
+        if driver_index is not None:
+            results.update(faces[driver_index])
+            results['driver_id'] = faces[driver_index]['face_id']
+        
+        return results
+    
+    def _empty_results(self) -> Dict:
+        """Résultats par défaut lorsqu'aucun visage n'est détecté"""
+        return {
             'face_detected': False,
             'eyes_open': True,
             'left_eye_open': True,
@@ -67,122 +142,137 @@ class FaceDetector:
             'right_ear': 0.0,
             'mar': 0.0
         }
+    
+    def _analyze_faces(self, multi_face_landmarks, frame_shape: Tuple[int, int]) -> List[Dict]:
+        """
+        Calcule EAR, MAR et position de la tête de tous les visages en une passe vectorisée
         
-        if frame is None:
-            return results
+        Args:
+            multi_face_landmarks: Landmarks MediaPipe de chaque visage
+            frame_shape: Dimensions (h, w) de l'image
+            
+        Returns:
+            Liste des résultats par visage (avec 'face_id' et 'bbox' normalisée)
+        """
+        h, w = frame_shape
         
-        # Convertir BGR en RGB pour MediaPipe
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # Landmarks copiés en tableau (N, 478, 2) normalisé: les protobufs MediaPipe ne sont pas conservés
+        landmarks = np.array(
+            [[(landmark.x, landmark.y) for landmark in face.landmark] for face in multi_face_landmarks],
+            dtype=np.float32
+        )
+        points = landmarks[:, self.KEY_INDICES]
+        # Coordonnées pixels entières (comme le calcul mono-visage d'origine)
+        pixels = (points * np.array([w, h], dtype=np.float32)).astype(np.int32)
         
-        # Détection
-        face_results = self.face_mesh.process(rgb_frame)
+        n_left = len(self.LEFT_EYE_EAR_INDICES)
+        n_right = len(self.RIGHT_EYE_EAR_INDICES)
+        n_mouth = len(self.MOUTH_MAR_INDICES)
+        left_ears = calculate_eye_aspect_ratio_batch(pixels[:, :n_left])
+        right_ears = calculate_eye_aspect_ratio_batch(pixels[:, n_left:n_left + n_right])
+        mars = calculate_mouth_aspect_ratio_batch(
+            pixels[:, n_left + n_right:n_left + n_right + n_mouth]
+        )
         
-        if not face_results.multi_face_landmarks:
-            return results
+        # Boîtes englobantes normalisées à partir du contour du visage
+        contour = points[:, -len(self.FACE_BOUNDS_INDICES):]
+        bboxes = np.concatenate([contour.min(axis=1), contour.max(axis=1)], axis=1)
+        centroids = (bboxes[:, :2] + bboxes[:, 2:]) / 2
+        face_ids = self.tracker.update(centroids)
+        
+        # Position de la tête (simplifiée): le nez par rapport au centre de la zone conducteur
+        x1, y1, x2, y2 = self.tracker.seat_region
+        center_x = (x1 + x2) / 2 * w
+        center_y = (y1 + y2) / 2 * h
+        nose_tips = pixels[:, n_left + n_right + n_mouth]
+        head_positions = np.select(
+            [nose_tips[:, 0] < center_x - 50,
+             nose_tips[:, 0] > center_x + 50,
+             nose_tips[:, 1] > center_y + 30],
+            ['left', 'right', 'down'],
+            default='center'
+        )
         
-        results['face_detected'] = True
-        
-        # Prendre le premier visage détecté
-        face_landmarks = face_results.multi_face_landmarks[0]
-        results['landmarks'] = face_landmarks
-        
-        h, w = frame.shape[:2]
-        
-        # Extraire les coordonnées des landmarks
-        landmarks_2d = []
-        for landmark in face_landmarks.landmark:
-            x = int(landmark.x * w)
-            y = int(landmark.y * h)
-            landmarks_2d.append((x, y))
-        
-        # Calculer EAR pour l'œil gauche
-        left_eye_points = [landmarks_2d[i] for i in self.LEFT_EYE_EAR_INDICES]
-        left_ear = calculate_eye_aspect_ratio(left_eye_points)
-        results['left_ear'] = left_ear
-        results['left_eye_open'] = left_ear > EYE_CLOSED_THRESHOLD
-        
-        # Calculer EAR pour l'œil droit
-        right_eye_points = [landmarks_2d[i] for i in self.RIGHT_EYE_EAR_INDICES]
-        right_ear = calculate_eye_aspect_ratio(right_eye_points)
-        results['right_ear'] = right_ear
-        results['right_eye_open'] = right_ear > EYE_CLOSED_THRESHOLD
-        
-        # Les deux yeux doivent être ouverts
-        results['eyes_open'] = results['left_eye_open'] and results['right_eye_open']
-        
-        # Calculer MAR pour la bouche
-        mouth_points = [landmarks_2d[i] for i in self.MOUTH_MAR_INDICES]
-        mar = calculate_mouth_aspect_ratio(mouth_points)
-        results['mar'] = mar
-        results['mouth_open'] = mar > 0.5  # Seuil pour bâillement
-        
-        # Estimer la position de la tête (simplifié)
-        # Utiliser le nez comme référence
-        nose_tip = landmarks_2d[1]  # Point du nez
-        face_center_x = w / 2
-        
-        if nose_tip[0] < face_center_x - 50:
-            results['head_position'] = 'left'
-        elif nose_tip[0] > face_center_x + 50:
-            results['head_position'] = 'right'
-        elif nose_tip[1] > h / 2 + 30:
-            results['head_position'] = 'down'
-        else:
-            results['head_position'] = 'center'
+        faces = []
+        for i in range(len(landmarks)):
+            left_eye_open = bool(left_ears[i] > EYE_CLOSED_THRESHOLD)
+            right_eye_open = bool(right_ears[i] > EYE_CLOSED_THRESHOLD)
+            faces.append({
+                'face_id': face_ids[i],
+                'bbox': bboxes[i].tolist(),
+                'face_detected': True,
+                'eyes_open': left_eye_open and right_eye_open,
+                'left_eye_open': left_eye_open,
+                'right_eye_open': right_eye_open,
+                'mouth_open': bool(mars[i] > MOUTH_OPEN_THRESHOLD),  # Seuil pour bâillement
+                'head_position': str(head_positions[i]),
+                'landmarks': landmarks[i],
+                'left_ear': float(left_ears[i]),
+                'right_ear': float(right_ears[i]),
+                'mar': float(mars[i])
+            })
         
-        return results
+        return faces
     
-    def draw_landmarks(self, frame: np.ndarray, results: Dict) -> np.ndarray:
+    def add_overlay(self, overlay: OverlayCompositor, results: Dict, frame_shape: Tuple[int, ...]):
         """
-        Dessine les landmarks du visage sur l'image
+        Ajoute les contours du visage et les points des yeux au compositeur
         
         Args:
-            frame: Image BGR
+            overlay: Compositeur d'annotations de la frame
             results: Résultats de détection
-            
-        Returns:
-            Image avec landmarks dessinés
+            frame_shape: Dimensions de l'image
         """
         if not results['face_detected'] or results['landmarks'] is None:
-            return frame
+            return
         
-        annotated_frame = frame.copy()
-        h, w = frame.shape[:2]
+        h, w = frame_shape[:2]
+        # Landmarks normalisés (478, 2) -> pixels
+        landmarks = results['landmarks'] * np.array([w, h], dtype=np.float32)
         
         try:
-            # Dessiner les contours du visage (plus sûr)
-            self.mp_drawing.draw_landmarks(
-                annotated_frame,
-                results['landmarks'],
-                self.mp_face_mesh.FACEMESH_CONTOURS,
-                None,
-                self.mp_drawing_styles.get_default_face_mesh_contours_style()
-            )
+            # Contours du visage: tous les segments en un seul appel
+            contour_points = landmarks[self.CONTOUR_POINT_INDICES].astype(np.int32)
+            overlay.add_lines(contour_points[self.CONTOUR_SEGMENTS], self.CONTOUR_COLOR, 1)
         except Exception as e:
             logger.warning(f"Erreur lors du dessin des contours: {e}")
         
-        # Dessiner manuellement les points des yeux pour éviter les erreurs de connexions
+        # Points des yeux (dessinés manuellement pour éviter les erreurs de connexions)
         try:
-            landmarks = results['landmarks']
-            # Dessiner les points de l'œil gauche
-            for idx in self.LEFT_EYE_EAR_INDICES:
-                if idx < len(landmarks.landmark):
-                    landmark = landmarks.landmark[idx]
-                    x = int(landmark.x * w)
-                    y = int(landmark.y * h)
-                    cv2.circle(annotated_frame, (x, y), 2, (0, 255, 0), -1)
-            
-            # Dessiner les points de l'œil droit
-            for idx in self.RIGHT_EYE_EAR_INDICES:
-                if idx < len(landmarks.landmark):
-                    landmark = landmarks.landmark[idx]
-                    x = int(landmark.x * w)
-                    y = int(landmark.y * h)
-                    cv2.circle(annotated_frame, (x, y), 2, (0, 255, 0), -1)
+            eye_indices = [i for i in self.EYE_POINT_INDICES if i < len(landmarks)]
+            eye_points = landmarks[eye_indices].astype(np.int32)
+            overlay.add_circles(eye_points, 2, (0, 255, 0), -1)
         except Exception as e:
             logger.warning(f"Erreur lors du dessin des yeux: {e}")
+    
+    def draw_landmarks(self, frame: np.ndarray, results: Dict) -> np.ndarray:
+        """
+        Dessine les landmarks du visage sur l'image
+        
+        Args:
+            frame: Image BGR
+            results: Résultats de détection
+            
+        Returns:
+            Image avec landmarks dessinés
+        """
+        if not results['face_detected'] or results['landmarks'] is None:
+            return frame
         
-        return annotated_frame
+        overlay = OverlayCompositor()
+        self.add_overlay(overlay, results, frame.shape)
+        return overlay.render(frame)
+    
+    def warmup(self, frame_shape: Tuple[int, int, int] = (FRAME_HEIGHT, FRAME_WIDTH, 3)):
+        """
+        Exécute une inférence sur une image noire pour initialiser le graphe MediaPipe
+        
+        Args:
+            frame_shape: Dimensions des frames attendues
+        """
+        self.detect(np.zeros(frame_shape, dtype=np.uint8))
+        # Aucun visage suivi à l'issue du préchauffage
+        self.tracker = FaceTracker(seat_region=self.tracker.seat_region)
     
     def release(self):
         """Libère les ressources"""
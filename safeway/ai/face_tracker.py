@@ -0,0 +1,143 @@
+"""
+Module de suivi des visages (IDs stables) et sélection du conducteur pour SafeWay
+"""
+import numpy as np
+from typing import Optional, List, Tuple
+from config.settings import (
+    DRIVER_SEAT_REGION,
+    FACE_TRACK_MAX_DISTANCE,
+    FACE_TRACK_MAX_MISSED
+)
+from core.logger import setup_logger
+
+logger = setup_logger("FaceTracker")
+
+class FaceTracker:
+    """
+    Attribue des IDs stables aux visages d'une frame à l'autre et
+    sélectionne le conducteur d'après la zone du siège conducteur
+    """
+
+    def __init__(
+        self,
+        seat_region: Tuple[float, float, float, float] = DRIVER_SEAT_REGION,
+        max_distance: float = FACE_TRACK_MAX_DISTANCE,
+        max_missed: int = FACE_TRACK_MAX_MISSED
+    ):
+        """
+        Initialise le tracker
+
+        Args:
+            seat_region: Zone du conducteur (x1, y1, x2, y2) en coordonnées normalisées
+            max_distance: Déplacement max (normalisé) d'un visage entre deux frames
+            max_missed: Nombre de frames sans détection avant d'oublier un visage
+        """
+        self.seat_region = seat_region
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+
+        self.next_id = 0
+        self.track_ids: List[int] = []
+        self.track_centroids = np.empty((0, 2), dtype=np.float32)
+        self.track_missed: List[int] = []
+        self.driver_id: Optional[int] = None
+
+    def update(self, centroids: np.ndarray) -> List[int]:
+        """
+        Associe les visages de la frame courante aux visages suivis
+
+        Args:
+            centroids: Tableau (N, 2) des centres normalisés des visages détectés
+
+        Returns:
+            Liste des IDs stables, dans l'ordre des visages fournis
+        """
+        centroids = np.asarray(centroids, dtype=np.float32).reshape(-1, 2)
+        n_tracks = len(self.track_ids)
+        n_faces = len(centroids)
+        face_ids = [-1] * n_faces
+        matched_tracks = set()
+
+        if n_tracks and n_faces:
+            # Matrice des distances (pistes x visages) calculée en une fois
+            distances = np.linalg.norm(
+                self.track_centroids[:, None, :] - centroids[None, :, :], axis=-1
+            )
+            # Association gloutonne par distance croissante
+            for flat_index in np.argsort(distances, axis=None):
+                track_idx, face_idx = divmod(int(flat_index), n_faces)
+                if distances[track_idx, face_idx] > self.max_distance:
+                    break
+                if track_idx in matched_tracks or face_ids[face_idx] != -1:
+                    continue
+                matched_tracks.add(track_idx)
+                face_ids[face_idx] = self.track_ids[track_idx]
+
+        # Mettre à jour les pistes existantes
+        ids, positions, missed = [], [], []
+        for track_idx, track_id in enumerate(self.track_ids):
+            if track_idx in matched_tracks:
+                face_idx = face_ids.index(track_id)
+                ids.append(track_id)
+                positions.append(centroids[face_idx])
+                missed.append(0)
+            elif self.track_missed[track_idx] < self.max_missed:
+                ids.append(track_id)
+                positions.append(self.track_centroids[track_idx])
+                missed.append(self.track_missed[track_idx] + 1)
+
+        # Créer les nouvelles pistes
+        for face_idx in range(n_faces):
+            if face_ids[face_idx] == -1:
+                face_ids[face_idx] = self.next_id
+                ids.append(self.next_id)
+                positions.append(centroids[face_idx])
+                missed.append(0)
+                self.next_id += 1
+
+        self.track_ids = ids
+        self.track_centroids = np.array(positions, dtype=np.float32).reshape(-1, 2)
+        self.track_missed = missed
+
+        return face_ids
+
+    def select_driver(self, face_ids: List[int], bboxes: np.ndarray) -> Optional[int]:
+        """
+        Sélectionne le conducteur parmi les visages de la frame
+
+        Le conducteur précédent est conservé tant que son visage reste dans la
+        zone du siège; sinon le plus grand visage de la zone est retenu.
+
+        Args:
+            face_ids: IDs stables des visages
+            bboxes: Tableau (N, 4) des boîtes normalisées (x1, y1, x2, y2)
+
+        Returns:
+            Index du visage conducteur dans la frame, ou None
+        """
+        if not face_ids:
+            return None
+
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        x1, y1, x2, y2 = self.seat_region
+        centers_x = (bboxes[:, 0] + bboxes[:, 2]) / 2
+        centers_y = (bboxes[:, 1] + bboxes[:, 3]) / 2
+        in_seat = (
+            (centers_x >= x1) & (centers_x <= x2) &
+            (centers_y >= y1) & (centers_y <= y2)
+        )
+
+        if not in_seat.any():
+            return None
+
+        if self.driver_id in face_ids:
+            index = face_ids.index(self.driver_id)
+            if in_seat[index]:
+                return index
+
+        areas = (bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1])
+        index = int(np.argmax(np.where(in_seat, areas, -1.0)))
+        if face_ids[index] != self.driver_id:
+            logger.info(f"Conducteur sélectionné: visage #{face_ids[index]}")
+        self.driver_id = face_ids[index]
+        return index
@@ -0,0 +1,201 @@
+"""
+Traitement d'une frame de la boucle temps réel de SafeWay
+
+Étape commune à la démo (ui/cli_demo.py) et au test d'endurance
+(soak_test.py): anneau des clips, contrôle qualité, filtrage des frames
+inchangées, détecteurs (YOLO une frame analysée sur YOLO_FRAME_INTERVAL),
+analyse de l'état, alertes et annotations de l'overlay. Le test
+d'endurance mesure ainsi les allocations de la boucle de la démo.
+"""
+from typing import Dict, Optional
+import numpy as np
+from config.settings import (
+    QUALITY_GATE_ENABLED,
+    CHANGE_GATE_ENABLED,
+    YOLO_FRAME_INTERVAL
+)
+from core.logger import setup_logger
+from core.overlay import OverlayCompositor
+
+logger = setup_logger("FramePipeline")
+
+class FramePipeline:
+    """
+    Détections, analyse et annotations d'une frame, avec les résultats réutilisés d'une frame à l'autre
+    """
+
+    def __init__(
+        self,
+        face_detector,
+        hand_detector,
+        yolo_detector,
+        alert_manager=None,
+        clip_recorder=None,
+        yolo_interval: int = YOLO_FRAME_INTERVAL
+    ):
+        """
+        Initialise l'étape de traitement
+
+        Args:
+            face_detector: FaceDetector initialisé
+            hand_detector: HandDetector initialisé
+            yolo_detector: YOLODetector avec modèle chargé
+            alert_manager: AlertManager des alertes du conducteur (None = alertes non déclenchées)
+            clip_recorder: ClipRecorder alimenté à chaque frame (None = pas de clips)
+            yolo_interval: Exécuter YOLO une frame analysée sur N
+        """
+        from ai.state_analyzer import StateAnalyzerPool
+        from core.frame_gate import ChangeGate, FrameQualityGate
+
+        self.face_detector = face_detector
+        self.hand_detector = hand_detector
+        self.yolo_detector = yolo_detector
+        self.alert_manager = alert_manager
+        self.clip_recorder = clip_recorder
+        self.yolo_interval = yolo_interval
+        # Un analyseur par occupant, seules les alertes du conducteur sont remontées
+        self.state_analyzer = StateAnalyzerPool()
+        # Frames inexploitables (nuit, éblouissement, flou): détecteurs non lancés, état inconnu
+        self.quality_gate = FrameQualityGate() if QUALITY_GATE_ENABLED else None
+        # Frames inchangées: résultats des détecteurs réutilisés (au plus CHANGE_GATE_MAX_STALENESS secondes)
+        self.change_gate = ChangeGate() if CHANGE_GATE_ENABLED else None
+
+        self.face_results: Dict = {'face_detected': False}
+        self.hand_results: Dict = {'hands_detected': False}
+        self.yolo_results: Dict = {'phone_detected': False}
+        self.frames = 0
+        self.detections = 0
+        self.alerts = 0
+
+    def _detect(self, frame: np.ndarray, timestamp: float):
+        """Met à jour les résultats des détecteurs (ou les réutilise si la frame est inchangée)"""
+        quality = self.quality_gate.assess(frame) if self.quality_gate is not None else None
+        if quality is not None and not quality['usable']:
+            self.face_results = {'face_detected': False, 'frame_usable': False, 'quality': quality}
+            self.hand_results = {'hands_detected': False}
+            self.yolo_results = {'phone_detected': False}
+            if self.change_gate is not None:
+                # La prochaine frame exploitable est analysée
+                self.change_gate.reset()
+        elif self.change_gate is None or self.change_gate.should_process(frame, timestamp):
+            self.detections += 1
+            self.face_results = self.face_detector.detect(frame)
+            self.hand_results = self.hand_detector.detect(frame)
+            # YOLO moins fréquent pour meilleure fluidité
+            if self.detections % self.yolo_interval == 0:
+                self.yolo_results = self.yolo_detector.detect(frame)
+        # Sinon: frame inchangée, résultats précédents réutilisés
+
+    def process(self, frame: np.ndarray, timestamp: float, overlay: Optional[OverlayCompositor] = None) -> Dict:
+        """
+        Traite une frame
+
+        Args:
+            frame: Image BGR
+            timestamp: Instant de capture en secondes (les durées des règles restent exactes)
+            overlay: Compositeur de la frame, complété avec les annotations et les alertes
+
+        Returns:
+            Dictionnaire avec 'face', 'hands', 'yolo' (résultats utilisés pour
+            cette frame) et 'analysis' (état et alertes du conducteur)
+        """
+        self.frames += 1
+        if self.clip_recorder is not None:
+            self.clip_recorder.push(frame, timestamp)
+
+        try:
+            self._detect(frame, timestamp)
+            analysis = self.state_analyzer.analyze(self.face_results, self.hand_results, self.yolo_results,
+                                                   timestamp)
+        except Exception as e:
+            logger.error(f"Erreur lors des détections: {e}", exc_info=True)
+            if self.change_gate is not None:
+                # Ne pas réutiliser des résultats vides sur les frames suivantes
+                self.change_gate.reset()
+            # Continuer avec des résultats vides
+            self.face_results = {'face_detected': False}
+            self.hand_results = {'hands_detected': False}
+            self.yolo_results = {'phone_detected': False}
+            analysis = {'state': {}, 'alerts': []}
+
+        result = {
+            'face': self.face_results,
+            'hands': self.hand_results,
+            'yolo': self.yolo_results,
+            'analysis': analysis
+        }
+        if overlay is not None:
+            self._annotate(overlay, result, frame)
+
+        # Alertes par-dessus les annotations
+        for alert in analysis['alerts']:
+            self.alerts += 1
+            if self.alert_manager is not None:
+                self.alert_manager.trigger_alert(alert, frame, overlay, timestamp)
+        return result
+
+    def _annotate(self, overlay: OverlayCompositor, result: Dict, frame: np.ndarray):
+        """Ajoute les annotations des détecteurs et l'état à l'overlay"""
+        face_results = result['face']
+        yolo_results = result['yolo']
+        analysis = result['analysis']
+
+        # Dessiner les landmarks du visage
+        if face_results['face_detected']:
+            self.face_detector.add_overlay(overlay, face_results, frame.shape)
+
+            # Afficher les informations
+            info_y = 30
+            overlay.add_label(f"Visage: Detecte ({face_results.get('num_faces', 1)} occupant(s))", (10, info_y),
+                              0.5, (0, 255, 0), 2)
+            info_y += 25
+
+            eye_status = "Ouverts" if face_results['eyes_open'] else "Fermes"
+            eye_color = (0, 255, 0) if face_results['eyes_open'] else (0, 0, 255)
+            overlay.add_label(f"Yeux: {eye_status}", (10, info_y), 0.5, eye_color, 2)
+            info_y += 25
+
+            mouth_status = "Ouverte" if face_results['mouth_open'] else "Fermee"
+            overlay.add_label(f"Bouche: {mouth_status}", (10, info_y), 0.5, (255, 255, 0), 2)
+            info_y += 25
+
+            overlay.add_label(f"Tete: {face_results['head_position']}", (10, info_y),
+                              0.5, (255, 255, 255), 2)
+        else:
+            overlay.add_label("Visage: Non detecte", (10, 30), 0.5, (0, 0, 255), 2)
+
+        # Dessiner les détections YOLO
+        if yolo_results['phone_detected']:
+            self.yolo_detector.add_overlay(overlay, yolo_results)
+
+        # Afficher l'état
+        state = analysis['state']
+        state_y = frame.shape[0] - 100
+        if analysis.get('unknown'):
+            overlay.add_label(f"ETAT: INCONNU (image inexploitable: {face_results['quality']['reason']})",
+                              (10, state_y), 0.7, (0, 255, 255), 2)
+        elif state.get('fatigue_detected'):
+            overlay.add_label("ETAT: FATIGUE DETECTEE", (10, state_y), 0.7, (0, 0, 255), 2)
+        elif state.get('distraction_detected'):
+            overlay.add_label("ETAT: DISTRACTION DETECTEE", (10, state_y), 0.7, (0, 165, 255), 2)
+        elif state.get('phone_detected'):
+            overlay.add_label("ETAT: TELEPHONE DETECTE", (10, state_y), 0.7, (0, 0, 255), 2)
+        elif state.get('driver_absent'):
+            overlay.add_label("ETAT: CONDUCTEUR ABSENT", (10, state_y), 0.7, (0, 0, 255), 2)
+        else:
+            overlay.add_label("ETAT: NORMAL", (10, state_y), 0.7, (0, 255, 0), 2)
+
+        # Compteur de frames (texte dynamique non mis en cache)
+        overlay.add_text(f"Frame: {self.frames}", (10, frame.shape[0] - 20), 0.5, (255, 255, 255), 1)
+
+    def log_stats(self):
+        """Résume l'effet des contrôles de frames dans les logs"""
+        if self.quality_gate is not None:
+            logger.info(f"Frames inexploitables (état inconnu): {self.quality_gate.reject_ratio:.0%}")
+        if self.change_gate is not None:
+            logger.info(f"Frames inchangées (détecteurs évités): {self.change_gate.skip_ratio:.0%}")
+
+    def release(self):
+        """Libère les détecteurs MediaPipe"""
+        self.face_detector.release()
+        self.hand_detector.release()
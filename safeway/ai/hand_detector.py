@@ -3,9 +3,10 @@ Module de détection des mains pour SafeWay
 """
 import cv2
 import numpy as np
-import mediapipe as mp
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+from config.settings import FRAME_WIDTH, FRAME_HEIGHT
 from core.logger import setup_logger
+from core.overlay import OverlayCompositor
 
 logger = setup_logger("HandDetector")
 
@@ -16,6 +17,9 @@ class HandDetector:
     
     def __init__(self):
         """Initialise le détecteur de mains MediaPipe"""
+        # Import différé: mediapipe n'est chargé qu'à la création du détecteur
+        import mediapipe as mp
+        
         self.mp_hands = mp.solutions.hands
         self.hands = self.mp_hands.Hands(
             static_image_mode=False,
@@ -25,6 +29,8 @@ class HandDetector:
         )
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
+        # Connexions des mains sous forme de segments indexés (pour le compositeur)
+        self.HAND_SEGMENTS = np.array(sorted(self.mp_hands.HAND_CONNECTIONS), dtype=np.int32)
     
     def detect(self, frame: np.ndarray) -> Dict:
         """
@@ -34,14 +40,15 @@ class HandDetector:
             frame: Image BGR (OpenCV)
             
         Returns:
-            Dictionnaire avec les résultats de détection
+            Dictionnaire avec les résultats de détection ('hands_landmarks':
+            tableau (mains, 21, 2) de coordonnées normalisées)
         """
         results = {
             'hands_detected': False,
             'num_hands': 0,
             'left_hand_detected': False,
             'right_hand_detected': False,
-            'hands_landmarks': []
+            'hands_landmarks': np.empty((0, 21, 2), dtype=np.float32)
         }
         
         if frame is None:
@@ -58,7 +65,11 @@ class HandDetector:
         
         results['hands_detected'] = True
         results['num_hands'] = len(hand_results.multi_hand_landmarks)
-        results['hands_landmarks'] = hand_results.multi_hand_landmarks
+        # Copie en tableau: les protobufs MediaPipe ne sont pas conservés dans les résultats
+        results['hands_landmarks'] = np.array(
+            [[(landmark.x, landmark.y) for landmark in hand.landmark] for hand in hand_results.multi_hand_landmarks],
+            dtype=np.float32
+        )
         
         # Identifier les mains gauche et droite
         if hand_results.multi_handedness:
@@ -71,6 +82,25 @@ class HandDetector:
         
         return results
     
+    def add_overlay(self, overlay: OverlayCompositor, results: Dict, frame_shape: Tuple[int, ...]):
+        """
+        Ajoute le squelette des mains au compositeur
+        
+        Args:
+            overlay: Compositeur d'annotations de la frame
+            results: Résultats de détection
+            frame_shape: Dimensions de l'image
+        """
+        if not results['hands_detected']:
+            return
+        
+        h, w = frame_shape[:2]
+        scale = np.array([w, h], dtype=np.float32)
+        for hand_landmarks in results['hands_landmarks']:
+            points = (hand_landmarks * scale).astype(np.int32)
+            overlay.add_lines(points[self.HAND_SEGMENTS], (255, 255, 255), 2)
+            overlay.add_circles(points, 3, (0, 0, 255), -1)
+    
     def draw_landmarks(self, frame: np.ndarray, results: Dict) -> np.ndarray:
         """
         Dessine les landmarks des mains sur l'image
@@ -85,19 +115,9 @@ class HandDetector:
         if not results['hands_detected']:
             return frame
         
-        annotated_frame = frame.copy()
-        
-        # Dessiner les landmarks des mains
-        for hand_landmarks in results['hands_landmarks']:
-            self.mp_drawing.draw_landmarks(
-                annotated_frame,
-                hand_landmarks,
-                self.mp_hands.HAND_CONNECTIONS,
-                self.mp_drawing_styles.get_default_hand_landmarks_style(),
-                self.mp_drawing_styles.get_default_hand_connections_style()
-            )
-        
-        return annotated_frame
+        overlay = OverlayCompositor()
+        self.add_overlay(overlay, results, frame.shape)
+        return overlay.render(frame)
     
     def is_hand_on_steering_wheel(self, results: Dict) -> bool:
         """
@@ -112,6 +132,15 @@ class HandDetector:
         """
         return results['hands_detected']
     
+    def warmup(self, frame_shape: Tuple[int, int, int] = (FRAME_HEIGHT, FRAME_WIDTH, 3)):
+        """
+        Exécute une inférence sur une image noire pour initialiser le graphe MediaPipe
+        
+        Args:
+            frame_shape: Dimensions des frames attendues
+        """
+        self.detect(np.zeros(frame_shape, dtype=np.uint8))
+    
     def release(self):
         """Libère les ressources"""
         if hasattr(self, 'hands'):
@@ -0,0 +1,171 @@
+"""
+Client du démon d'inférence SafeWay
+
+Bibliothèque légère (socket + numpy) pour les outils qui veulent analyser
+des frames sans charger de modèle: les frames sont envoyées au démon résident
+(ai/inference_daemon.py) sur une socket Unix, qui renvoie les résultats.
+
+Protocole (dans les deux sens): en-tête binaire '<4sII' (magic, taille du
+JSON, taille des données brutes), puis le JSON, puis les données brutes
+(pixels de la frame pour une requête 'analyze'). Les tailles annoncées sont
+bornées (INFERENCE_MAX_HEADER_BYTES, INFERENCE_MAX_PAYLOAD_BYTES): un en-tête
+corrompu ne provoque pas d'allocation démesurée.
+"""
+import json
+import socket
+import struct
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+import numpy as np
+from config.settings import INFERENCE_SOCKET_PATH, INFERENCE_MAX_HEADER_BYTES, INFERENCE_MAX_PAYLOAD_BYTES
+
+MAGIC = b"SWI1"
+_HEADER = struct.Struct("<4sII")
+
+def send_message(sock: socket.socket, header: Dict, payload: bytes = b""):
+    """
+    Envoie un message (en-tête JSON + données brutes)
+
+    Args:
+        sock: Socket connectée
+        header: En-tête JSON
+        payload: Données brutes
+
+    Raises:
+        ValueError: Si le message dépasse les tailles acceptées par recv_message
+    """
+    meta = json.dumps(header).encode("utf-8")
+    if len(meta) > INFERENCE_MAX_HEADER_BYTES or len(payload) > INFERENCE_MAX_PAYLOAD_BYTES:
+        raise ValueError(f"Message trop volumineux: {len(meta)} octets de JSON, {len(payload)} octets de données")
+    sock.sendall(_HEADER.pack(MAGIC, len(meta), len(payload)) + meta)
+    if payload:
+        sock.sendall(payload)
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Lit exactement size octets (ConnectionError si la connexion est fermée)"""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError("Connexion fermée")
+        received += n
+    return bytes(buffer)
+
+def recv_message(sock: socket.socket) -> Tuple[Dict, bytes]:
+    """
+    Reçoit un message
+
+    Args:
+        sock: Socket connectée
+
+    Returns:
+        Tuple (en-tête JSON, données brutes)
+
+    Raises:
+        ConnectionError: Si la connexion est fermée, ou si le message est
+            invalide ou trop volumineux (le flux ne peut plus être relu)
+    """
+    magic, meta_len, payload_len = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if magic != MAGIC:
+        raise ConnectionError("Message invalide (protocole SafeWay attendu)")
+    if meta_len > INFERENCE_MAX_HEADER_BYTES or payload_len > INFERENCE_MAX_PAYLOAD_BYTES:
+        raise ConnectionError(f"Message trop volumineux: {meta_len} octets de JSON, {payload_len} octets de données")
+    header = json.loads(_recv_exact(sock, meta_len).decode("utf-8"))
+    payload = _recv_exact(sock, payload_len) if payload_len else b""
+    return header, payload
+
+class InferenceClient:
+    """
+    Client du démon d'inférence (une connexion persistante)
+    """
+
+    def __init__(
+        self,
+        socket_path: Union[str, Path] = INFERENCE_SOCKET_PATH,
+        session: str = "default",
+        timeout: Optional[float] = 10.0
+    ):
+        """
+        Initialise le client (la connexion est ouverte au premier appel)
+
+        Args:
+            socket_path: Socket Unix du démon
+            session: Identifiant du flux vidéo (chaque session a son propre historique d'analyse)
+            timeout: Délai maximum d'une requête en secondes
+        """
+        self.socket_path = str(socket_path)
+        self.session = session
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+
+    def _request(self, header: Dict, payload: bytes = b"") -> Dict:
+        """Envoie une requête et retourne la réponse (reconnexion si nécessaire)"""
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(self.timeout)
+            self._sock.connect(self.socket_path)
+        header['session'] = self.session
+        try:
+            send_message(self._sock, header, payload)
+            response, _ = recv_message(self._sock)
+        except (OSError, ConnectionError):
+            self.close()
+            raise
+        if 'error' in response:
+            raise RuntimeError(f"Démon d'inférence: {response['error']}")
+        return response
+
+    def analyze(
+        self,
+        frame: np.ndarray,
+        timestamp: Optional[float] = None,
+        run_yolo: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Analyse une frame
+
+        Args:
+            frame: Image BGR (uint8)
+            timestamp: Instant de capture en secondes (défaut: horloge du démon)
+            run_yolo: Exécuter YOLO sur cette frame (sinon, réutiliser le dernier résultat de la session)
+
+        Returns:
+            Dictionnaire avec 'face', 'hands', 'yolo' et 'analysis' (mêmes clés que
+            les détecteurs et StateAnalyzerPool, sans les objets MediaPipe)
+        """
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        header = {
+            'op': 'analyze',
+            'shape': list(frame.shape),
+            'timestamp': timestamp,
+            'run_yolo': run_yolo
+        }
+        return self._request(header, frame.tobytes())
+
+    def reset(self) -> Dict:
+        """Réinitialise l'historique d'analyse de la session"""
+        return self._request({'op': 'reset'})
+
+    def ping(self) -> Dict:
+        """Vérifie que le démon répond"""
+        return self._request({'op': 'ping'})
+
+    def stats(self) -> Dict:
+        """Statistiques du démon (sessions, frames traitées, temps moyen)"""
+        return self._request({'op': 'stats'})
+
+    def close(self):
+        """Ferme la connexion"""
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+    def __enter__(self) -> "InferenceClient":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
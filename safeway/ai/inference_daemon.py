@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Démon d'inférence résident de SafeWay
+
+Charge une seule fois les détecteurs (MediaPipe, YOLO) et garde l'analyse
+d'état en mémoire, puis traite les frames reçues sur une socket Unix
+(protocole: ai/inference_client.py). Les outils courts démarrent ainsi en
+quelques millisecondes et plusieurs consommateurs partagent les mêmes
+modèles.
+
+Le modèle YOLO (sans état) est partagé par toutes les sessions; chaque
+session (un flux vidéo) a ses propres détecteurs MediaPipe, son suivi des
+visages et son historique d'analyse, libérés après une période d'inactivité.
+Une session de réserve, détecteurs déjà préchauffés, est tenue prête: un
+nouveau client la reçoit sans attendre l'initialisation de MediaPipe.
+"""
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+import numpy as np
+
+# Ajouter le répertoire parent au path pour les imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.settings import (
+    INFERENCE_SOCKET_PATH,
+    INFERENCE_SESSION_TIMEOUT,
+    INFERENCE_WARM_SPARE,
+    QUALITY_GATE_ENABLED
+)
+from ai.inference_client import send_message, recv_message
+from core.logger import setup_logger
+from core.utils import get_monotonic_timestamp
+
+logger = setup_logger("InferenceDaemon")
+
+# Landmarks complets non transmis aux clients (réponses compactes)
+LANDMARK_KEYS = ('landmarks', 'hands_landmarks')
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Convertit des résultats de détection en valeurs JSON
+
+    Les tableaux numpy deviennent des listes; les landmarks (LANDMARK_KEYS)
+    et les objets non sérialisables sont retirés.
+
+    Args:
+        value: Résultat de détection ou d'analyse
+
+    Returns:
+        Valeur sérialisable (None pour un objet non sérialisable)
+    """
+    if isinstance(value, dict):
+        converted = {}
+        for key, item in value.items():
+            if key in LANDMARK_KEYS:
+                continue
+            item = to_jsonable(item)
+            if item is not None or value[key] is None:
+                converted[str(key)] = item
+        return converted
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return None
+
+class _Session:
+    """Détecteurs (préchauffés) et analyse d'un flux vidéo"""
+
+    def __init__(self):
+        from ai.face_detector import FaceDetector
+        from ai.hand_detector import HandDetector
+        from ai.state_analyzer import StateAnalyzerPool
+        from core.frame_gate import FrameQualityGate
+
+        self.quality_gate = FrameQualityGate() if QUALITY_GATE_ENABLED else None
+        self.face_detector = FaceDetector()
+        self.hand_detector = HandDetector()
+        self.face_detector.warmup()
+        self.hand_detector.warmup()
+        self.state_analyzer = StateAnalyzerPool()
+        self.last_yolo_results = {'phone_detected': False}
+        self.last_used = time.monotonic()
+        # Une seule requête à la fois par session (détecteurs et historique avec état)
+        self.lock = threading.Lock()
+
+    def release(self):
+        self.face_detector.release()
+        self.hand_detector.release()
+
+class InferenceDaemon:
+    """
+    Modèles résidents et sessions d'analyse partagés par les clients
+    """
+
+    def __init__(self, session_timeout: float = INFERENCE_SESSION_TIMEOUT, warm_spare: bool = INFERENCE_WARM_SPARE):
+        """
+        Charge et préchauffe les modèles
+
+        Args:
+            session_timeout: Secondes d'inactivité avant de libérer une session
+            warm_spare: Tenir une session préchauffée prête pour le prochain client
+        """
+        from ai.yolo_detector import YOLODetector
+
+        self.session_timeout = session_timeout
+        self.yolo_detector = YOLODetector()
+        if not self.yolo_detector.load_model():
+            raise RuntimeError("Impossible de charger le modèle YOLO")
+        self.yolo_detector.warmup()
+        self._yolo_lock = threading.Lock()
+        self.sessions: Dict[str, _Session] = {}
+        self._sessions_lock = threading.Lock()
+        # Session de réserve, reconstruite en arrière-plan dès qu'elle est attribuée
+        self.warm_spare = warm_spare
+        self._spare: Optional[_Session] = _Session() if warm_spare else None
+        self._spare_lock = threading.Lock()
+        self._refilling = False
+        self.start_time = time.monotonic()
+        self.frames = 0
+        self.total_time = 0.0
+
+    def _session(self, name: str) -> _Session:
+        """Retourne la session d'un flux (créée au premier appel) et libère les sessions inactives"""
+        now = time.monotonic()
+        with self._sessions_lock:
+            idle = [key for key, session in self.sessions.items()
+                    if key != name and now - session.last_used > self.session_timeout]
+            expired = [self.sessions.pop(key) for key in idle]
+            session = self.sessions.get(name)
+            if session is not None:
+                session.last_used = now
+        for key, old in zip(idle, expired):
+            logger.info(f"Session '{key}' libérée (inactive)")
+            old.release()
+        if session is not None:
+            return session
+
+        # Création hors du verrou: les autres clients ne l'attendent pas
+        created = self._take_spare()
+        with self._sessions_lock:
+            session = self.sessions.get(name)
+            if session is None:
+                logger.info(f"Nouvelle session '{name}'")
+                session = self.sessions[name] = created
+                created = None
+            session.last_used = now
+        if created is not None:
+            # Session créée en même temps par une autre requête du même flux
+            self._store_spare(created)
+        return session
+
+    def _take_spare(self) -> _Session:
+        """Retourne la session de réserve (ou une nouvelle session) et relance sa reconstruction"""
+        with self._spare_lock:
+            spare, self._spare = self._spare, None
+            refill = self.warm_spare and not self._refilling
+            self._refilling = self._refilling or refill
+        if refill:
+            threading.Thread(target=self._refill_spare, name="SpareSession", daemon=True).start()
+        return spare if spare is not None else _Session()
+
+    def _refill_spare(self):
+        """Reconstruit la session de réserve (thread d'arrière-plan)"""
+        try:
+            self._store_spare(_Session())
+        except Exception as e:
+            logger.error(f"Session de réserve non créée: {e}")
+        finally:
+            with self._spare_lock:
+                self._refilling = False
+
+    def _store_spare(self, session: _Session):
+        """Garde une session inutilisée en réserve (ou la libère si la réserve est pleine)"""
+        with self._spare_lock:
+            if self.warm_spare and self._spare is None:
+                self._spare, session = session, None
+        if session is not None:
+            session.release()
+
+    def analyze(self, session_name: str, frame: np.ndarray, timestamp: Optional[float], run_yolo: bool) -> Dict:
+        """
+        Détections et analyse d'une frame
+
+        Args:
+            session_name: Flux vidéo de la frame
+            frame: Image BGR
+            timestamp: Instant de capture (défaut: horloge du démon)
+            run_yolo: Exécuter YOLO (sinon, dernier résultat de la session)
+
+        Returns:
+            Résultats sérialisables ('face', 'hands', 'yolo', 'analysis')
+        """
+        start = time.perf_counter()
+        session = self._session(session_name)
+        if timestamp is None:
+            timestamp = get_monotonic_timestamp()
+        with session.lock:
+            quality = session.quality_gate.assess(frame) if session.quality_gate is not None else None
+            if quality is not None and not quality['usable']:
+                # Frame inexploitable: état inconnu, détecteurs non exécutés
+                face_results = {'face_detected': False, 'frame_usable': False, 'quality': quality}
+                hand_results = {'hands_detected': False}
+                session.last_yolo_results = {'phone_detected': False}
+            else:
+                face_results = session.face_detector.detect(frame)
+                hand_results = session.hand_detector.detect(frame)
+            if run_yolo and (quality is None or quality['usable']):
+                with self._yolo_lock:
+                    session.last_yolo_results = self.yolo_detector.detect(frame)
+            yolo_results = session.last_yolo_results
+            analysis = session.state_analyzer.analyze(face_results, hand_results, yolo_results, timestamp)
+            response = to_jsonable({
+                'face': face_results,
+                'hands': hand_results,
+                'yolo': yolo_results,
+                'analysis': analysis
+            })
+        self.frames += 1
+        self.total_time += time.perf_counter() - start
+        return response
+
+    def reset(self, session_name: str):
+        """Oublie l'historique d'analyse d'une session"""
+        with self._sessions_lock:
+            session = self.sessions.pop(session_name, None)
+        if session is not None:
+            session.release()
+
+    def stats(self) -> Dict:
+        """Statistiques du démon"""
+        return {
+            'uptime': time.monotonic() - self.start_time,
+            'sessions': sorted(self.sessions),
+            'spare': self._spare is not None,
+            'frames': self.frames,
+            'mean_ms': self.total_time * 1000 / self.frames if self.frames else 0.0
+        }
+
+    def handle(self, header: Dict, payload: bytes) -> Dict:
+        """
+        Traite une requête client
+
+        Args:
+            header: En-tête JSON de la requête
+            payload: Données brutes (pixels de la frame)
+
+        Returns:
+            Réponse JSON
+        """
+        op = header.get('op')
+        session_name = str(header.get('session', 'default'))
+        if op == 'analyze':
+            shape = tuple(header['shape'])
+            if int(np.prod(shape)) != len(payload):
+                return {'error': f"Taille de frame incohérente: {shape} pour {len(payload)} octets"}
+            frame = np.frombuffer(payload, dtype=np.uint8).reshape(shape)
+            return self.analyze(session_name, frame, header.get('timestamp'), header.get('run_yolo', True))
+        if op == 'reset':
+            self.reset(session_name)
+            return {'ok': True}
+        if op == 'ping':
+            return {'ok': True, 'pid': os.getpid()}
+        if op == 'stats':
+            return self.stats()
+        return {'error': f"Opération inconnue: {op}"}
+
+    def release(self):
+        """Libère toutes les sessions"""
+        with self._sessions_lock:
+            sessions, self.sessions = list(self.sessions.values()), {}
+        with self._spare_lock:
+            self.warm_spare = False
+            if self._spare is not None:
+                sessions.append(self._spare)
+                self._spare = None
+        for session in sessions:
+            session.release()
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Une connexion client: requêtes traitées en séquence jusqu'à la déconnexion"""
+
+    def handle(self):
+        daemon: InferenceDaemon = self.server.inference
+        while True:
+            try:
+                header, payload = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                response = daemon.handle(header, payload)
+            except Exception as e:
+                logger.error(f"Erreur lors du traitement d'une requête: {e}", exc_info=True)
+                response = {'error': str(e)}
+            try:
+                try:
+                    send_message(self.request, response)
+                except ValueError as e:
+                    logger.error(f"Réponse non envoyée: {e}")
+                    send_message(self.request, {'error': str(e)})
+            except OSError:
+                return
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(socket_path: Path = INFERENCE_SOCKET_PATH, session_timeout: float = INFERENCE_SESSION_TIMEOUT):
+    """
+    Démarre le démon et traite les requêtes jusqu'à l'interruption
+
+    Args:
+        socket_path: Socket Unix d'écoute
+        session_timeout: Secondes d'inactivité avant de libérer une session
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        logger.error("Sockets Unix non disponibles sur ce système")
+        return False
+    socket_path = Path(socket_path)
+    if socket_path.exists():
+        # Socket d'un démon encore actif, ou restée après un arrêt brutal
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(socket_path))
+            logger.error(f"Un démon écoute déjà sur {socket_path}")
+            return False
+        except OSError:
+            socket_path.unlink()
+        finally:
+            probe.close()
+
+    logger.info("Chargement des modèles...")
+    daemon = InferenceDaemon(session_timeout)
+    server = _Server(str(socket_path), _RequestHandler)
+    server.inference = daemon
+    logger.info(f"Démon d'inférence prêt sur {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Arrêt du démon")
+    finally:
+        server.server_close()
+        daemon.release()
+        socket_path.unlink(missing_ok=True)
+    return True
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Démon d'inférence SafeWay (modèles résidents)")
+    parser.add_argument("--socket", type=str, default=str(INFERENCE_SOCKET_PATH),
+                       help="Chemin de la socket Unix")
+    parser.add_argument("--session-timeout", type=float, default=INFERENCE_SESSION_TIMEOUT,
+                       help="Secondes d'inactivité avant de libérer une session")
+    args = parser.parse_args()
+    sys.exit(0 if serve(Path(args.socket), args.session_timeout) else 1)
@@ -0,0 +1,445 @@
+"""
+Moteur de règles déclaratif pour l'analyse de l'état du conducteur
+
+Les règles (fatigue, bâillements, clignements, distraction, absence,
+téléphone...) sont décrites par des dictionnaires, puis compilées une seule
+fois en évaluateurs. Les fenêtres intermédiaires (séries, compteurs
+d'événements) sont partagées entre les règles qui les utilisent, et une
+règle n'est réévaluée que si ses entrées ont changé ou si elle dépend du
+temps écoulé.
+"""
+from abc import ABC, abstractmethod
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from config.settings import (
+    EYE_CLOSED_TIME_MS,
+    YAWN_COUNT_THRESHOLD,
+    YAWN_TIME_WINDOW,
+    DISTRACTION_TIME_MS,
+    ABSENCE_TIME_MS,
+    BLINK_RATE_THRESHOLD,
+    HEAD_MOVEMENT_WINDOW,
+    HEAD_MOVEMENT_CHANGES,
+    RULE_WINDOW_MAX_EVENTS
+)
+from core.logger import setup_logger
+from core.utils import EventWindow
+
+logger = setup_logger("RuleEngine")
+
+# Règles par défaut de SafeWay, dans l'ordre d'émission des alertes.
+# Chaque règle met à True la clé 'state' de l'état lorsqu'elle est vérifiée.
+# 'gate': signal qui doit être vrai pour évaluer la règle (l'historique de ses
+# fenêtres n'est mis à jour que sur ces frames).
+DEFAULT_RULES: List[Dict] = [
+    {
+        'state': 'driver_absent',
+        'when': {'kind': 'duration', 'signal': 'face_detected', 'values': [False], 'min_ms': ABSENCE_TIME_MS},
+        'alert': {'type': 'driver_absent', 'message': 'Conducteur absent', 'severity': 'high'}
+    },
+    {
+        'state': 'abnormal_blink_rate',
+        'gate': 'face_detected',
+        'when': {'kind': 'edge_rate', 'signal': 'eyes_open', 'edge': True, 'initial': True,
+                 'maxlen': 30, 'max_rate': BLINK_RATE_THRESHOLD},
+        'alert': {'type': 'fatigue', 'message': 'Taux de clignement anormalement bas', 'severity': 'medium'}
+    },
+    {
+        'state': 'fatigue_detected',
+        'gate': 'face_detected',
+        'when': {'kind': 'duration', 'signal': 'eyes_open', 'values': [False], 'min_ms': EYE_CLOSED_TIME_MS},
+        'alert': {'type': 'fatigue', 'message': 'Somnolence détectée', 'severity': 'high'}
+    },
+    {
+        'state': 'yawn_detected',
+        'gate': 'face_detected',
+        'when': {'kind': 'flag', 'signal': 'mouth_open', 'values': [True]}
+    },
+    {
+        'gate': 'face_detected',
+        'when': {'kind': 'edge_count', 'signal': 'mouth_open', 'edge': True, 'initial': False,
+                 'window_s': YAWN_TIME_WINDOW, 'maxlen': 100, 'min_count': YAWN_COUNT_THRESHOLD},
+        'alert': {'type': 'yawn', 'message': 'Fatigue détectée ({value} bâillements)', 'severity': 'medium'}
+    },
+    {
+        'state': 'excessive_head_movement',
+        'gate': 'face_detected',
+        'when': {'kind': 'changes', 'signal': 'head_position', 'transitions': HEAD_MOVEMENT_WINDOW,
+                 'min_changes': HEAD_MOVEMENT_CHANGES},
+        'alert': {'type': 'distraction', 'message': 'Mouvements de tête excessifs détectés', 'severity': 'medium'}
+    },
+    {
+        'state': 'distraction_detected',
+        'gate': 'face_detected',
+        'when': {'kind': 'duration', 'signal': 'head_position', 'values': ['left', 'right'],
+                 'min_ms': DISTRACTION_TIME_MS},
+        'alert': {'type': 'distraction', 'message': 'Distraction détectée (regard détourné)', 'severity': 'medium'}
+    },
+    {
+        'state': 'phone_detected',
+        'when': {'kind': 'flag', 'signal': 'phone_detected', 'values': [True]},
+        'alert': {'type': 'phone', 'message': 'Téléphone détecté - Danger!', 'severity': 'high'}
+    },
+]
+
+# Signaux utilisables par les règles: nom -> (détecteur qui le fournit, valeur par défaut).
+# Les clés sont celles des résultats de FaceDetector, HandDetector et YOLODetector.
+SIGNALS: Dict[str, Tuple[str, Any]] = {
+    'face_detected': ('face', False),
+    'eyes_open': ('face', True),
+    'left_eye_open': ('face', True),
+    'right_eye_open': ('face', True),
+    'mouth_open': ('face', False),
+    'head_position': ('face', 'center'),
+    'left_ear': ('face', 0.0),
+    'right_ear': ('face', 0.0),
+    'mar': ('face', 0.0),
+    'hands_detected': ('hand', False),
+    'num_hands': ('hand', 0),
+    'left_hand_detected': ('hand', False),
+    'right_hand_detected': ('hand', False),
+    'phone_detected': ('yolo', False),
+    'phone_confidence': ('yolo', 0.0),
+}
+
+# ---------------------------------------------------------------------------
+# Fenêtres intermédiaires partagées
+# ---------------------------------------------------------------------------
+
+class _Primitive:
+    """Fenêtre intermédiaire: 'version' change à chaque modification de son état"""
+
+    def __init__(self, signal: str, gate: Optional[str]):
+        self.signal = signal
+        self.gate = gate
+        self.version = 0
+
+    def reset(self):
+        self.version += 1
+
+class _Run(_Primitive):
+    """Début de la série courante où le signal garde une même valeur active"""
+
+    def __init__(self, signal: str, gate: Optional[str], values: Tuple):
+        super().__init__(signal, gate)
+        self.values = values
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.value = None
+        self.start: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.start is not None
+
+    def update(self, value: Any, t: float):
+        if value in self.values:
+            if self.start is None or value != self.value:
+                self.start = t
+                self.value = value
+                self.version += 1
+        elif self.start is not None:
+            self.start = None
+            self.value = None
+            self.version += 1
+
+class _EdgeWindow(_Primitive):
+    """Événements de transition du signal vers une valeur, sur fenêtre glissante"""
+
+    def __init__(self, signal: str, gate: Optional[str], edge: Any, initial: Any,
+                 window_s: Optional[float], maxlen: Optional[int]):
+        super().__init__(signal, gate)
+        self.edge = edge
+        self.initial = initial
+        # Borne explicite même pour une fenêtre purement temporelle (mémoire constante)
+        self.events = EventWindow(window_s=window_s, maxlen=maxlen or RULE_WINDOW_MAX_EVENTS)
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.previous = self.initial
+        self.events.clear()
+
+    @property
+    def active(self) -> bool:
+        return bool(self.events.timestamps)
+
+    def update(self, value: Any, t: float):
+        if value == self.edge and self.previous != self.edge:
+            self.events.add(t)
+            self.version += 1
+        self.previous = value
+
+class _ChangeCounter(_Primitive):
+    """Nombre de changements de valeur sur les N dernières transitions"""
+
+    def __init__(self, signal: str, gate: Optional[str], transitions: int):
+        super().__init__(signal, gate)
+        self.transitions = transitions
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.previous = None
+        self.flags: deque = deque(maxlen=self.transitions)
+        self.count = 0
+
+    def update(self, value: Any, t: float):
+        if self.previous is not None:
+            changed = value != self.previous
+            removed = self.flags[0] if len(self.flags) == self.flags.maxlen else False
+            self.flags.append(changed)
+            if changed != removed:
+                self.count += changed - removed
+                self.version += 1
+        self.previous = value
+
+class _Latest(_Primitive):
+    """Dernière valeur du signal"""
+
+    def __init__(self, signal: str, gate: Optional[str]):
+        super().__init__(signal, gate)
+        self.reset()
+
+    def reset(self):
+        super().reset()
+        self.value = None
+
+    def update(self, value: Any, t: float):
+        if value != self.value:
+            self.value = value
+            self.version += 1
+
+# ---------------------------------------------------------------------------
+# Règles compilées
+# ---------------------------------------------------------------------------
+
+class _CompiledRule(ABC):
+    """Règle compilée: une condition sur une fenêtre partagée, avec résultat mis en cache"""
+
+    # La règle peut changer de résultat sans nouvelle entrée (durées, expirations)
+    temporal = False
+
+    def __init__(self, spec: Dict, primitive: _Primitive):
+        self.state_key: Optional[str] = spec.get('state')
+        self.gate: Optional[str] = spec.get('gate')
+        self.alert: Optional[Dict] = spec.get('alert')
+        self.primitive = primitive
+        self.reset()
+
+    def reset(self):
+        self.version = -1
+        self.result: Tuple[bool, Any] = (False, None)
+
+    def evaluate(self, t: float) -> Tuple[bool, Any]:
+        """Retourne (vérifiée, valeur), réévaluée seulement si nécessaire"""
+        primitive = self.primitive
+        if primitive.version != self.version or (self.temporal and primitive.active):
+            self.version = primitive.version
+            self.result = self.check(t)
+        return self.result
+
+    @abstractmethod
+    def check(self, t: float) -> Tuple[bool, Any]:
+        """Évalue la condition à l'instant t: (vérifiée, valeur)"""
+
+class _DurationRule(_CompiledRule):
+    temporal = True
+
+    def __init__(self, spec: Dict, primitive: _Run):
+        super().__init__(spec, primitive)
+        self.min_ms = spec['when']['min_ms']
+
+    def check(self, t: float) -> Tuple[bool, Any]:
+        start = self.primitive.start
+        if start is None:
+            return False, None
+        duration_ms = (t - start) * 1000
+        return duration_ms > self.min_ms, duration_ms
+
+class _EdgeCountRule(_CompiledRule):
+    def __init__(self, spec: Dict, primitive: _EdgeWindow):
+        super().__init__(spec, primitive)
+        self.min_count = spec['when']['min_count']
+        self.temporal = spec['when'].get('window_s') is not None
+
+    def check(self, t: float) -> Tuple[bool, Any]:
+        count = self.primitive.events.count(t)
+        return count >= self.min_count, count
+
+class _EdgeRateRule(_CompiledRule):
+    temporal = True
+
+    def __init__(self, spec: Dict, primitive: _EdgeWindow):
+        super().__init__(spec, primitive)
+        self.max_rate = spec['when']['max_rate']
+
+    def check(self, t: float) -> Tuple[bool, Any]:
+        events = self.primitive.events
+        count = events.count(t)
+        if count < 2:
+            return False, None
+        time_window = t - events.oldest()
+        if time_window <= 0:
+            return False, None
+        rate = count / time_window
+        return rate < self.max_rate, rate
+
+class _ChangesRule(_CompiledRule):
+    def __init__(self, spec: Dict, primitive: _ChangeCounter):
+        super().__init__(spec, primitive)
+        self.min_changes = spec['when']['min_changes']
+
+    def check(self, t: float) -> Tuple[bool, Any]:
+        count = self.primitive.count
+        return count >= self.min_changes, count
+
+class _FlagRule(_CompiledRule):
+    def __init__(self, spec: Dict, primitive: _Latest):
+        super().__init__(spec, primitive)
+        self.values = tuple(spec['when']['values'])
+
+    def check(self, t: float) -> Tuple[bool, Any]:
+        value = self.primitive.value
+        return value in self.values, value
+
+# Fabriques: kind -> (clé de la fenêtre partagée, constructeur de fenêtre, règle)
+_RULE_KINDS: Dict[str, Tuple[Callable, Callable, type]] = {
+    'duration': (
+        lambda w, gate: ('run', w['signal'], gate, tuple(w['values'])),
+        lambda w, gate: _Run(w['signal'], gate, tuple(w['values'])),
+        _DurationRule
+    ),
+    'edge_count': (
+        lambda w, gate: ('edge', w['signal'], gate, w['edge'], w.get('initial'), w.get('window_s'), w.get('maxlen')),
+        lambda w, gate: _EdgeWindow(w['signal'], gate, w['edge'], w.get('initial'), w.get('window_s'), w.get('maxlen')),
+        _EdgeCountRule
+    ),
+    'edge_rate': (
+        lambda w, gate: ('edge', w['signal'], gate, w['edge'], w.get('initial'), w.get('window_s'), w.get('maxlen')),
+        lambda w, gate: _EdgeWindow(w['signal'], gate, w['edge'], w.get('initial'), w.get('window_s'), w.get('maxlen')),
+        _EdgeRateRule
+    ),
+    'changes': (
+        lambda w, gate: ('changes', w['signal'], gate, w['transitions']),
+        lambda w, gate: _ChangeCounter(w['signal'], gate, w['transitions']),
+        _ChangesRule
+    ),
+    'flag': (
+        lambda w, gate: ('latest', w['signal'], gate),
+        lambda w, gate: _Latest(w['signal'], gate),
+        _FlagRule
+    ),
+}
+
+class RuleEngine:
+    """
+    Évaluateur compilé d'un ensemble de règles déclaratives
+    """
+
+    def __init__(self, rules: Optional[List[Dict]] = None):
+        """
+        Compile les règles
+
+        Args:
+            rules: Spécifications des règles (défaut: DEFAULT_RULES)
+        """
+        self.specs = DEFAULT_RULES if rules is None else rules
+        self.primitives: List[_Primitive] = []
+        self.rules: List[_CompiledRule] = []
+        self._compile()
+
+    def _compile(self):
+        """Construit les fenêtres partagées et les évaluateurs de règles"""
+        shared: Dict[Tuple, _Primitive] = {}
+        for spec in self.specs:
+            when = spec['when']
+            if when['kind'] not in _RULE_KINDS:
+                raise ValueError(f"Type de règle inconnu: {when['kind']}")
+            make_key, make_primitive, rule_class = _RULE_KINDS[when['kind']]
+            gate = spec.get('gate')
+            for signal in (when['signal'], gate):
+                if signal is not None and signal not in SIGNALS:
+                    raise ValueError(f"Signal inconnu: {signal} (disponibles: {', '.join(SIGNALS)})")
+            key = make_key(when, gate)
+            if key not in shared:
+                shared[key] = make_primitive(when, gate)
+                self.primitives.append(shared[key])
+            self.rules.append(rule_class(spec, shared[key]))
+
+        # Signaux nécessaires, pour n'extraire que les entrées utiles
+        self.signals = sorted({p.signal for p in self.primitives} | {p.gate for p in self.primitives if p.gate})
+        self.state_keys = [rule.state_key for rule in self.rules if rule.state_key]
+        logger.debug(f"{len(self.rules)} règles compilées ({len(self.primitives)} fenêtres partagées)")
+
+    def reset(self):
+        """Réinitialise l'historique de toutes les fenêtres"""
+        for primitive in self.primitives:
+            primitive.reset()
+        for rule in self.rules:
+            rule.reset()
+
+    def evaluate(self, inputs: Dict[str, Any], t: float, state: Dict[str, bool]) -> List[Dict]:
+        """
+        Met à jour les fenêtres et évalue les règles pour une frame
+
+        Args:
+            inputs: Valeurs des signaux pour cette frame
+            t: Instant de la frame (secondes)
+            state: État à compléter (clés des règles vérifiées mises à True)
+
+        Returns:
+            Liste des alertes émises, dans l'ordre des règles
+        """
+        for primitive in self.primitives:
+            if primitive.gate is None or inputs[primitive.gate]:
+                primitive.update(inputs[primitive.signal], t)
+
+        alerts = []
+        for rule in self.rules:
+            if rule.gate is not None and not inputs[rule.gate]:
+                continue
+            matched, value = rule.evaluate(t)
+            if not matched:
+                continue
+            if rule.state_key:
+                state[rule.state_key] = True
+            if rule.alert:
+                alert = dict(rule.alert)
+                alert['message'] = alert['message'].format(value=value)
+                alerts.append(alert)
+        return alerts
+
+def load_rules(path: Union[str, Path]) -> List[Dict]:
+    """
+    Charge des règles de flotte depuis un fichier YAML (liste de règles)
+
+    Les règles chargées remplacent DEFAULT_RULES; un élément 'include_defaults: true'
+    en tête de liste permet de les ajouter aux règles par défaut. Les règles sont
+    compilées au chargement: un type ou un signal inconnu (voir SIGNALS) est
+    signalé ici plutôt qu'à l'analyse de chaque frame.
+
+    Args:
+        path: Chemin du fichier YAML
+
+    Returns:
+        Spécifications des règles
+
+    Raises:
+        ValueError: Si une règle est invalide
+    """
+    import yaml
+
+    with open(path, encoding="utf-8") as f:
+        rules = yaml.safe_load(f) or []
+    if rules and rules[0] == {'include_defaults': True}:
+        rules = DEFAULT_RULES + rules[1:]
+    try:
+        RuleEngine(rules)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Règles invalides dans {path}: {e}") from e
+    logger.info(f"{len(rules)} règles chargées depuis {path}")
+    return rules
@@ -0,0 +1,222 @@
+"""
+Synthèse vocale des alertes pour SafeWay
+
+Un seul thread de synthèse, alimenté par une file de priorité bornée: un
+message déjà en attente est remplacé par sa nouvelle occurrence, les
+messages les moins prioritaires sont abandonnés quand la file est pleine et
+les messages trop anciens ne sont jamais énoncés. Les messages fixes sont
+pré-rendus une fois en clips audio: une alerte vocale n'est alors qu'une
+lecture sur un canal du mixer.
+"""
+import hashlib
+import itertools
+import platform
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from config.settings import TTS_QUEUE_SIZE, TTS_MAX_AGE, VOICE_CLIPS_DIR
+from core.logger import setup_logger
+
+if TYPE_CHECKING:
+    import pygame
+
+logger = setup_logger("SpeechWorker")
+
+# Priorité par sévérité (plus petit = plus urgent)
+SPEECH_PRIORITIES = {'high': 0, 'medium': 1, 'low': 2}
+
+class SpeechWorker:
+    """
+    Thread de synthèse vocale persistant avec file de priorité et clips pré-rendus
+    """
+
+    def __init__(
+        self,
+        preload: Optional[List[str]] = None,
+        channel: Optional["pygame.mixer.Channel"] = None,
+        max_pending: int = TTS_QUEUE_SIZE,
+        max_age: float = TTS_MAX_AGE,
+        clips_dir: Path = VOICE_CLIPS_DIR
+    ):
+        """
+        Initialise la synthèse vocale et démarre le thread
+
+        Args:
+            preload: Messages fixes à pré-rendre en clips audio
+            channel: Canal du mixer pour la lecture des clips (None = synthèse directe)
+            max_pending: Nombre maximum de messages en attente
+            max_age: Secondes après lesquelles un message en attente est abandonné
+            clips_dir: Répertoire de cache des clips audio
+        """
+        self.preload = list(preload or [])
+        self.channel = channel
+        self.max_pending = max_pending
+        self.max_age = max_age
+        self.clips_dir = Path(clips_dir)
+        self.clips: Dict[str, "pygame.mixer.Sound"] = {}
+        self.dropped_messages = 0
+
+        self.enabled = False
+        self.method: Optional[str] = None
+        self.engine = None
+        self._detect_method()
+
+        # Entrées en attente: (priorité, ordre d'arrivée, instant, message)
+        self._pending: List[Tuple[int, int, float, str]] = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        if self.enabled:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="SpeechWorker", daemon=True)
+            self._thread.start()
+
+    def _detect_method(self):
+        """Choisit le moteur de synthèse disponible"""
+        # Sur macOS, utiliser la commande 'say' native
+        if platform.system() == 'Darwin':
+            self.method = 'say'
+            self.enabled = True
+            logger.info("TTS initialisé avec 'say' (macOS)")
+            return
+        # Essayer pyttsx3 pour autres systèmes (moteur créé dans le thread de synthèse)
+        try:
+            import pyttsx3  # noqa: F401
+            self.method = 'pyttsx3'
+            self.enabled = True
+            logger.info("TTS initialisé avec pyttsx3")
+        except ImportError:
+            logger.warning("pyttsx3 non disponible, TTS désactivé")
+
+    def _init_engine(self) -> bool:
+        """Crée le moteur pyttsx3 (dans le thread qui l'utilise)"""
+        if self.method != 'pyttsx3':
+            return True
+        try:
+            import pyttsx3
+            self.engine = pyttsx3.init()
+            # Configurer la voix française si disponible
+            for voice in self.engine.getProperty('voices'):
+                if 'french' in voice.name.lower() or 'fr' in voice.id.lower():
+                    self.engine.setProperty('voice', voice.id)
+                    break
+            self.engine.setProperty('rate', 150)  # Vitesse de parole
+            return True
+        except Exception as e:
+            logger.warning(f"Impossible d'initialiser TTS: {e}")
+            self.enabled = False
+            return False
+
+    def say(self, message: str, severity: str = 'medium'):
+        """
+        Met un message en attente d'énonciation (non bloquant)
+
+        Args:
+            message: Message à énoncer
+            severity: Sévérité de l'alerte (détermine la priorité)
+        """
+        if not self.enabled:
+            return
+        priority = SPEECH_PRIORITIES.get(severity, SPEECH_PRIORITIES['low'])
+        with self._condition:
+            # La nouvelle occurrence remplace celle déjà en attente
+            self._pending = [entry for entry in self._pending if entry[3] != message]
+            self._pending.append((priority, next(self._order), time.monotonic(), message))
+            if len(self._pending) > self.max_pending:
+                # Abandonner le message le moins prioritaire (le plus ancien à priorité égale)
+                worst = max(self._pending, key=lambda entry: (entry[0], -entry[1]))
+                self._pending.remove(worst)
+                self.dropped_messages += 1
+            self._condition.notify()
+
+    def _next_message(self) -> Optional[str]:
+        """Attend et retourne le prochain message à énoncer (None à l'arrêt)"""
+        with self._condition:
+            while self._running:
+                now = time.monotonic()
+                fresh = [entry for entry in self._pending if now - entry[2] <= self.max_age]
+                self.dropped_messages += len(self._pending) - len(fresh)
+                self._pending = fresh
+                if fresh:
+                    entry = min(fresh)
+                    self._pending.remove(entry)
+                    return entry[3]
+                self._condition.wait()
+            return None
+
+    def _clip_path(self, message: str) -> Path:
+        """Chemin du clip audio d'un message pour le moteur courant"""
+        digest = hashlib.sha1(message.encode("utf-8")).hexdigest()[:16]
+        return self.clips_dir / f"{self.method}_{digest}.wav"
+
+    def _render_clips(self):
+        """Pré-rend les messages fixes en clips audio (réutilisés d'une exécution à l'autre)"""
+        if self.channel is None:
+            return
+        import pygame
+
+        if not pygame.mixer.get_init():
+            return
+        self.clips_dir.mkdir(parents=True, exist_ok=True)
+        for message in self.preload:
+            path = self._clip_path(message)
+            try:
+                if not path.exists():
+                    if self.method == 'say':
+                        subprocess.run(['say', '-v', 'Thomas', '-o', str(path),
+                                        '--data-format=LEI16@22050', message],
+                                       check=False, timeout=30)
+                    else:
+                        self.engine.save_to_file(message, str(path))
+                        self.engine.runAndWait()
+                if path.exists() and path.stat().st_size > 0:
+                    self.clips[message] = pygame.mixer.Sound(str(path))
+            except Exception as e:
+                logger.warning(f"Impossible de pré-rendre le message vocal '{message}': {e}")
+        logger.info(f"{len(self.clips)}/{len(self.preload)} messages vocaux pré-rendus")
+
+    def _speak(self, message: str):
+        """Énonce un message: lecture du clip s'il existe, sinon synthèse directe"""
+        clip = self.clips.get(message)
+        if clip is not None:
+            self.channel.play(clip)
+            # Attendre la fin du clip avant le message suivant
+            while self._running and self.channel.get_busy():
+                time.sleep(0.02)
+        elif self.method == 'say':
+            # Utiliser la commande 'say' de macOS
+            subprocess.run(['say', '-v', 'Thomas', message], check=False, timeout=10)
+        elif self.method == 'pyttsx3':
+            self.engine.say(message)
+            self.engine.runAndWait()
+
+    def _run(self):
+        """Boucle du thread de synthèse"""
+        if not self._init_engine():
+            return
+        self._render_clips()
+        while True:
+            message = self._next_message()
+            if message is None:
+                break
+            try:
+                self._speak(message)
+            except Exception as e:
+                logger.error(f"Erreur lors de la synthèse vocale: {e}")
+
+    def stop(self):
+        """Arrête le thread de synthèse (les messages en attente sont abandonnés)"""
+        with self._condition:
+            self._running = False
+            self._pending = []
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        if self.engine is not None:
+            try:
+                self.engine.stop()
+            except Exception:
+                pass
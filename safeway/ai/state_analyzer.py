@@ -1,21 +1,11 @@
 """
 Module d'analyse de l'état du conducteur pour SafeWay
 """
-import time
-from typing import Dict, List, Optional
-from collections import deque
-from config.settings import (
-    EYE_CLOSED_TIME_MS,
-    YAWN_COUNT_THRESHOLD,
-    YAWN_TIME_WINDOW,
-    DISTRACTION_TIME_MS,
-    ABSENCE_TIME_MS,
-    BLINK_RATE_THRESHOLD,
-    HEAD_MOVEMENT_THRESHOLD,
-    GAZE_DEVIATION_THRESHOLD
-)
+from typing import Callable, Dict, List, Optional
+from config.settings import OCCUPANT_IDLE_TIMEOUT, OCCUPANT_MAX_FREE_ANALYZERS
+from ai.rule_engine import RuleEngine, SIGNALS
 from core.logger import setup_logger
-from core.utils import get_current_timestamp
+from core.utils import get_monotonic_timestamp
 
 logger = setup_logger("StateAnalyzer")
 
@@ -24,28 +14,32 @@ class StateAnalyzer:
     Analyse l'état du conducteur et détecte les comportements dangereux
     """
     
-    def __init__(self):
-        """Initialise l'analyseur d'état"""
-        # Historique pour les yeux fermés
-        self.eyes_closed_start_time: Optional[float] = None
-        self.blink_timestamps: deque = deque(maxlen=30)  # Historique des clignements
-        
-        # Historique pour les bâillements
-        self.yawn_timestamps: deque = deque(maxlen=100)
-        
-        # Historique pour la distraction (regard détourné)
-        self.distraction_start_time: Optional[float] = None
-        self.last_head_position: Optional[str] = None
-        self.head_positions_history: deque = deque(maxlen=10)  # Historique positions tête
-        
-        # Historique pour l'absence
-        self.face_absent_start_time: Optional[float] = None
+    def __init__(
+        self,
+        clock: Callable[[], float] = get_monotonic_timestamp,
+        rules: Optional[List[Dict]] = None
+    ):
+        """
+        Initialise l'analyseur d'état
         
-        # Historique pour la cohérence
-        self.last_eye_state = True
-        self.eye_state_changes: deque = deque(maxlen=20)
+        Args:
+            clock: Horloge (secondes) utilisée quand aucun timestamp de frame n'est fourni
+            rules: Règles de détection déclaratives (défaut: rule_engine.DEFAULT_RULES)
+        """
+        self.clock = clock
+        self.engine = RuleEngine(rules)
+        # Seuls les signaux utilisés par les règles sont extraits des résultats
+        self.signals = [(signal,) + SIGNALS[signal] for signal in self.engine.signals]
+        self.reset()
+    
+    def reset(self):
+        """Réinitialise tout l'historique (réutilisation d'un analyseur du pool)"""
+        self.engine.reset()
+        # Temps passé sur des frames inexploitables, retiré de l'horloge des règles
+        self.paused_time = 0.0
+        self.unknown_since: Optional[float] = None
         
-        # État actuel
+        # État actuel (mis à jour en place à chaque frame)
         self.current_state = {
             'fatigue_detected': False,
             'distraction_detected': False,
@@ -55,159 +49,171 @@ class StateAnalyzer:
             'abnormal_blink_rate': False,
             'excessive_head_movement': False
         }
+        for key in self.engine.state_keys:
+            self.current_state.setdefault(key, False)
     
-    def analyze(self, face_results: Dict, hand_results: Dict, yolo_results: Dict) -> Dict:
+    def analyze(
+        self,
+        face_results: Dict,
+        hand_results: Dict,
+        yolo_results: Dict,
+        timestamp: Optional[float] = None
+    ) -> Dict:
         """
         Analyse l'état du conducteur basé sur les résultats de détection
         
+        Les règles sont évaluées par le moteur compilé: seules celles dont les
+        entrées ont changé (ou qui dépendent du temps écoulé) sont recalculées.
+        Tous les seuils temporels sont évalués sur le timestamp de capture de la
+        frame, ce qui permet de rejouer un enregistrement plus vite que le temps réel.
+        
+        Une frame inexploitable (face_results['frame_usable'] False, voir
+        core.frame_gate) laisse l'historique intact: l'état est inconnu, et
+        non une absence du conducteur. Les règles sont évaluées sur une horloge
+        suspendue pendant ces périodes: le temps inconnu ne compte ni dans les
+        durées en cours (absence, yeux fermés) ni dans les fenêtres glissantes.
+        
         Args:
             face_results: Résultats de détection du visage
             hand_results: Résultats de détection des mains
             yolo_results: Résultats de détection YOLO
+            timestamp: Instant de capture de la frame en secondes (défaut: horloge)
             
         Returns:
-            Dictionnaire avec l'état analysé et les alertes
+            Dictionnaire avec l'état analysé et les alertes ('state' est l'état
+            courant de l'analyseur, mis à jour en place à l'appel suivant;
+            'unknown' indique une frame inexploitable)
         """
-        current_time = get_current_timestamp()
-        alerts = []
+        current_time = self.clock() if timestamp is None else timestamp
         
         # Réinitialiser l'état
-        self.current_state = {
-            'fatigue_detected': False,
-            'distraction_detected': False,
-            'phone_detected': False,
-            'driver_absent': False,
-            'yawn_detected': False,
-            'abnormal_blink_rate': False,
-            'excessive_head_movement': False
-        }
-        
-        # 1. Vérifier l'absence du conducteur
-        if not face_results.get('face_detected', False):
-            if self.face_absent_start_time is None:
-                self.face_absent_start_time = current_time
-            else:
-                absent_duration = (current_time - self.face_absent_start_time) * 1000
-                if absent_duration > ABSENCE_TIME_MS:
-                    self.current_state['driver_absent'] = True
-                    alerts.append({
-                        'type': 'driver_absent',
-                        'message': 'Conducteur absent',
-                        'severity': 'high'
-                    })
-        else:
-            self.face_absent_start_time = None
+        state = self.current_state
+        for key in state:
+            state[key] = False
         
-        # 2. Vérifier la fatigue (yeux fermés) avec détection de clignement
-        if face_results.get('face_detected', False):
-            eyes_open = face_results.get('eyes_open', True)
-            
-            # Détecter les clignements (transition fermé -> ouvert)
-            if self.last_eye_state == False and eyes_open == True:
-                self.blink_timestamps.append(current_time)
-            self.last_eye_state = eyes_open
-            self.eye_state_changes.append((current_time, eyes_open))
-            
-            # Calculer le taux de clignement (clignements par seconde)
-            if len(self.blink_timestamps) >= 2:
-                time_window = current_time - self.blink_timestamps[0]
-                if time_window > 0:
-                    blink_rate = len(self.blink_timestamps) / time_window
-                    if blink_rate < BLINK_RATE_THRESHOLD:  # Taux anormalement bas = fatigue
-                        self.current_state['abnormal_blink_rate'] = True
-                        if not self.current_state['fatigue_detected']:
-                            alerts.append({
-                                'type': 'fatigue',
-                                'message': 'Taux de clignement anormalement bas',
-                                'severity': 'medium'
-                            })
-            
-            if not eyes_open:
-                if self.eyes_closed_start_time is None:
-                    self.eyes_closed_start_time = current_time
-                else:
-                    closed_duration = (current_time - self.eyes_closed_start_time) * 1000
-                    if closed_duration > EYE_CLOSED_TIME_MS:
-                        self.current_state['fatigue_detected'] = True
-                        alerts.append({
-                            'type': 'fatigue',
-                            'message': 'Somnolence détectée',
-                            'severity': 'high'
-                        })
-            else:
-                self.eyes_closed_start_time = None
-            
-            # 3. Vérifier les bâillements
-            mouth_open = face_results.get('mouth_open', False)
-            if mouth_open:
-                self.yawn_timestamps.append(current_time)
-                self.current_state['yawn_detected'] = True
-            
-            # Compter les bâillements dans la fenêtre de temps
-            recent_yawns = [
-                ts for ts in self.yawn_timestamps
-                if current_time - ts <= YAWN_TIME_WINDOW
-            ]
-            
-            if len(recent_yawns) >= YAWN_COUNT_THRESHOLD:
-                # Éviter les alertes répétitives
-                if not any(a['type'] == 'yawn' for a in alerts):
-                    alerts.append({
-                        'type': 'yawn',
-                        'message': f'Fatigue détectée ({len(recent_yawns)} bâillements)',
-                        'severity': 'medium'
-                    })
-            
-            # 4. Vérifier la distraction (regard détourné) avec détection de mouvement excessif
-            head_position = face_results.get('head_position', 'center')
-            self.head_positions_history.append((current_time, head_position))
-            
-            # Détecter les mouvements excessifs de tête
-            if len(self.head_positions_history) >= 5:
-                recent_positions = [pos[1] for pos in list(self.head_positions_history)[-5:]]
-                position_changes = sum(1 for i in range(len(recent_positions)-1) 
-                                     if recent_positions[i] != recent_positions[i+1])
-                if position_changes >= 4:  # Trop de changements = mouvement excessif
-                    self.current_state['excessive_head_movement'] = True
-                    alerts.append({
-                        'type': 'distraction',
-                        'message': 'Mouvements de tête excessifs détectés',
-                        'severity': 'medium'
-                    })
-            
-            if head_position in ['left', 'right']:
-                if self.distraction_start_time is None:
-                    self.distraction_start_time = current_time
-                    self.last_head_position = head_position
-                elif head_position == self.last_head_position:
-                    distraction_duration = (current_time - self.distraction_start_time) * 1000
-                    if distraction_duration > DISTRACTION_TIME_MS:
-                        self.current_state['distraction_detected'] = True
-                        alerts.append({
-                            'type': 'distraction',
-                            'message': 'Distraction détectée (regard détourné)',
-                            'severity': 'medium'
-                        })
-                else:
-                    # La tête a changé de position, réinitialiser
-                    self.distraction_start_time = current_time
-                    self.last_head_position = head_position
-            else:
-                self.distraction_start_time = None
-                self.last_head_position = None
+        if not face_results.get('frame_usable', True):
+            # Ni confirmation ni démenti: les séries en cours reprennent à la prochaine frame exploitable
+            if self.unknown_since is None:
+                self.unknown_since = current_time
+            return {
+                'state': state,
+                'alerts': [],
+                'timestamp': current_time,
+                'unknown': True
+            }
         
-        # 5. Vérifier la détection de téléphone
-        if yolo_results.get('phone_detected', False):
-            self.current_state['phone_detected'] = True
-            alerts.append({
-                'type': 'phone',
-                'message': 'Téléphone détecté - Danger!',
-                'severity': 'high'
-            })
+        sources = {'face': face_results, 'hand': hand_results, 'yolo': yolo_results}
+        inputs = {signal: sources[source].get(signal, default) for signal, source, default in self.signals}
+        if self.unknown_since is not None:
+            self.paused_time += current_time - self.unknown_since
+            self.unknown_since = None
+        alerts = self.engine.evaluate(inputs, current_time - self.paused_time, state)
         
         return {
-            'state': self.current_state,
+            'state': state,
             'alerts': alerts,
-            'timestamp': current_time
+            'timestamp': current_time,
+            'unknown': False
         }
 
+class StateAnalyzerPool:
+    """
+    Maintient un StateAnalyzer par visage suivi (ID stable) pour les véhicules
+    avec passagers; seules les alertes du conducteur sont remontées
+    """
+    
+    def __init__(
+        self,
+        idle_timeout: float = OCCUPANT_IDLE_TIMEOUT,
+        clock: Callable[[], float] = get_monotonic_timestamp,
+        rules: Optional[List[Dict]] = None
+    ):
+        """
+        Initialise le pool d'analyseurs
+        
+        Args:
+            idle_timeout: Secondes sans détection avant de libérer l'analyseur d'un passager
+            clock: Horloge (secondes) utilisée quand aucun timestamp de frame n'est fourni
+            rules: Règles de détection déclaratives de la flotte (défaut: DEFAULT_RULES)
+        """
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self.rules = rules
+        self.analyzers: Dict[int, StateAnalyzer] = {}
+        self.last_seen: Dict[int, float] = {}
+        self.free_analyzers: List[StateAnalyzer] = []
+        self.driver_id: Optional[int] = None
+        # Analyseur utilisé tant qu'aucun conducteur n'a été identifié
+        self.default_analyzer = StateAnalyzer(clock, rules)
+    
+    def _acquire(self, face_id: int) -> StateAnalyzer:
+        """Retourne l'analyseur d'un visage, en réutilisant un analyseur libéré si possible"""
+        analyzer = self.analyzers.get(face_id)
+        if analyzer is None:
+            if self.free_analyzers:
+                analyzer = self.free_analyzers.pop()
+                analyzer.reset()
+            else:
+                analyzer = StateAnalyzer(self.clock, self.rules)
+            self.analyzers[face_id] = analyzer
+        return analyzer
+    
+    def _release_idle(self, current_time: float):
+        """Rend au pool les analyseurs des passagers disparus depuis trop longtemps"""
+        for face_id in list(self.analyzers):
+            if face_id == self.driver_id:
+                continue
+            if current_time - self.last_seen.get(face_id, current_time) > self.idle_timeout:
+                analyzer = self.analyzers.pop(face_id)
+                if len(self.free_analyzers) < OCCUPANT_MAX_FREE_ANALYZERS:
+                    self.free_analyzers.append(analyzer)
+                self.last_seen.pop(face_id, None)
+    
+    def analyze(
+        self,
+        face_results: Dict,
+        hand_results: Dict,
+        yolo_results: Dict,
+        timestamp: Optional[float] = None
+    ) -> Dict:
+        """
+        Analyse l'état de chaque occupant et retourne l'analyse du conducteur
+        
+        Args:
+            face_results: Résultats de FaceDetector.detect (avec 'faces' et 'driver_id')
+            hand_results: Résultats de détection des mains
+            yolo_results: Résultats de détection YOLO
+            timestamp: Instant de capture de la frame en secondes (défaut: horloge)
+            
+        Returns:
+            Analyse du conducteur, complétée par l'état de chaque occupant ('occupants')
+        """
+        current_time = self.clock() if timestamp is None else timestamp
+        driver_id = face_results.get('driver_id')
+        if driver_id is not None:
+            self.driver_id = driver_id
+        
+        # Passagers: état suivi sans alertes (mains et téléphone attribués au conducteur)
+        occupants = {}
+        for face in face_results.get('faces', []):
+            face_id = face['face_id']
+            self.last_seen[face_id] = current_time
+            if face_id == driver_id:
+                continue
+            passenger_analysis = self._acquire(face_id).analyze(face, {}, {}, current_time)
+            occupants[face_id] = passenger_analysis['state']
+        
+        # Conducteur: s'il n'est plus visible, son analyseur continue de mesurer l'absence
+        if self.driver_id is None:
+            driver_analyzer = self.default_analyzer
+        else:
+            driver_analyzer = self._acquire(self.driver_id)
+        analysis = driver_analyzer.analyze(face_results, hand_results, yolo_results, current_time)
+        if driver_id is not None:
+            occupants[driver_id] = analysis['state']
+        
+        self._release_idle(current_time)
+        
+        analysis['driver_id'] = self.driver_id
+        analysis['occupants'] = occupants
+        return analysis
@@ -4,27 +4,37 @@ Module de gestion du flux vidéo pour SafeWay
 import cv2
 import numpy as np
 import time
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple, Union
 from config.settings import CAMERA_INDEX, FRAME_WIDTH, FRAME_HEIGHT
 from core.logger import setup_logger
+from core.utils import get_monotonic_timestamp
 
 logger = setup_logger("VideoStream")
 
 class VideoStream:
     """
-    Gère l'acquisition vidéo depuis la caméra
+    Gère l'acquisition vidéo depuis la caméra ou un fichier enregistré
     """
     
-    def __init__(self, camera_index: int = CAMERA_INDEX):
+    def __init__(
+        self,
+        camera_index: Union[int, str] = CAMERA_INDEX,
+        clock: Callable[[], float] = get_monotonic_timestamp
+    ):
         """
         Initialise le flux vidéo
         
         Args:
-            camera_index: Index de la caméra à utiliser
+            camera_index: Index de la caméra à utiliser, ou chemin d'une vidéo à rejouer
+            clock: Horloge (secondes) qui horodate les frames de la caméra
         """
         self.camera_index = camera_index
+        self.is_file = isinstance(camera_index, str)
+        self.clock = clock
         self.cap: Optional[cv2.VideoCapture] = None
         self.is_opened = False
+        # Timestamp de capture (secondes) de la dernière frame lue
+        self.last_timestamp: Optional[float] = None
         
     def start(self) -> bool:
         """
@@ -37,6 +47,15 @@ class VideoStream:
             logger.info(f"Tentative d'ouverture de la caméra {self.camera_index}...")
             self.cap = cv2.VideoCapture(self.camera_index)
             
+            if self.is_file:
+                # Vidéo enregistrée: pas de caméra de secours ni de préchauffage
+                if not self.cap.isOpened():
+                    logger.error(f"Impossible d'ouvrir la vidéo {self.camera_index}")
+                    return False
+                self.is_opened = True
+                logger.info(f"Vidéo {self.camera_index} ouverte")
+                return True
+            
             if not self.cap.isOpened():
                 logger.error(f"Impossible d'ouvrir la caméra {self.camera_index}")
                 # Essayer d'autres indices de caméra
@@ -94,6 +113,9 @@ class VideoStream:
         """
         Lit une frame depuis la caméra
         
+        Le timestamp de capture est disponible ensuite dans last_timestamp:
+        position dans la vidéo pour un fichier, horloge pour une caméra.
+        
         Returns:
             Tuple (succès, frame) où frame est une image numpy ou None
         """
@@ -109,6 +131,10 @@ class VideoStream:
                 if not ret or frame is None:
                     return False, None
             
+            if self.is_file:
+                self.last_timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            else:
+                self.last_timestamp = self.clock()
             return True, frame
             
         except Exception as e:
@@ -3,29 +3,47 @@ Module de détection d'objets avec YOLO pour SafeWay
 """
 import cv2
 import numpy as np
-from ultralytics import YOLO
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from pathlib import Path
-from config.settings import YOLO_MODEL_PATH, PHONE_CLASS_ID, USE_YOLO11
+from config.settings import (
+    YOLO_MODEL_PATH,
+    YOLO_IMGSZ,
+    PHONE_CLASS_ID,
+    USE_YOLO11,
+    FRAME_WIDTH,
+    FRAME_HEIGHT,
+    ensure_data_dirs
+)
 from core.logger import setup_logger
+from core.overlay import OverlayCompositor
 
 logger = setup_logger("YOLODetector")
 
+# Noms de la classe téléphone (modèle COCO, modèles entraînés sur le dataset SafeWay)
+PHONE_CLASS_NAMES = ('cell phone', 'telephone')
+
 class YOLODetector:
     """
     Détecte les objets (notamment téléphones) avec YOLOv11 (ultra performant)
     """
     
-    def __init__(self, model_path: Optional[Path] = None):
+    def __init__(self, model_path: Optional[Path] = None, imgsz: int = YOLO_IMGSZ):
         """
         Initialise le détecteur YOLO
         
         Args:
             model_path: Chemin vers le modèle YOLO (si None, utilise le chemin par défaut)
+            imgsz: Taille d'entrée de l'inférence (celle d'entraînement pour un étudiant distillé)
         """
-        self.model_path = model_path or YOLO_MODEL_PATH
-        self.model: Optional[YOLO] = None
+        # Un modèle explicite (personnalisé, distillé) est chargé tel quel
+        self.explicit_model = model_path is not None
+        self.model_path = Path(model_path) if model_path else YOLO_MODEL_PATH
+        self.imgsz = imgsz
+        self.model = None  # ultralytics.YOLO, chargé par load_model
         self.phone_class_id = PHONE_CLASS_ID
+        # Seuil de confiance du modèle (NMS) et seuil d'un téléphone détecté
+        self.conf_threshold = 0.45
+        self.phone_threshold = 0.5
         
     def load_model(self) -> bool:
         """
@@ -35,7 +53,10 @@ class YOLODetector:
             True si le modèle est chargé avec succès
         """
         try:
-            if not self.model_path.exists() or USE_YOLO11:
+            # Import différé: ultralytics/torch ne sont chargés qu'avec le modèle
+            from ultralytics import YOLO
+            
+            if not self.model_path.exists() or (USE_YOLO11 and not self.explicit_model):
                 logger.info("Chargement du modèle YOLOv11 (ultra performant)...")
                 # Essayer YOLOv11 d'abord
                 model_names = ["yolo11n.pt", "yolo11s.pt", "yolov8s.pt", "yolov8n.pt"]
@@ -48,6 +69,7 @@ class YOLODetector:
                         # Sauvegarder le modèle téléchargé
                         import shutil
                         if Path(model_name).exists():
+                            ensure_data_dirs()
                             shutil.copy(model_name, self.model_path)
                             logger.info(f"Modèle {model_name} téléchargé et sauvegardé")
                             break
@@ -61,6 +83,8 @@ class YOLODetector:
             else:
                 self.model = YOLO(str(self.model_path))
             
+            self._resolve_phone_class()
+            
             # Optimiser le modèle pour l'inférence ultra-rapide
             try:
                 self.model.fuse()  # Fusionner les couches pour plus de performance
@@ -80,6 +104,14 @@ class YOLODetector:
             logger.error(f"Erreur lors du chargement du modèle YOLO: {e}")
             return False
     
+    def _resolve_phone_class(self):
+        """Classe téléphone du modèle chargé (COCO 'cell phone' ou SafeWay 'telephone')"""
+        names = getattr(self.model, 'names', None) or {}
+        for class_id, name in names.items():
+            if name in PHONE_CLASS_NAMES:
+                self.phone_class_id = int(class_id)
+                return
+    
     def detect(self, frame: np.ndarray) -> Dict:
         """
         Détecte les objets dans l'image
@@ -112,8 +144,8 @@ class YOLODetector:
             yolo_results = self.model(
                 rgb_frame, 
                 verbose=False, 
-                imgsz=640,  # Taille optimale pour performance
-                conf=0.45,  # Seuil de confiance ajusté
+                imgsz=self.imgsz,
+                conf=self.conf_threshold,  # Seuil de confiance ajusté
                 iou=0.45,   # Seuil IoU pour NMS
                 half=False,  # Utiliser float32 pour compatibilité
                 device='cpu',  # Utiliser CPU (ou 'cuda' si GPU disponible)
@@ -140,7 +172,7 @@ class YOLODetector:
                         results['all_detections'].append(detection)
                         
                         # Vérifier si c'est un téléphone
-                        if cls == self.phone_class_id and conf > 0.5:
+                        if cls == self.phone_class_id and conf > self.phone_threshold:
                             results['phone_detected'] = True
                             results['phone_confidence'] = conf
                             results['phone_bbox'] = bbox.tolist()
@@ -150,6 +182,37 @@ class YOLODetector:
         
         return results
     
+    def warmup(self, frame_shape: Tuple[int, int, int] = (FRAME_HEIGHT, FRAME_WIDTH, 3)) -> bool:
+        """
+        Exécute une inférence sur une image noire (allocations, compilation des noyaux)
+        
+        Args:
+            frame_shape: Dimensions des frames attendues
+            
+        Returns:
+            True si le modèle est chargé
+        """
+        if self.model is None:
+            return False
+        self.detect(np.zeros(frame_shape, dtype=np.uint8))
+        return True
+    
+    def add_overlay(self, overlay: OverlayCompositor, results: Dict):
+        """
+        Ajoute la boîte du téléphone détecté au compositeur
+        
+        Args:
+            overlay: Compositeur d'annotations de la frame
+            results: Résultats de détection
+        """
+        if not results['phone_detected'] or not results['phone_bbox']:
+            return
+        
+        x1, y1, x2, y2 = map(int, results['phone_bbox'])
+        overlay.add_rectangle((x1, y1), (x2, y2), (0, 0, 255), 2)
+        label = f"Telephone {results['phone_confidence']:.2f}"
+        overlay.add_text(label, (x1, y1 - 10), 0.5, (0, 0, 255), 2)
+    
     def draw_detections(self, frame: np.ndarray, results: Dict) -> np.ndarray:
         """
         Dessine les détections sur l'image
@@ -164,19 +227,6 @@ class YOLODetector:
         if not results['phone_detected']:
             return frame
         
-        annotated_frame = frame.copy()
-        bbox = results['phone_bbox']
-        
-        if bbox:
-            x1, y1, x2, y2 = map(int, bbox)
-            
-            # Dessiner le rectangle
-            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-            
-            # Ajouter le texte
-            label = f"Telephone {results['phone_confidence']:.2f}"
-            cv2.putText(annotated_frame, label, (x1, y1 - 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
-        
-        return annotated_frame
-
+        overlay = OverlayCompositor()
+        self.add_overlay(overlay, results)
+        return overlay.render(frame)
@@ -1,10 +1,27 @@
 #!/usr/bin/env python3
 """
 Script d'aide pour annoter les images avec LabelImg
+
+Avec --auto, pré-annote tout un dossier d'images avec YOLODetector (pool de
+processus): les annotateurs n'ont plus qu'à corriger les boîtes dans LabelImg.
 """
+import os
 import subprocess
 import sys
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config.settings import PHONE_CLASS_ID
+
+# Classes COCO du modèle -> classes SafeWay (voir train_yolo.create_dataset_template)
+AUTO_LABEL_CLASSES = {
+    PHONE_CLASS_ID: 0,  # cell phone -> telephone
+}
+
+# Détecteur de chaque processus du pool (chargé une fois par processus) et correspondance de ses classes
+_detector = None
+_class_map = AUTO_LABEL_CLASSES
 
 def install_labelimg():
     """Installe LabelImg si nécessaire"""
@@ -65,13 +82,176 @@ conducteur"""
             print("  pip install labelImg")
             print("  labelImg")
 
+def _label_path(image_path: Path) -> Path:
+    """Fichier de labels YOLO d'une image (.../images/... -> .../labels/....txt)"""
+    from core.dataset_shards import label_path_for
+    return label_path_for(image_path)
+
+def _is_label_current(image_path: Path) -> bool:
+    """Le label existe et est plus récent que l'image (pré-annotation ou correction manuelle)"""
+    label_path = _label_path(image_path)
+    return label_path.exists() and label_path.stat().st_mtime_ns >= image_path.stat().st_mtime_ns
+
+def label_class_map(detector) -> Dict[int, int]:
+    """
+    Correspondance entre les classes d'un détecteur et les classes SafeWay
+    
+    Args:
+        detector: YOLODetector chargé
+        
+    Returns:
+        Classe SafeWay par classe du modèle (classes du modèle conservées s'il est déjà entraîné sur SafeWay)
+    """
+    names = getattr(detector.model, 'names', None) or {}
+    if names and names.get(PHONE_CLASS_ID) != 'cell phone':
+        return {int(class_id): int(class_id) for class_id in names}
+    return AUTO_LABEL_CLASSES
+
+def yolo_label_lines(detections: List[Dict], width: int, height: int, class_map: Dict[int, int],
+                     min_confidence: float = 0.0) -> List[str]:
+    """
+    Convertit des détections YOLODetector en lignes de labels YOLO
+    
+    Args:
+        detections: Détections ('all_detections' de YOLODetector.detect, boîtes en pixels)
+        width: Largeur de l'image
+        height: Hauteur de l'image
+        class_map: Classe SafeWay par classe du modèle (autres classes ignorées)
+        min_confidence: Confiance minimum d'une boîte
+        
+    Returns:
+        Lignes "classe x y w h" normalisées
+    """
+    lines = []
+    for detection in detections:
+        class_id = class_map.get(detection['class_id'])
+        if class_id is None or detection['confidence'] < min_confidence:
+            continue
+        x1, y1, x2, y2 = detection['bbox']
+        x1, x2 = max(x1, 0), min(x2, width)
+        y1, y2 = max(y1, 0), min(y2, height)
+        lines.append(f"{class_id} {(x1 + x2) / 2 / width:.6f} {(y1 + y2) / 2 / height:.6f} "
+                     f"{(x2 - x1) / width:.6f} {(y2 - y1) / height:.6f}")
+    return lines
+
+def _init_worker(model_path: Optional[str] = None, min_confidence: float = 0.5):
+    """Charge le modèle YOLO dans un processus du pool"""
+    global _detector, _class_map
+    from ai.yolo_detector import YOLODetector
+    try:
+        # Un thread de calcul par processus: le parallélisme vient du pool
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    _detector = YOLODetector(Path(model_path) if model_path else None)
+    if not _detector.load_model():
+        raise RuntimeError("Impossible de charger le modèle YOLO")
+    # Le seuil du modèle (NMS) ne doit pas écarter les boîtes que min_confidence accepte
+    _detector.conf_threshold = min(min_confidence, _detector.conf_threshold)
+    _class_map = label_class_map(_detector)
+
+def _annotate_image(image_path: str, min_confidence: float) -> Tuple[str, int, Optional[str]]:
+    """
+    Pré-annote une image et écrit son fichier de labels YOLO
+    
+    Returns:
+        Tuple (chemin de l'image, nombre de boîtes, erreur éventuelle)
+    """
+    import cv2
+    
+    image = cv2.imread(image_path)
+    if image is None:
+        return image_path, 0, "image illisible"
+    height, width = image.shape[:2]
+    results = _detector.detect(image)
+    
+    lines = yolo_label_lines(results['all_detections'], width, height, _class_map, min_confidence)
+    
+    # Fichier vide si aucune détection: l'image compte comme exemple négatif
+    label_path = _label_path(Path(image_path))
+    label_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = label_path.with_suffix(".tmp")
+    tmp_path.write_text("\n".join(lines) + ("\n" if lines else ""))
+    os.replace(tmp_path, label_path)
+    return image_path, len(lines), None
+
+def auto_annotate(
+    images_dir: str = "data/dataset/images/train",
+    workers: Optional[int] = None,
+    min_confidence: float = 0.5,
+    force: bool = False,
+    model_path: Optional[str] = None
+) -> int:
+    """
+    Pré-annote toutes les images d'un dossier avec YOLODetector
+    
+    Les labels sont écrits dans le dossier labels/ correspondant (format YOLO,
+    classes de create_dataset_template). Une image dont le label est plus
+    récent qu'elle (déjà pré-annotée ou corrigée à la main) est ignorée.
+    
+    Args:
+        images_dir: Dossier des images (data/dataset/images/<split>)
+        workers: Nombre de processus (défaut: nombre de CPU)
+        min_confidence: Confiance minimum d'une boîte
+        force: Ré-annoter aussi les images dont le label est à jour
+        model_path: Modèle YOLO à utiliser (défaut: celui de YOLODetector)
+        
+    Returns:
+        Nombre d'images annotées
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    from core.dataset_shards import IMAGE_SUFFIXES
+    
+    images = sorted(path for path in Path(images_dir).rglob("*") if path.suffix.lower() in IMAGE_SUFFIXES)
+    todo: List[Path] = [path for path in images if force or not _is_label_current(path)]
+    print(f"📁 {len(images)} images, {len(images) - len(todo)} déjà annotées, {len(todo)} à annoter")
+    if not todo:
+        return 0
+    
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    start = time.perf_counter()
+    annotated = boxes = 0
+    # 'spawn': torch supporte mal le fork d'un processus qui a déjà des threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(model_path, min_confidence)) as executor:
+        results = executor.map(_annotate_image, [str(path) for path in todo],
+                               [min_confidence] * len(todo), chunksize=8)
+        for i, (image_path, num_boxes, error) in enumerate(results, 1):
+            if error:
+                print(f"⚠️  {image_path}: {error}")
+                continue
+            annotated += 1
+            boxes += num_boxes
+            if i % 100 == 0:
+                print(f"  {i}/{len(todo)} images ({i / (time.perf_counter() - start):.1f} img/s)")
+    
+    print(f"✅ {annotated} images pré-annotées ({boxes} boîtes) en {time.perf_counter() - start:.1f}s "
+          f"avec {workers} processus")
+    print("💡 Corrigez les boîtes avec LabelImg: python annotate_images.py")
+    return annotated
+
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description="Lancer LabelImg pour annoter les images")
     parser.add_argument("--dataset", type=str, default="data/dataset",
                        help="Chemin vers le dossier dataset")
+    parser.add_argument("--auto", action="store_true",
+                       help="Pré-annoter les images avec YOLO au lieu de lancer LabelImg")
+    parser.add_argument("--split", type=str, default="train",
+                       help="Split à pré-annoter (images/<split>)")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Nombre de processus de pré-annotation")
+    parser.add_argument("--conf", type=float, default=0.5,
+                       help="Confiance minimum des boîtes pré-annotées")
+    parser.add_argument("--force", action="store_true",
+                       help="Ré-annoter les images dont le label est déjà à jour")
     
     args = parser.parse_args()
-    launch_labelimg(args.dataset)
+    if args.auto:
+        auto_annotate(str(Path(args.dataset) / "images" / args.split), args.workers, args.conf, args.force)
+    else:
+        launch_labelimg(args.dataset)
 
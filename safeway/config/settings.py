@@ -2,6 +2,7 @@
 Configuration globale pour SafeWay
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Chemins de base
@@ -11,10 +12,15 @@ MODELS_DIR = DATA_DIR / "models"
 LOGS_DIR = DATA_DIR / "logs"
 SAMPLES_DIR = DATA_DIR / "samples"
 
-# Créer les dossiers s'ils n'existent pas
-MODELS_DIR.mkdir(parents=True, exist_ok=True)
-LOGS_DIR.mkdir(parents=True, exist_ok=True)
-SAMPLES_DIR.mkdir(parents=True, exist_ok=True)
+def ensure_data_dirs():
+    """
+    Crée les dossiers de données s'ils n'existent pas
+    
+    Appelé par les composants qui y écrivent: l'import de la configuration
+    n'a aucun effet sur le disque.
+    """
+    for directory in (MODELS_DIR, LOGS_DIR, SAMPLES_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
 
 # Configuration de la caméra
 CAMERA_INDEX = 0  # Index de la caméra (0 = caméra par défaut)
@@ -22,10 +28,26 @@ FRAME_WIDTH = 640
 FRAME_HEIGHT = 480
 FPS_TARGET = 15  # FPS minimum visé
 
+# Contrôle de qualité des frames (frames inexploitables: état inconnu, pas d'inférence)
+QUALITY_GATE_ENABLED = True
+QUALITY_MIN_BRIGHTNESS = 35  # Luminosité moyenne minimum (0-255)
+QUALITY_MAX_SATURATED = 0.35  # Fraction maximum de pixels saturés (éblouissement)
+QUALITY_MIN_CONTRAST = 12  # Écart-type minimum des niveaux de gris
+QUALITY_MIN_SHARPNESS = 15  # Variance minimum du laplacien sur la vignette (flou de bougé)
+QUALITY_SIZE = (160, 120)  # Vignette évaluée (largeur, hauteur)
+
+# Filtrage des frames inchangées (résultats précédents réutilisés)
+CHANGE_GATE_ENABLED = True
+CHANGE_GATE_THRESHOLD = 4.0  # Différence moyenne (0-255) du bloc le plus modifié pour relancer les détecteurs
+CHANGE_GATE_MAX_STALENESS = 0.25  # Secondes maximum de réutilisation des résultats
+CHANGE_GATE_SIZE = (64, 48)  # Vignette comparée (largeur, hauteur)
+CHANGE_GATE_BLOCKS = (8, 8)  # Blocs de la vignette (colonnes, lignes)
+
 # Seuils de détection (optimisés pour meilleure cohérence)
 EYE_CLOSED_THRESHOLD = 0.22  # Ratio pour considérer l'œil fermé (ajusté)
 EYE_CLOSED_TIME_MS = 1200  # Temps en ms avant alerte somnolence (plus rapide)
 YAWN_THRESHOLD = 0.45  # Ratio pour considérer la bouche ouverte (ajusté)
+MOUTH_OPEN_THRESHOLD = 0.5  # Ratio MAR utilisé par FaceDetector pour la bouche ouverte
 YAWN_COUNT_THRESHOLD = 2  # Nombre de bâillements en 60s (plus sensible)
 YAWN_TIME_WINDOW = 60  # Fenêtre de temps en secondes
 DISTRACTION_TIME_MS = 1500  # Temps en ms avant alerte distraction (plus rapide)
@@ -34,12 +56,23 @@ ABSENCE_TIME_MS = 2500  # Temps en ms avant alerte absence (plus rapide)
 # Nouveaux signaux de détection
 BLINK_RATE_THRESHOLD = 0.15  # Taux de clignement anormal (yeux/sec)
 HEAD_MOVEMENT_THRESHOLD = 30  # Seuil de mouvement de tête (degrés)
+HEAD_MOVEMENT_WINDOW = 4  # Nombre de transitions de position de tête observées
+HEAD_MOVEMENT_CHANGES = 4  # Changements sur la fenêtre = mouvement excessif
 GAZE_DEVIATION_THRESHOLD = 25  # Seuil de déviation du regard (degrés)
 
+# Multi-occupants (bus, taxi)
+MAX_NUM_FACES = 4  # Nombre maximum de visages analysés par frame
+DRIVER_SEAT_REGION = (0.0, 0.0, 1.0, 1.0)  # Zone du conducteur (x1, y1, x2, y2 normalisés)
+FACE_TRACK_MAX_DISTANCE = 0.15  # Déplacement max (normalisé) pour conserver l'ID d'un visage
+FACE_TRACK_MAX_MISSED = 15  # Frames sans détection avant d'oublier un visage
+OCCUPANT_IDLE_TIMEOUT = 10  # Secondes avant de libérer l'analyseur d'un passager
+
 # Modèles - Utiliser YOLOv11 pour meilleure performance
 YOLO_MODEL_PATH = MODELS_DIR / "yolo11n.pt"
 YOLO_MODEL_NAME = "yolo11n.pt"  # YOLOv11 est plus récent et performant
 USE_YOLO11 = True  # Utiliser YOLOv11 au lieu de YOLOv8
+YOLO_FRAME_INTERVAL = 3  # YOLO exécuté une frame analysée sur N (fluidité de la boucle temps réel)
+YOLO_IMGSZ = 640  # Taille d'entrée par défaut (un étudiant distillé utilise sa taille d'entraînement)
 
 # Classes YOLO à détecter (téléphone)
 PHONE_CLASS_ID = 67  # ID de la classe "cell phone" dans COCO
@@ -48,8 +81,55 @@ PHONE_CLASS_ID = 67  # ID de la classe "cell phone" dans COCO
 ALERT_SOUND_ENABLED = True
 ALERT_VOICE_ENABLED = True
 ALERT_VISUAL_ENABLED = True
+ALERT_SOUND_CHANNELS = 3  # Canaux du mixer réservés aux bips d'alerte
+TTS_QUEUE_SIZE = 4  # Messages vocaux en attente au maximum
+TTS_MAX_AGE = 5.0  # Secondes avant qu'un message vocal en attente soit abandonné
+VOICE_CLIPS_DIR = DATA_DIR / "voice"  # Cache des messages vocaux pré-rendus
+ALERT_EVENTS_FILE = LOGS_DIR / "alerts.jsonl"  # Journal JSON des alertes (None = désactivé)
+ALERT_IPC_SOCKET = None  # Socket Unix d'un processus destinataire des alertes (None = désactivé)
+
+# Clips vidéo autour des alertes (anneau en mémoire de frames JPEG réduites)
+CLIP_RECORDING_ENABLED = True
+CLIPS_DIR = LOGS_DIR / "clips"
+CLIP_PRE_ROLL = 10.0  # Secondes conservées avant l'alerte
+CLIP_POST_ROLL = 5.0  # Secondes enregistrées après la dernière alerte du clip
+CLIP_MAX_DURATION = 60.0  # Durée maximum d'un clip (alertes successives fusionnées)
+CLIP_FPS = 10  # Frames par seconde conservées
+CLIP_SIZE = (320, 240)  # Résolution des frames conservées (largeur, hauteur)
+CLIP_JPEG_QUALITY = 70
+CLIP_MAX_PENDING = 2  # Clips en attente d'encodage au maximum (au-delà, le plus ancien est abandonné)
 
 # Logging
 LOG_FILE = LOGS_DIR / "safeway.log"
 LOG_LEVEL = "INFO"
+LOG_ASYNC = True  # File bornée + thread d'écriture unique (pas d'E/S dans la boucle de traitement)
+LOG_QUEUE_SIZE = 10000  # Messages en attente au maximum (au-delà, messages perdus)
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Taille du fichier de logs avant rotation
+LOG_BACKUP_COUNT = 3  # Nombre d'anciens fichiers de logs conservés
+LOG_RATE_LIMIT = 1.0  # Secondes minimum entre deux messages identiques (0 = sans limite)
+
+# Journal binaire des caractéristiques par frame
+FEATURE_LOG_ENABLED = True
+FEATURE_LOG_DIR = LOGS_DIR / "trips"
+FEATURE_LOG_CHUNK_SIZE = 256  # Enregistrements par bloc écrit
+FEATURE_LOG_FLUSH_INTERVAL = 5.0  # Secondes max avant d'écrire un bloc incomplet
+
+# Budget mémoire (quarts de 12 heures)
+RULE_WINDOW_MAX_EVENTS = 1000  # Événements conservés au maximum par fenêtre de règle sans maxlen
+OCCUPANT_MAX_FREE_ANALYZERS = 4  # Analyseurs libérés gardés pour réutilisation
+MEMORY_MONITOR_ENABLED = False  # Échantillonner RSS et tracemalloc pendant la démo (ralentit les allocations)
+MEMORY_SAMPLE_INTERVAL = 60.0  # Secondes entre deux échantillons
+MEMORY_MAX_SAMPLES = 720  # Échantillons conservés (12 h à 60 s)
+MEMORY_TRACE_FRAMES = 1  # Profondeur des traces tracemalloc (1: fichier qui alloue)
+MEMORY_GROWTH_LIMIT = 1024 * 1024  # Croissance (octets/heure) au-delà de laquelle un composant est signalé
+MEMORY_REPORT_DIR = LOGS_DIR / "memory"
+
+# Entraînement YOLO
+DATASET_SHARD_SIZE = 256  # Images par fichier shard pré-traité (256 x 640 x 640 x 3 octets = 315 Mo)
 
+# Démon d'inférence résident (modèles partagés par plusieurs clients)
+INFERENCE_SOCKET_PATH = Path(tempfile.gettempdir()) / "safeway-inference.sock"
+INFERENCE_SESSION_TIMEOUT = 60  # Secondes d'inactivité avant de libérer la session d'un client
+INFERENCE_WARM_SPARE = True  # Tenir une session préchauffée prête pour le prochain client
+INFERENCE_MAX_HEADER_BYTES = 1024 * 1024  # Taille maximum du JSON d'un message (résultats avec landmarks)
+INFERENCE_MAX_PAYLOAD_BYTES = FRAME_WIDTH * FRAME_HEIGHT * 3 * 4  # Données brutes maximum (marge: 2x la résolution par côté)
@@ -0,0 +1,383 @@
+"""
+Shards de dataset pré-traités pour l'entraînement YOLO
+
+Les images d'un split (data/dataset/images/<split>) sont décodées une seule
+fois, redimensionnées (plus grand côté = imgsz) et rangées dans des cases
+fixes imgsz x imgsz de fichiers .npy lus en mémoire partagée (memmap). Les
+labels YOLO sont rangés dans l'index JSON du shard. Pendant l'entraînement,
+le chargement d'une image n'est plus qu'une copie depuis le memmap, sans
+décodage JPEG ni redimensionnement à chaque époque.
+
+La préparation est incrémentale: seules les images (ou labels) modifiées
+depuis la dernière préparation sont décodées à nouveau.
+
+Organisation: data/dataset/shards/<split>_<imgsz>/index.json + shard_XXXX.npy
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config.settings import DATASET_SHARD_SIZE
+from core.logger import setup_logger
+
+logger = setup_logger("DatasetShards")
+
+IMAGE_SUFFIXES = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+INDEX_VERSION = 1
+# Couleur de remplissage des cases (celle du letterbox d'ultralytics)
+PAD_VALUE = 114
+
+def shard_dir_for(images_dir: Path, imgsz: int) -> Path:
+    """
+    Dossier des shards d'un split
+
+    Args:
+        images_dir: Dossier des images (data/dataset/images/<split>)
+        imgsz: Taille d'entraînement
+
+    Returns:
+        data/dataset/shards/<split>_<imgsz>
+    """
+    images_dir = Path(images_dir)
+    return images_dir.parent.parent / "shards" / f"{images_dir.name}_{imgsz}"
+
+def label_path_for(image_path: Path) -> Path:
+    """Fichier de labels YOLO d'une image (.../images/... -> .../labels/....txt)"""
+    parts = list(image_path.parts)
+    for i in range(len(parts) - 1, -1, -1):
+        if parts[i] == "images":
+            parts[i] = "labels"
+            break
+    return Path(*parts).with_suffix(".txt")
+
+def read_yolo_labels(label_path: Path) -> List[List[float]]:
+    """
+    Lit un fichier de labels YOLO
+
+    Args:
+        label_path: Fichier .txt (une boîte par ligne: classe x y w h normalisés)
+
+    Returns:
+        Liste de [classe, x, y, w, h] (vide si le fichier n'existe pas)
+    """
+    if not label_path.exists():
+        return []
+    labels = []
+    for line in label_path.read_text().splitlines():
+        values = line.split()
+        if len(values) >= 5:
+            labels.append([float(v) for v in values[:5]])
+    return labels
+
+def _file_stamp(path: Path) -> Optional[List[int]]:
+    """Identité d'un fichier pour la reconstruction incrémentale (None s'il n'existe pas)"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+def _letterbox(image_path: Path, imgsz: int) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Décode une image et la redimensionne (plus grand côté = imgsz)"""
+    import cv2
+
+    image = cv2.imread(str(image_path))
+    if image is None:
+        raise ValueError(f"Image illisible: {image_path}")
+    h0, w0 = image.shape[:2]
+    ratio = imgsz / max(h0, w0)
+    if ratio != 1:
+        interpolation = cv2.INTER_LINEAR if ratio > 1 else cv2.INTER_AREA
+        image = cv2.resize(image, (min(round(w0 * ratio), imgsz), min(round(h0 * ratio), imgsz)),
+                           interpolation=interpolation)
+    return image, (h0, w0)
+
+class DatasetShards:
+    """
+    Lecture des shards d'un split (images en memmap, labels depuis l'index)
+    """
+
+    def __init__(self, shard_dir: Path):
+        """
+        Ouvre les shards
+
+        Args:
+            shard_dir: Dossier des shards (voir shard_dir_for)
+        """
+        self.shard_dir = Path(shard_dir)
+        with open(self.shard_dir / "index.json", encoding="utf-8") as f:
+            index = json.load(f)
+        self.imgsz = index['imgsz']
+        self.shard_size = index['shard_size']
+        self.images_dir = Path(index['images_dir'])
+        self.files = sorted(index['entries'])
+        self.entries = [index['entries'][name] for name in self.files]
+        # Indice de chaque image par chemin: les datasets réordonnent leurs images (mode rect)
+        self._positions = {str(self.image_path(i)): i for i in range(len(self.files))}
+        self._shards: Dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def _shard(self, shard_id: int) -> np.ndarray:
+        shard = self._shards.get(shard_id)
+        if shard is None:
+            shard = np.load(self.shard_dir / f"shard_{shard_id:04d}.npy", mmap_mode='r')
+            self._shards[shard_id] = shard
+        return shard
+
+    def image_path(self, i: int) -> Path:
+        """Chemin de l'image source d'indice i"""
+        return self.images_dir / self.files[i]
+
+    def index_of(self, image_path: str) -> int:
+        """Indice d'une image d'après son chemin (tel que retourné par image_path)"""
+        return self._positions[str(image_path)]
+
+    def image(self, i: int) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """
+        Image redimensionnée d'indice i
+
+        Args:
+            i: Indice de l'image
+
+        Returns:
+            Tuple (image BGR redimensionnée (copie modifiable), dimensions d'origine (h, w))
+        """
+        entry = self.entries[i]
+        slot = entry['slot']
+        h, w = entry['shape']
+        image = self._shard(slot // self.shard_size)[slot % self.shard_size, :h, :w]
+        return np.array(image), tuple(entry['shape0'])
+
+    def labels(self, i: int) -> np.ndarray:
+        """
+        Labels YOLO de l'image d'indice i
+
+        Returns:
+            Tableau (n, 5): classe, x, y, w, h normalisés
+        """
+        return np.array(self.entries[i]['labels'], dtype=np.float32).reshape(-1, 5)
+
+def prepare_shards(
+    images_dir: Path,
+    imgsz: int = 640,
+    shard_size: int = DATASET_SHARD_SIZE,
+    workers: Optional[int] = None
+) -> Path:
+    """
+    Prépare (ou met à jour) les shards d'un split
+
+    Args:
+        images_dir: Dossier des images du split
+        imgsz: Taille d'entraînement
+        shard_size: Nombre d'images par fichier shard
+        workers: Threads de décodage (défaut: nombre de CPU)
+
+    Returns:
+        Dossier des shards
+    """
+    images_dir = Path(images_dir).resolve()
+    shard_dir = shard_dir_for(images_dir, imgsz)
+    index_path = shard_dir / "index.json"
+
+    index = None
+    if index_path.exists():
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get('version') != INDEX_VERSION or index['imgsz'] != imgsz or index['shard_size'] != shard_size:
+            logger.info(f"Format des shards modifié, reconstruction complète: {shard_dir}")
+            index = None
+    if index is None:
+        for old_shard in shard_dir.glob("shard_*.npy"):
+            old_shard.unlink()
+        index = {'version': INDEX_VERSION, 'imgsz': imgsz, 'shard_size': shard_size,
+                 'images_dir': str(images_dir), 'num_slots': 0, 'entries': {}}
+    index['images_dir'] = str(images_dir)
+    entries: Dict[str, Dict] = index['entries']
+
+    images = sorted(str(path.relative_to(images_dir)) for path in images_dir.rglob("*")
+                    if path.suffix.lower() in IMAGE_SUFFIXES)
+
+    # Images supprimées: leurs cases sont réutilisées
+    free_slots = sorted(entries.pop(name)['slot'] for name in list(entries) if name not in images)
+
+    # Images nouvelles ou modifiées (image à décoder) et labels modifiés (index seul)
+    to_decode: List[str] = []
+    relabeled = 0
+    for name in images:
+        image_path = images_dir / name
+        label_path = label_path_for(image_path)
+        entry = entries.get(name)
+        if entry is None or entry['image_stamp'] != _file_stamp(image_path):
+            to_decode.append(name)
+        elif entry['label_stamp'] != _file_stamp(label_path):
+            entry['labels'] = read_yolo_labels(label_path)
+            entry['label_stamp'] = _file_stamp(label_path)
+            relabeled += 1
+
+    if to_decode:
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        # Cases: celle de l'image si elle existe déjà, sinon une case libérée, sinon une nouvelle
+        slots = {}
+        for name in to_decode:
+            if name in entries:
+                slots[name] = entries[name]['slot']
+            elif free_slots:
+                slots[name] = free_slots.pop(0)
+            else:
+                slots[name] = index['num_slots']
+                index['num_slots'] += 1
+
+        shards: Dict[int, np.ndarray] = {}
+
+        def open_shard(shard_id: int) -> np.ndarray:
+            if shard_id not in shards:
+                path = shard_dir / f"shard_{shard_id:04d}.npy"
+                if path.exists():
+                    shards[shard_id] = np.load(path, mmap_mode='r+')
+                else:
+                    shards[shard_id] = np.lib.format.open_memmap(
+                        path, mode='w+', dtype=np.uint8, shape=(shard_size, imgsz, imgsz, 3))
+            return shards[shard_id]
+
+        for shard_id in sorted({slot // shard_size for slot in slots.values()}):
+            open_shard(shard_id)
+
+        def decode(name: str):
+            image_path = images_dir / name
+            stamp = _file_stamp(image_path)
+            image, shape0 = _letterbox(image_path, imgsz)
+            slot = slots[name]
+            cell = shards[slot // shard_size][slot % shard_size]
+            cell[...] = PAD_VALUE
+            cell[:image.shape[0], :image.shape[1]] = image
+            label_path = label_path_for(image_path)
+            return name, {
+                'slot': slot,
+                'shape0': list(shape0),
+                'shape': list(image.shape[:2]),
+                'image_stamp': stamp,
+                'label_stamp': _file_stamp(label_path),
+                'labels': read_yolo_labels(label_path)
+            }
+
+        failed = 0
+        # cv2 libère le GIL pendant le décodage et le redimensionnement
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            futures = [executor.submit(decode, name) for name in to_decode]
+            for future in futures:
+                try:
+                    name, entry = future.result()
+                    entries[name] = entry
+                except Exception as e:
+                    failed += 1
+                    logger.warning(str(e))
+        for shard in shards.values():
+            shard.flush()
+        if failed:
+            logger.warning(f"{failed} image(s) ignorée(s)")
+
+    if to_decode or relabeled or free_slots or not index_path.exists():
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        # Index écrit après les données: un arrêt brutal ne laisse jamais d'entrée vers une case incomplète
+        tmp_path = index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+
+    logger.info(f"Shards {shard_dir.name}: {len(images)} images, {len(to_decode)} décodée(s), "
+                f"{relabeled} label(s) mis à jour")
+    return shard_dir
+
+def build_sharded_trainer():
+    """
+    Trainer ultralytics qui lit les images depuis les shards
+
+    Pour chaque split, le dataset est lu depuis les shards préparés (voir
+    prepare_shards); sans shards, le chargement standard d'ultralytics est
+    utilisé.
+
+    Returns:
+        Classe à passer à model.train(trainer=...) (classe du dataset dans
+        son attribut dataset_class)
+    """
+    import cv2
+    from ultralytics.cfg import DEFAULT_CFG
+    from ultralytics.data.dataset import YOLODataset
+    from ultralytics.models.yolo.detect import DetectionTrainer
+    from ultralytics.utils import colorstr
+
+    class ShardedYOLODataset(YOLODataset):
+        """YOLODataset dont les images et labels proviennent des shards"""
+
+        def __init__(self, *args, shards: DatasetShards, **kwargs):
+            self.shards = shards
+            super().__init__(*args, **kwargs)
+
+        def get_img_files(self, img_path):
+            return [str(self.shards.image_path(i)) for i in range(len(self.shards))]
+
+        def get_labels(self):
+            labels = []
+            for im_file in self.im_files:
+                i = self.shards.index_of(im_file)
+                boxes = self.shards.labels(i)
+                labels.append({
+                    'im_file': im_file,
+                    'shape': tuple(self.shards.entries[i]['shape0']),
+                    'cls': boxes[:, 0:1],
+                    'bboxes': boxes[:, 1:],
+                    'segments': [],
+                    'keypoints': None,
+                    'normalized': True,
+                    'bbox_format': 'xywh'
+                })
+            return labels
+
+        def load_image(self, i, rect_mode=True):
+            # set_rectangle() trie im_files et labels par format: l'indice i
+            # du dataset n'est plus celui du shard
+            image, shape0 = self.shards.image(self.shards.index_of(self.im_files[i]))
+            if not rect_mode:
+                image = cv2.resize(image, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+            if self.augment:
+                # Tampon utilisé par mosaic/mixup pour tirer les autres images
+                self.buffer.append(i)
+                if len(self.buffer) >= self.max_buffer_length:
+                    self.buffer.pop(0)
+            return image, shape0, image.shape[:2]
+
+    class ShardedDetectionTrainer(DetectionTrainer):
+        """DetectionTrainer alimenté par les shards"""
+
+        def build_dataset(self, img_path, mode="train", batch=None):
+            shard_dir = shard_dir_for(Path(img_path), self.args.imgsz)
+            if not (shard_dir / "index.json").exists():
+                logger.warning(f"Pas de shards pour {img_path}, chargement standard")
+                return super().build_dataset(img_path, mode, batch)
+            stride = max(int(self.model.stride.max() if self.model else 0), 32)
+            cfg = self.args or DEFAULT_CFG
+            return ShardedYOLODataset(
+                img_path=img_path,
+                imgsz=cfg.imgsz,
+                batch_size=batch,
+                augment=mode == "train",
+                hyp=cfg,
+                rect=cfg.rect or mode == "val",
+                cache=None,
+                single_cls=cfg.single_cls or False,
+                stride=stride,
+                pad=0.0 if mode == "train" else 0.5,
+                prefix=colorstr(f"{mode}: "),
+                task=cfg.task,
+                classes=cfg.classes,
+                data=self.data,
+                fraction=cfg.fraction if mode == "train" else 1.0,
+                shards=DatasetShards(shard_dir)
+            )
+
+    ShardedDetectionTrainer.dataset_class = ShardedYOLODataset
+    return ShardedDetectionTrainer
@@ -0,0 +1,274 @@
+"""
+Journal binaire des caractéristiques par frame pour SafeWay
+
+Chaque frame produit un enregistrement de taille fixe (détections visage,
+mains, YOLO et état de l'analyseur). Les enregistrements sont accumulés par
+blocs dans un tableau numpy puis écrits en ajout par un thread d'arrière-plan;
+la relecture se fait par mmap, directement sous forme de colonnes numpy, sans
+relancer l'inférence sur la vidéo.
+
+Format: en-tête (magic, longueur, JSON avec la description du dtype) complété
+à un multiple de 64 octets, puis les enregistrements bruts.
+"""
+import json
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+import numpy as np
+from config.settings import FEATURE_LOG_CHUNK_SIZE, FEATURE_LOG_FLUSH_INTERVAL
+from core.logger import setup_logger
+
+logger = setup_logger("FeatureLog")
+
+MAGIC = b"SWFLOG01"
+FORMAT_VERSION = 1
+HEADER_ALIGN = 64
+
+# Codes des positions de tête dans les colonnes
+HEAD_POSITIONS = ('center', 'left', 'right', 'down')
+_HEAD_CODES = {name: code for code, name in enumerate(HEAD_POSITIONS)}
+
+# États de l'analyseur enregistrés (un booléen par état)
+STATE_FLAGS = (
+    'fatigue_detected',
+    'distraction_detected',
+    'phone_detected',
+    'driver_absent',
+    'yawn_detected',
+    'abnormal_blink_rate',
+    'excessive_head_movement'
+)
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('frame_index', '<u4'),
+    ('driver_id', '<i2'),          # -1 si aucun conducteur identifié
+    ('num_faces', 'u1'),
+    ('face_detected', '?'),
+    ('eyes_open', '?'),
+    ('mouth_open', '?'),
+    ('head_position', 'u1'),       # index dans HEAD_POSITIONS
+    ('left_ear', '<f4'),
+    ('right_ear', '<f4'),
+    ('mar', '<f4'),
+    ('hands_detected', '?'),
+    ('num_hands', 'u1'),
+    ('left_hand_detected', '?'),
+    ('right_hand_detected', '?'),
+    ('phone_detected', '?'),
+    ('phone_confidence', '<f4'),
+    ('phone_bbox', '<f4', (4,)),   # NaN si aucun téléphone
+] + [('state_' + flag, '?') for flag in STATE_FLAGS] + [
+    ('num_alerts', 'u1'),
+    ('frame_usable', '?'),         # False: frame inexploitable (détecteurs non exécutés)
+])
+
+def _encode_header(dtype: np.dtype) -> bytes:
+    """Construit l'en-tête du fichier, aligné sur HEADER_ALIGN octets"""
+    meta = json.dumps({'version': FORMAT_VERSION, 'descr': dtype.descr}).encode("utf-8")
+    header = MAGIC + struct.pack("<I", len(meta)) + meta
+    padding = -len(header) % HEADER_ALIGN
+    return header + b" " * padding
+
+def _read_header(f) -> tuple:
+    """
+    Lit l'en-tête d'un journal
+
+    Returns:
+        Tuple (dtype des enregistrements, taille de l'en-tête en octets)
+    """
+    magic = f.read(len(MAGIC))
+    if magic != MAGIC:
+        raise ValueError("Fichier non reconnu comme journal de caractéristiques SafeWay")
+    (meta_len,) = struct.unpack("<I", f.read(4))
+    meta = json.loads(f.read(meta_len).decode("utf-8"))
+    descr = [tuple(tuple(x) if isinstance(x, list) else x for x in field) for field in meta['descr']]
+    header_size = len(MAGIC) + 4 + meta_len
+    header_size += -header_size % HEADER_ALIGN
+    return np.dtype(descr), header_size
+
+class FeatureLogWriter:
+    """
+    Écrit le journal par blocs depuis un thread d'arrière-plan
+
+    La boucle de traitement ne fait que remplir une ligne du bloc courant;
+    l'écriture disque a lieu dans le thread d'écriture.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        chunk_size: int = FEATURE_LOG_CHUNK_SIZE,
+        flush_interval: float = FEATURE_LOG_FLUSH_INTERVAL,
+        max_pending_chunks: int = 64
+    ):
+        """
+        Ouvre (ou complète) un journal
+
+        Args:
+            path: Chemin du fichier journal
+            chunk_size: Nombre d'enregistrements par bloc écrit
+            flush_interval: Secondes max avant d'écrire un bloc incomplet
+            max_pending_chunks: Blocs en attente max (au-delà, les blocs sont perdus)
+        """
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.dropped_chunks = 0
+        self.records_written = 0
+
+        self._chunk = np.zeros(chunk_size, dtype=RECORD_DTYPE)
+        self._count = 0
+        self._last_submit = time.monotonic()
+        self._queue: "queue.Queue[Optional[np.ndarray]]" = queue.Queue(maxsize=max_pending_chunks)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size > 0:
+            with open(self.path, "rb") as f:
+                dtype, header_size = _read_header(f)
+            if dtype != RECORD_DTYPE:
+                raise ValueError(f"Format de journal incompatible: {self.path}")
+            # Ignorer un éventuel enregistrement partiel (arrêt brutal)
+            size = self.path.stat().st_size
+            valid_size = header_size + (size - header_size) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+            self._file = open(self.path, "r+b")
+            self._file.truncate(valid_size)
+            self._file.seek(valid_size)
+        else:
+            self._file = open(self.path, "wb")
+            self._file.write(_encode_header(RECORD_DTYPE))
+            self._file.flush()
+
+        self._thread = threading.Thread(target=self._writer_loop, name="FeatureLogWriter", daemon=True)
+        self._thread.start()
+        logger.info(f"Journal de caractéristiques: {self.path}")
+
+    def append(
+        self,
+        frame_index: int,
+        timestamp: float,
+        face_results: Dict,
+        hand_results: Dict,
+        yolo_results: Dict,
+        analysis: Dict
+    ):
+        """
+        Ajoute l'enregistrement d'une frame
+
+        Args:
+            frame_index: Numéro de la frame
+            timestamp: Instant de capture (secondes)
+            face_results: Résultats de FaceDetector.detect
+            hand_results: Résultats de HandDetector.detect
+            yolo_results: Résultats de YOLODetector.detect
+            analysis: Résultat de StateAnalyzer(Pool).analyze
+        """
+        record = self._chunk[self._count]
+        record['timestamp'] = timestamp
+        record['frame_index'] = frame_index
+        driver_id = face_results.get('driver_id')
+        record['driver_id'] = -1 if driver_id is None else driver_id
+        record['num_faces'] = face_results.get('num_faces', int(face_results.get('face_detected', False)))
+        record['face_detected'] = face_results.get('face_detected', False)
+        record['eyes_open'] = face_results.get('eyes_open', True)
+        record['mouth_open'] = face_results.get('mouth_open', False)
+        record['head_position'] = _HEAD_CODES.get(face_results.get('head_position', 'center'), 0)
+        record['left_ear'] = face_results.get('left_ear', 0.0)
+        record['right_ear'] = face_results.get('right_ear', 0.0)
+        record['mar'] = face_results.get('mar', 0.0)
+
+        record['hands_detected'] = hand_results.get('hands_detected', False)
+        record['num_hands'] = hand_results.get('num_hands', 0)
+        record['left_hand_detected'] = hand_results.get('left_hand_detected', False)
+        record['right_hand_detected'] = hand_results.get('right_hand_detected', False)
+
+        record['phone_detected'] = yolo_results.get('phone_detected', False)
+        record['phone_confidence'] = yolo_results.get('phone_confidence', 0.0)
+        bbox = yolo_results.get('phone_bbox')
+        record['phone_bbox'] = bbox if bbox else np.nan
+
+        state = analysis.get('state', {})
+        for flag in STATE_FLAGS:
+            record['state_' + flag] = state.get(flag, False)
+        record['num_alerts'] = min(len(analysis.get('alerts', [])), 255)
+        record['frame_usable'] = face_results.get('frame_usable', True)
+
+        self._count += 1
+        if self._count == self.chunk_size or time.monotonic() - self._last_submit > self.flush_interval:
+            self._submit()
+
+    def _submit(self):
+        """Confie le bloc courant au thread d'écriture et en démarre un nouveau"""
+        if self._count == 0:
+            return
+        chunk = self._chunk[:self._count]
+        try:
+            self._queue.put_nowait(chunk)
+        except queue.Full:
+            self.dropped_chunks += 1
+            logger.warning(f"Écriture du journal en retard, bloc de {self._count} frames perdu "
+                           f"({self.dropped_chunks} au total)")
+        # Nouveau bloc: le précédent appartient désormais au thread d'écriture
+        self._chunk = np.zeros(self.chunk_size, dtype=RECORD_DTYPE)
+        self._count = 0
+        self._last_submit = time.monotonic()
+
+    def _writer_loop(self):
+        """Écrit les blocs reçus jusqu'à la sentinelle None"""
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            try:
+                self._file.write(chunk.tobytes())
+                self._file.flush()
+                self.records_written += len(chunk)
+            except OSError as e:
+                logger.error(f"Erreur d'écriture du journal: {e}")
+
+    def close(self):
+        """Écrit le bloc en cours, attend la fin des écritures et ferme le fichier"""
+        if self._file.closed:
+            return
+        self._submit()
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        logger.info(f"Journal fermé: {self.records_written} frames enregistrées")
+
+def read_feature_log(path: Union[str, Path]) -> np.memmap:
+    """
+    Ouvre un journal en lecture par mmap
+
+    Les colonnes s'obtiennent directement par nom (ex: records['left_ear']);
+    seules les pages effectivement lues sont chargées en mémoire. Un
+    enregistrement incomplet en fin de fichier est ignoré.
+
+    Args:
+        path: Chemin du fichier journal
+
+    Returns:
+        Tableau structuré (lecture seule) des enregistrements
+    """
+    path = Path(path)
+    with open(path, "rb") as f:
+        dtype, header_size = _read_header(f)
+    n_records = (path.stat().st_size - header_size) // dtype.itemsize
+    if n_records == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=header_size, shape=(n_records,))
+
+def decode_head_positions(codes: np.ndarray) -> np.ndarray:
+    """
+    Convertit les codes de position de tête en textes
+
+    Args:
+        codes: Codes (index dans HEAD_POSITIONS)
+
+    Returns:
+        Tableau des positions ('center', 'left', 'right', 'down')
+    """
+    return np.asarray(HEAD_POSITIONS)[np.asarray(codes)]
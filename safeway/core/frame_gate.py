@@ -0,0 +1,191 @@
+"""
+Filtrage des frames avant les détecteurs pour SafeWay
+
+FrameQualityGate écarte les frames inexploitables (trop sombres, éblouies,
+sans contraste ou floues): les détecteurs ne sont pas lancés et l'analyseur
+considère l'état du conducteur comme inconnu plutôt qu'absent.
+
+Véhicule à l'arrêt ou en croisière: les frames consécutives sont presque
+identiques. ChangeGate compare une vignette en niveaux de gris de chaque frame
+à celle de la dernière frame analysée (différence moyenne par bloc): tant
+qu'aucun bloc n'a changé, les résultats précédents sont réutilisés. Une
+frame est toujours analysée après max_staleness secondes, ce qui borne le
+retard sur les durées mesurées (yeux fermés, distraction).
+"""
+from typing import Dict, Optional, Tuple
+import cv2
+import numpy as np
+from config.settings import (
+    QUALITY_MIN_BRIGHTNESS,
+    QUALITY_MAX_SATURATED,
+    QUALITY_MIN_CONTRAST,
+    QUALITY_MIN_SHARPNESS,
+    QUALITY_SIZE,
+    CHANGE_GATE_THRESHOLD,
+    CHANGE_GATE_MAX_STALENESS,
+    CHANGE_GATE_SIZE,
+    CHANGE_GATE_BLOCKS
+)
+
+def downsample_gray(frame: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """
+    Vignette en niveaux de gris d'une frame
+
+    Args:
+        frame: Image BGR
+        size: Taille de la vignette (largeur, hauteur)
+
+    Returns:
+        Vignette uint8
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+class ChangeGate:
+    """
+    Décide si une frame a assez changé pour relancer les détecteurs
+    """
+
+    def __init__(
+        self,
+        threshold: float = CHANGE_GATE_THRESHOLD,
+        max_staleness: float = CHANGE_GATE_MAX_STALENESS,
+        size: Tuple[int, int] = CHANGE_GATE_SIZE,
+        blocks: Tuple[int, int] = CHANGE_GATE_BLOCKS
+    ):
+        """
+        Initialise le filtre
+
+        Args:
+            threshold: Différence moyenne (0-255) du bloc le plus modifié au-delà de laquelle la frame est analysée
+            max_staleness: Secondes maximum de réutilisation des résultats
+            size: Taille de la vignette comparée (largeur, hauteur)
+            blocks: Découpage de la vignette en blocs (colonnes, lignes): un petit
+                changement local (paupières) n'est pas dilué dans toute l'image
+        """
+        self.threshold = threshold
+        self.max_staleness = max_staleness
+        self.size = size
+        self.blocks = blocks
+        self._reference: Optional[np.ndarray] = None
+        self._reference_time: Optional[float] = None
+        self.last_change = 0.0
+        self.frames = 0
+        self.skipped = 0
+
+    def change(self, thumbnail: np.ndarray) -> float:
+        """Différence moyenne du bloc le plus modifié par rapport à la référence"""
+        diff = cv2.absdiff(thumbnail, self._reference).astype(np.float32)
+        columns, rows = self.blocks
+        height, width = diff.shape
+        diff = diff[:height - height % rows, :width - width % columns]
+        block_means = diff.reshape(rows, diff.shape[0] // rows, columns, diff.shape[1] // columns).mean(axis=(1, 3))
+        return float(block_means.max())
+
+    def should_process(self, frame: np.ndarray, timestamp: float) -> bool:
+        """
+        Indique si les détecteurs doivent traiter la frame
+
+        Args:
+            frame: Image BGR
+            timestamp: Instant de capture en secondes
+
+        Returns:
+            True si la frame doit être analysée (elle devient la nouvelle référence),
+            False si les résultats précédents peuvent être réutilisés
+        """
+        self.frames += 1
+        thumbnail = downsample_gray(frame, self.size)
+        if self._reference is not None and timestamp - self._reference_time < self.max_staleness:
+            self.last_change = self.change(thumbnail)
+            if self.last_change < self.threshold:
+                self.skipped += 1
+                return False
+        self._reference = thumbnail
+        self._reference_time = timestamp
+        return True
+
+    def reset(self):
+        """Oublie la référence (la prochaine frame est analysée)"""
+        self._reference = None
+        self._reference_time = None
+
+    @property
+    def skip_ratio(self) -> float:
+        """Fraction des frames dont l'analyse a été évitée"""
+        return self.skipped / self.frames if self.frames else 0.0
+
+class FrameQualityGate:
+    """
+    Évalue l'exposition, le contraste et la netteté d'une frame sur une vignette
+    """
+
+    def __init__(
+        self,
+        min_brightness: float = QUALITY_MIN_BRIGHTNESS,
+        max_saturated: float = QUALITY_MAX_SATURATED,
+        min_contrast: float = QUALITY_MIN_CONTRAST,
+        min_sharpness: float = QUALITY_MIN_SHARPNESS,
+        size: Tuple[int, int] = QUALITY_SIZE
+    ):
+        """
+        Initialise le contrôle de qualité
+
+        Args:
+            min_brightness: Luminosité moyenne minimum (0-255)
+            max_saturated: Fraction maximum de pixels saturés (éblouissement)
+            min_contrast: Écart-type minimum des niveaux de gris
+            min_sharpness: Variance minimum du laplacien (flou de bougé)
+            size: Taille de la vignette évaluée (largeur, hauteur)
+        """
+        self.min_brightness = min_brightness
+        self.max_saturated = max_saturated
+        self.min_contrast = min_contrast
+        self.min_sharpness = min_sharpness
+        self.size = size
+        self.frames = 0
+        self.rejected = 0
+
+    def assess(self, frame: np.ndarray) -> Dict:
+        """
+        Évalue une frame
+
+        Args:
+            frame: Image BGR
+
+        Returns:
+            Dictionnaire avec 'usable', la raison du rejet ('reason': 'dark',
+            'glare', 'low_contrast', 'blur' ou None) et les scores
+        """
+        self.frames += 1
+        thumbnail = downsample_gray(frame, self.size)
+        brightness, contrast = cv2.meanStdDev(thumbnail)
+        brightness = float(brightness[0, 0])
+        contrast = float(contrast[0, 0])
+        saturated = float(np.count_nonzero(thumbnail >= 250)) / thumbnail.size
+        sharpness = float(cv2.Laplacian(thumbnail, cv2.CV_32F).var())
+
+        reason = None
+        if brightness < self.min_brightness:
+            reason = 'dark'
+        elif saturated > self.max_saturated:
+            reason = 'glare'
+        elif contrast < self.min_contrast:
+            reason = 'low_contrast'
+        elif sharpness < self.min_sharpness:
+            reason = 'blur'
+        if reason is not None:
+            self.rejected += 1
+        return {
+            'usable': reason is None,
+            'reason': reason,
+            'brightness': brightness,
+            'contrast': contrast,
+            'saturated': saturated,
+            'sharpness': sharpness
+        }
+
+    @property
+    def reject_ratio(self) -> float:
+        """Fraction des frames rejetées"""
+        return self.rejected / self.frames if self.frames else 0.0
@@ -1,45 +1,236 @@
 """
 Système de logging pour SafeWay
+
+En mode asynchrone (LOG_ASYNC), les loggers ne font que déposer les
+messages dans une file bornée: un unique thread d'écriture les formate, les
+écrit par lots (un seul flush par lot) dans un fichier avec rotation par
+taille et sur la console. Les messages identiques répétés à chaque frame
+sont limités en fréquence.
 """
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
-from pathlib import Path
-from config.settings import LOG_FILE, LOG_LEVEL
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from config.settings import (
+    ensure_data_dirs,
+    LOG_FILE,
+    LOG_LEVEL,
+    LOG_ASYNC,
+    LOG_QUEUE_SIZE,
+    LOG_MAX_BYTES,
+    LOG_BACKUP_COUNT,
+    LOG_RATE_LIMIT
+)
+
+# Format des logs
+_FORMATTER = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+class _BatchFlushMixin:
+    """Handler vidé une fois par lot par le thread d'écriture, et non à chaque message"""
+
+    def flush(self):
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+class _BatchFileHandler(_BatchFlushMixin, logging.handlers.RotatingFileHandler):
+    """Fichier de logs avec rotation par taille"""
+
+class _BatchStreamHandler(_BatchFlushMixin, logging.StreamHandler):
+    """Console"""
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limite la fréquence des messages identiques émis au même endroit
+
+    Un message répété est émis au plus une fois par intervalle; le nombre de
+    répétitions supprimées est ajouté au message suivant. Les erreurs
+    critiques ne sont jamais filtrées.
+    """
+
+    def __init__(self, interval: float = LOG_RATE_LIMIT):
+        """
+        Args:
+            interval: Secondes minimum entre deux messages identiques
+        """
+        super().__init__()
+        self.interval = interval
+        # (logger, ligne, message) -> (dernière émission, répétitions supprimées)
+        self._last: Dict[Tuple, List] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.interval <= 0 or record.levelno >= logging.CRITICAL:
+            return True
+        key = (record.name, record.lineno, record.getMessage())
+        now = time.monotonic()
+        entry = self._last.get(key)
+        if entry is not None and now - entry[0] < self.interval:
+            entry[1] += 1
+            return False
+        if entry is not None and entry[1]:
+            record.msg = f"{record.getMessage()} ({entry[1]} messages identiques supprimés)"
+            record.args = None
+        self._last[key] = [now, 0]
+        if len(self._last) > 1000:
+            # Oublier les messages qui ne se répètent plus
+            self._last = {k: v for k, v in self._last.items() if now - v[0] < self.interval}
+        return True
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Dépose les messages dans la file sans jamais bloquer (messages perdus si pleine)"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        if _writer is None:
+            _start_writer()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class _LogWriter:
+    """
+    Thread d'écriture unique: vide la file par lots vers le fichier et la console
+    """
+
+    BATCH_SIZE = 512
+
+    def __init__(self, log_queue: queue.Queue, handlers: List[logging.Handler], queue_handler: _DroppingQueueHandler):
+        self.queue = log_queue
+        self.handlers = handlers
+        self.queue_handler = queue_handler
+        self._reported_drops = 0
+        self._stop = object()
+        self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+        self._thread.start()
+
+    def _write(self, record: logging.LogRecord):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _run(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            try:
+                while len(batch) < self.BATCH_SIZE:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            for record in batch:
+                if record is self._stop:
+                    running = False
+                    continue
+                self._write(record)
+
+            # Signaler les messages perdus faute de place dans la file
+            dropped = self.queue_handler.dropped
+            if dropped > self._reported_drops:
+                self._write(logging.makeLogRecord({
+                    'name': 'Logger', 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                    'msg': f"{dropped - self._reported_drops} messages perdus (file de logs pleine)"
+                }))
+                self._reported_drops = dropped
+
+            for handler in self.handlers:
+                handler.flush_batch()
+
+    def stop(self):
+        """Écrit les messages en attente puis arrête le thread"""
+        self.queue.put(self._stop)
+        self._thread.join(timeout=5.0)
+        for handler in self.handlers:
+            handler.close()
+
+_queue_handler: Optional[_DroppingQueueHandler] = None
+_writer: Optional[_LogWriter] = None
+_lock = threading.Lock()
+
+def _get_queue_handler() -> _DroppingQueueHandler:
+    """Crée au premier appel la file et le handler partagé par tous les loggers"""
+    global _queue_handler
+    with _lock:
+        if _queue_handler is None:
+            _queue_handler = _DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+            _queue_handler.addFilter(RateLimitFilter())
+        return _queue_handler
+
+def _start_writer():
+    """
+    Ouvre les sorties et démarre le thread d'écriture au premier message
+
+    Rien n'est créé sur le disque tant qu'aucun message n'est émis: importer
+    un module reste sans effet de bord.
+    """
+    global _writer
+    with _lock:
+        if _writer is None:
+            ensure_data_dirs()
+            file_handler = _BatchFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                                             encoding="utf-8")
+            file_handler.setLevel(logging.DEBUG)
+            file_handler.setFormatter(_FORMATTER)
+            console_handler = _BatchStreamHandler(sys.stdout)
+            console_handler.setLevel(logging.INFO)
+            console_handler.setFormatter(_FORMATTER)
+
+            _writer = _LogWriter(_queue_handler.queue, [file_handler, console_handler], _queue_handler)
+            atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """Écrit les messages en attente et arrête le thread d'écriture (appelé à la sortie)"""
+    global _writer
+    with _lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
 
 def setup_logger(name: str = "SafeWay") -> logging.Logger:
     """
     Configure et retourne un logger pour SafeWay
-    
+
     Args:
         name: Nom du logger
-        
+
     Returns:
         Logger configuré
     """
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, LOG_LEVEL))
-    
+
     # Éviter les doublons de handlers
     if logger.handlers:
         return logger
-    
-    # Format des logs
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
+
+    if LOG_ASYNC:
+        # File partagée par tous les loggers, un seul thread d'écriture
+        logger.addHandler(_get_queue_handler())
+        return logger
+
     # Handler pour fichier
+    ensure_data_dirs()
     file_handler = logging.FileHandler(LOG_FILE)
     file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(_FORMATTER)
     logger.addHandler(file_handler)
-    
+
     # Handler pour console
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
+    console_handler.setFormatter(_FORMATTER)
     logger.addHandler(console_handler)
-    
-    return logger
 
+    return logger
@@ -0,0 +1,267 @@
+"""
+Suivi de la mémoire sur longue durée pour SafeWay
+
+Les unités tournent par quarts de 12 heures: une fuite de quelques Ko par
+frame suffit à épuiser la mémoire. MemoryMonitor échantillonne périodiquement
+le RSS du processus et un instantané tracemalloc, dont les allocations sont
+regroupées par composant (module SafeWay, paquet tiers ou module standard).
+Le rapport donne la pente de croissance de chaque composant (octets/heure,
+régression sur les échantillons) et signale ceux qui dépassent
+MEMORY_GROWTH_LIMIT sur toute la durée et encore sur la seconde moitié (une
+croissance continue, pas un cache rempli une fois). Le moniteur est lui-même
+borné: un échantillon de référence et au plus MEMORY_MAX_SAMPLES échantillons
+récents.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from config.settings import (
+    MEMORY_SAMPLE_INTERVAL,
+    MEMORY_MAX_SAMPLES,
+    MEMORY_TRACE_FRAMES,
+    MEMORY_GROWTH_LIMIT
+)
+from core.logger import setup_logger
+
+logger = setup_logger("MemoryMonitor")
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# Lignes d'allocation les plus en croissance reportées pour les composants signalés
+TOP_LINES = 10
+
+def current_rss() -> int:
+    """
+    Mémoire résidente du processus en octets
+
+    Returns:
+        RSS courant (Linux), sinon pic de RSS du processus
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def component_for(filename: str) -> str:
+    """
+    Composant responsable d'un fichier source
+
+    Args:
+        filename: Fichier de la trace tracemalloc
+
+    Returns:
+        Module SafeWay ('ai.face_detector'), paquet tiers ('mediapipe'),
+        module standard ('logging') ou '<autre>'
+    """
+    path = Path(filename)
+    try:
+        relative = path.resolve().relative_to(PROJECT_ROOT)
+        return ".".join(relative.with_suffix("").parts)
+    except ValueError:
+        pass
+    parts = path.parts
+    for marker in ("site-packages", "dist-packages"):
+        if marker in parts:
+            index = parts.index(marker)
+            if index + 1 < len(parts):
+                return Path(parts[index + 1]).stem
+    for index, part in enumerate(parts[:-1]):
+        if part.startswith("python3"):
+            return Path(parts[index + 1]).stem
+    return "<autre>"
+
+class MemoryMonitor:
+    """
+    Échantillonne RSS et tracemalloc dans un thread et mesure la croissance par composant
+    """
+
+    def __init__(
+        self,
+        interval: float = MEMORY_SAMPLE_INTERVAL,
+        max_samples: int = MEMORY_MAX_SAMPLES,
+        trace_frames: int = MEMORY_TRACE_FRAMES,
+        growth_limit: float = MEMORY_GROWTH_LIMIT
+    ):
+        """
+        Initialise le moniteur
+
+        Args:
+            interval: Secondes entre deux échantillons
+            max_samples: Échantillons récents conservés (en plus de la référence)
+            trace_frames: Profondeur des traces tracemalloc
+            growth_limit: Croissance (octets/heure) au-delà de laquelle un composant est signalé
+        """
+        self.interval = interval
+        self.trace_frames = trace_frames
+        self.growth_limit = growth_limit
+        self.baseline: Optional[Dict] = None
+        self.samples: deque = deque(maxlen=max_samples)
+        self._baseline_snapshot: Optional[tracemalloc.Snapshot] = None
+        self._filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__)
+        ]
+        self._start_time = time.monotonic()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Démarre tracemalloc, prend l'échantillon de référence et lance le thread"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+        self._start_time = time.monotonic()
+        self.sample()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="MemoryMonitor", daemon=True)
+        self._thread.start()
+        logger.info(f"Suivi mémoire actif (un échantillon toutes les {self.interval:g} s)")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Échantillon mémoire impossible: {e}")
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(self._filters)
+
+    def sample(self) -> Dict:
+        """
+        Prend un échantillon (RSS, mémoire tracée totale et par composant)
+
+        Returns:
+            Échantillon ajouté
+        """
+        snapshot = self._snapshot()
+        components: Dict[str, int] = {}
+        for stat in snapshot.statistics("filename"):
+            name = component_for(stat.traceback[0].filename)
+            components[name] = components.get(name, 0) + stat.size
+        sample = {
+            'time': time.monotonic() - self._start_time,
+            'rss': current_rss(),
+            'traced': sum(components.values()),
+            'components': components
+        }
+        if self.baseline is None:
+            self.baseline = sample
+            self._baseline_snapshot = snapshot
+        else:
+            self.samples.append(sample)
+        return sample
+
+    def _slope(self, times: np.ndarray, values: np.ndarray) -> float:
+        """Pente de la régression linéaire en octets/heure"""
+        if len(times) < 3 or times[-1] - times[0] <= 0:
+            return 0.0
+        return float(np.polyfit(times / 3600.0, values, 1)[0])
+
+    def report(self) -> Dict:
+        """
+        Rapport de croissance mémoire
+
+        Returns:
+            Dictionnaire avec la croissance du RSS, de chaque composant, les
+            composants signalés et les lignes d'allocation qui ont le plus grossi
+        """
+        if self.baseline is None:
+            raise RuntimeError("Aucun échantillon: appelez start() d'abord")
+        samples = [self.baseline] + list(self.samples)
+        times = np.array([s['time'] for s in samples], dtype=np.float64)
+        last = samples[-1]
+        recent = len(samples) // 2
+
+        def growth(values: List[float]) -> Dict:
+            values = np.array(values, dtype=np.float64)
+            slope = self._slope(times, values)
+            recent_slope = self._slope(times[recent:], values[recent:])
+            return {
+                'start': int(values[0]),
+                'end': int(values[-1]),
+                'peak': int(values.max()),
+                'growth': int(values[-1] - values[0]),
+                'slope_per_hour': round(slope),
+                'recent_slope_per_hour': round(recent_slope),
+                'flagged': bool(slope > self.growth_limit and recent_slope > self.growth_limit
+                                and values[-1] > values[0])
+            }
+
+        names = set(self.baseline['components'])
+        for sample in samples:
+            names.update(sample['components'])
+        components = {name: growth([s['components'].get(name, 0) for s in samples]) for name in names}
+        flagged = sorted((name for name, c in components.items() if c['flagged']),
+                         key=lambda name: -components[name]['slope_per_hour'])
+
+        top_lines = []
+        if flagged and self._baseline_snapshot is not None:
+            for stat in self._snapshot().compare_to(self._baseline_snapshot, "lineno"):
+                frame = stat.traceback[0]
+                if stat.size_diff > 0 and component_for(frame.filename) in flagged:
+                    top_lines.append({'location': f"{frame.filename}:{frame.lineno}",
+                                      'size_diff': stat.size_diff, 'count_diff': stat.count_diff})
+                    if len(top_lines) >= TOP_LINES:
+                        break
+
+        return {
+            'duration': round(last['time'], 1),
+            'samples': len(samples),
+            'growth_limit_per_hour': self.growth_limit,
+            'rss': growth([s['rss'] for s in samples]),
+            'traced': growth([s['traced'] for s in samples]),
+            'components': dict(sorted(components.items(), key=lambda item: -item[1]['slope_per_hour'])),
+            'flagged': flagged,
+            'top_growth_lines': top_lines,
+            'timeline': [{'time': round(s['time'], 1), 'rss': s['rss'], 'traced': s['traced']} for s in samples]
+        }
+
+    def write_report(self, path: Path) -> Dict:
+        """
+        Écrit le rapport en JSON et le résume dans les logs
+
+        Args:
+            path: Fichier de destination
+
+        Returns:
+            Rapport écrit
+        """
+        report = self.report()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        mb = 1024 * 1024
+        logger.info(f"Mémoire sur {report['duration'] / 3600:.2f} h: RSS {report['rss']['start'] / mb:.0f} -> "
+                    f"{report['rss']['end'] / mb:.0f} Mo ({report['rss']['slope_per_hour'] / mb:+.1f} Mo/h)")
+        for name in report['flagged']:
+            component = report['components'][name]
+            logger.warning(f"Croissance mémoire: {name} {component['growth'] / 1024:+.0f} Ko "
+                           f"({component['slope_per_hour'] / 1024:+.0f} Ko/h)")
+        if report['rss']['flagged'] and not report['flagged']:
+            logger.warning("RSS en croissance sans composant Python signalé (allocations natives)")
+        logger.info(f"Rapport mémoire: {path}")
+        return report
+
+    def stop(self):
+        """Arrête l'échantillonnage (prend un dernier échantillon) et tracemalloc"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=5.0)
+            self._thread = None
+            self.sample()
+
+    def close(self):
+        """Arrête le moniteur et libère les traces"""
+        self.stop()
+        self._baseline_snapshot = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
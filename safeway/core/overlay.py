@@ -0,0 +1,147 @@
+"""
+Compositeur d'annotations pour SafeWay
+
+Les composants (détecteurs, alertes, interface) empilent des commandes de
+dessin; le compositeur les rend en une seule passe sur un tampon de sortie
+unique, réutilisé d'une frame à l'autre.
+"""
+import cv2
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+from core.sprites import Sprite, SpriteCache
+
+Color = Tuple[int, int, int]
+
+class OverlayCompositor:
+    """
+    Collecte les commandes de dessin de tous les composants et les rend en une passe
+    """
+
+    def __init__(self):
+        """Initialise le compositeur"""
+        self._commands: List[Tuple] = []
+        # Calques statiques et libellés rendus une seule fois
+        self.sprites = SpriteCache()
+        self._buffer: Optional[np.ndarray] = None
+
+    def add_lines(self, segments: np.ndarray, color: Color, thickness: int = 1):
+        """
+        Ajoute un lot de segments dessinés en un seul appel OpenCV
+
+        Args:
+            segments: Tableau (N, 2, 2) de segments en pixels
+            color: Couleur BGR
+            thickness: Épaisseur du trait
+        """
+        if len(segments):
+            self._commands.append(('lines', np.asarray(segments, dtype=np.int32), color, thickness))
+
+    def add_circles(self, centers: np.ndarray, radius: int, color: Color, thickness: int = -1):
+        """
+        Ajoute un lot de cercles de même rayon et même couleur
+
+        Args:
+            centers: Tableau (N, 2) des centres en pixels
+            radius: Rayon des cercles
+            color: Couleur BGR
+            thickness: Épaisseur (-1 = plein)
+        """
+        if len(centers):
+            self._commands.append(('circles', np.asarray(centers, dtype=np.int32), radius, color, thickness))
+
+    def add_rectangle(self, pt1: Tuple[int, int], pt2: Tuple[int, int], color: Color, thickness: int = 1):
+        """Ajoute un rectangle (thickness=-1 pour un rectangle plein)"""
+        self._commands.append(('rectangle', pt1, pt2, color, thickness))
+
+    def add_text(
+        self,
+        text: str,
+        org: Tuple[int, int],
+        font_scale: float,
+        color: Color,
+        thickness: int = 1
+    ):
+        """Ajoute un texte (police cv2.FONT_HERSHEY_SIMPLEX)"""
+        self._commands.append(('text', text, org, font_scale, color, thickness))
+
+    def add_label(
+        self,
+        text: str,
+        org: Tuple[int, int],
+        font_scale: float,
+        color: Color,
+        thickness: int = 1
+    ):
+        """
+        Ajoute un libellé récurrent, rasterisé une seule fois puis mis en cache
+
+        À utiliser pour les textes qui reviennent d'une frame à l'autre (statuts);
+        les textes qui changent à chaque frame passent par add_text.
+        """
+        self._commands.append(('sprite', self.sprites.get_text(text, font_scale, color, thickness), org))
+
+    def add_sprite(self, sprite: Sprite, anchor: Tuple[int, int] = (0, 0)):
+        """Ajoute un sprite pré-rendu, mélangé par canal alpha au point d'ancrage"""
+        self._commands.append(('sprite', sprite, anchor))
+
+    def add_static(self, key: str, draw_fn: Callable[[np.ndarray], None]):
+        """
+        Demande l'affichage d'un élément statique pour cette frame
+
+        L'élément est rasterisé une seule fois par résolution via draw_fn (qui
+        dessine sur un canevas noir), puis recopié tel quel aux frames suivantes.
+
+        Args:
+            key: Identifiant unique de l'élément
+            draw_fn: Fonction qui dessine l'élément sur le canevas fourni
+        """
+        self._commands.append(('static', key, draw_fn))
+
+    def render(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Rend toutes les commandes en attente sur une copie unique de la frame
+
+        Le tampon retourné est réutilisé à l'appel suivant: il doit être affiché
+        ou copié avant la prochaine frame.
+
+        Args:
+            frame: Image BGR source (non modifiée)
+
+        Returns:
+            Image annotée
+        """
+        if self._buffer is None or self._buffer.shape != frame.shape:
+            self._buffer = np.empty_like(frame)
+        output = self._buffer
+        np.copyto(output, frame)
+
+        # Rendu dans l'ordre d'ajout
+        for command in self._commands:
+            kind = command[0]
+            if kind == 'static':
+                # Élément statique: calque mis en cache pour cette résolution
+                _, key, draw_fn = command
+                self.sprites.get_layer(key, draw_fn, frame.shape).blit(output)
+            elif kind == 'sprite':
+                _, sprite, anchor = command
+                sprite.blit(output, anchor)
+            elif kind == 'lines':
+                _, segments, color, thickness = command
+                cv2.polylines(output, list(segments), False, color, thickness)
+            elif kind == 'circles':
+                _, centers, radius, color, thickness = command
+                for x, y in centers:
+                    cv2.circle(output, (int(x), int(y)), radius, color, thickness)
+            elif kind == 'rectangle':
+                _, pt1, pt2, color, thickness = command
+                cv2.rectangle(output, pt1, pt2, color, thickness)
+            elif kind == 'text':
+                _, text, org, font_scale, color, thickness = command
+                cv2.putText(output, text, org, cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, thickness)
+
+        self.clear()
+        return output
+
+    def clear(self):
+        """Vide les commandes en attente (les calques statiques restent en cache)"""
+        self._commands = []
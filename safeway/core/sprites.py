@@ -0,0 +1,156 @@
+"""
+Cache de sprites pré-rendus pour SafeWay
+
+Les bandeaux d'alerte et les libellés de statut ne changent pas d'une frame
+à l'autre: ils sont rasterisés une seule fois (par texte, couleur, sévérité
+ou résolution) puis simplement mélangés dans l'image par canal alpha.
+"""
+import cv2
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+Color = Tuple[int, int, int]
+
+class Sprite:
+    """
+    Image BGR pré-rendue avec canal alpha et position d'ancrage
+    """
+
+    def __init__(self, pixels: np.ndarray, alpha: np.ndarray, offset: Tuple[int, int] = (0, 0)):
+        """
+        Initialise le sprite
+
+        Args:
+            pixels: Image BGR (h, w, 3)
+            alpha: Opacité (h, w) de 0 à 255
+            offset: Décalage (x, y) du coin haut-gauche par rapport au point d'ancrage
+        """
+        # Sprite sans transparence partielle: simple copie masquée (chemin rapide)
+        self.binary = bool(np.isin(alpha, (0, 255)).all())
+        if self.binary:
+            self.pixels = np.ascontiguousarray(pixels)
+            # Masque aux dimensions complètes: bien plus rapide qu'un masque diffusé
+            self.mask = np.repeat((alpha == 255)[:, :, None], pixels.shape[2], axis=2)
+        else:
+            alpha = alpha.astype(np.uint16)[:, :, None]
+            # Pré-multiplication pour réduire le mélange à une multiplication-addition
+            self.premultiplied = pixels.astype(np.uint16) * alpha
+            self.inverse_alpha = 255 - alpha
+        self.offset = offset
+        self.height, self.width = pixels.shape[:2]
+
+    def blit(self, frame: np.ndarray, anchor: Tuple[int, int] = (0, 0)):
+        """
+        Mélange le sprite dans l'image (modifiée en place)
+
+        Args:
+            frame: Image BGR de destination
+            anchor: Point d'ancrage (x, y) dans l'image
+        """
+        x = anchor[0] + self.offset[0]
+        y = anchor[1] + self.offset[1]
+        h, w = frame.shape[:2]
+        # Découper la partie visible du sprite
+        x1, y1 = max(x, 0), max(y, 0)
+        x2, y2 = min(x + self.width, w), min(y + self.height, h)
+        if x1 >= x2 or y1 >= y2:
+            return
+
+        sx, sy = x1 - x, y1 - y
+        roi = frame[y1:y2, x1:x2]
+        if self.binary:
+            np.copyto(roi, self.pixels[sy:sy + y2 - y1, sx:sx + x2 - x1],
+                      where=self.mask[sy:sy + y2 - y1, sx:sx + x2 - x1])
+            return
+        premultiplied = self.premultiplied[sy:sy + y2 - y1, sx:sx + x2 - x1]
+        inverse_alpha = self.inverse_alpha[sy:sy + y2 - y1, sx:sx + x2 - x1]
+        # Arrondi exact: un alpha de 0 ou 255 laisse les pixels inchangés ou les remplace
+        roi[:] = (premultiplied + roi * inverse_alpha + 127) // 255
+
+class SpriteCache:
+    """
+    Cache LRU de sprites (libellés de texte et calques statiques)
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Initialise le cache
+
+        Args:
+            max_entries: Nombre maximum de sprites conservés
+        """
+        self.max_entries = max_entries
+        self._sprites: "OrderedDict[Tuple, Sprite]" = OrderedDict()
+
+    def _lookup(self, key: Tuple, build: Callable[[], Sprite]) -> Sprite:
+        """Retourne le sprite d'une clé, en le construisant au premier appel"""
+        sprite = self._sprites.get(key)
+        if sprite is None:
+            sprite = build()
+            self._sprites[key] = sprite
+            if len(self._sprites) > self.max_entries:
+                self._sprites.popitem(last=False)
+        else:
+            self._sprites.move_to_end(key)
+        return sprite
+
+    def get_text(self, text: str, font_scale: float, color: Color, thickness: int = 1) -> Sprite:
+        """
+        Retourne le sprite d'un libellé (police cv2.FONT_HERSHEY_SIMPLEX)
+
+        Le sprite s'ancre comme cv2.putText: au début de la ligne de base du texte.
+
+        Args:
+            text: Texte à afficher
+            font_scale: Échelle de la police
+            color: Couleur BGR
+            thickness: Épaisseur du trait
+
+        Returns:
+            Sprite du libellé
+        """
+        def build() -> Sprite:
+            font = cv2.FONT_HERSHEY_SIMPLEX
+            (text_w, text_h), baseline = cv2.getTextSize(text, font, font_scale, thickness)
+            pad = thickness + 1
+            mask = np.zeros((text_h + baseline + 2 * pad, text_w + 2 * pad), dtype=np.uint8)
+            cv2.putText(mask, text, (pad, text_h + pad), font, font_scale, 255, thickness)
+            pixels = np.empty(mask.shape + (3,), dtype=np.uint8)
+            pixels[:] = color
+            return Sprite(pixels, mask, offset=(-pad, -(text_h + pad)))
+
+        return self._lookup(('text', text, font_scale, color, thickness), build)
+
+    def get_layer(self, key: str, draw_fn: Callable[[np.ndarray], None], shape: Tuple[int, ...]) -> Sprite:
+        """
+        Retourne le sprite d'un élément statique pour une résolution donnée
+
+        draw_fn dessine l'élément sur un canevas noir de la taille de l'image;
+        les pixels restés noirs sont transparents. Le sprite est réduit à la
+        boîte englobante du dessin et s'ancre en (0, 0).
+
+        Args:
+            key: Identifiant de l'élément
+            draw_fn: Fonction qui dessine l'élément sur le canevas fourni
+            shape: Dimensions de l'image cible
+
+        Returns:
+            Sprite de l'élément
+        """
+        def build() -> Sprite:
+            canvas = np.zeros(shape, dtype=np.uint8)
+            draw_fn(canvas)
+            mask = canvas.any(axis=2)
+            ys, xs = np.nonzero(mask)
+            if not len(ys):
+                return Sprite(canvas[:0, :0], mask[:0, :0])
+            y1, y2, x1, x2 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+            alpha = mask[y1:y2, x1:x2].astype(np.uint8) * 255
+            return Sprite(canvas[y1:y2, x1:x2], alpha, offset=(int(x1), int(y1)))
+
+        return self._lookup(('layer', key, tuple(shape[:2])), build)
+
+    def clear(self):
+        """Vide le cache"""
+        self._sprites.clear()
@@ -0,0 +1,104 @@
+"""
+Initialisation parallèle des composants de SafeWay
+
+Chargement des modèles, graphes MediaPipe, mixer/TTS et préchauffage de la
+caméra sont indépendants: ils sont lancés en même temps, si bien que le
+démarrage ne dure que le temps du composant le plus lent. Chaque composant
+est horodaté pour produire une chronologie du démarrage.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from core.logger import setup_logger
+
+logger = setup_logger("Startup")
+
+class ParallelInitializer:
+    """
+    Exécute les fonctions d'initialisation des composants en parallèle
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Initialise le lanceur
+
+        Args:
+            max_workers: Nombre maximum de threads (défaut: un par composant)
+        """
+        self.max_workers = max_workers
+        self._tasks: List[tuple] = []
+        # Chronologie: nom -> {'start', 'end' (secondes depuis le lancement), 'error'}
+        self.timeline: Dict[str, Dict] = {}
+        self.total_time = 0.0
+        # Composants requis dont l'initialisation a échoué
+        self.failed: List[str] = []
+
+    def add(self, name: str, init_fn: Callable[[], Any], required: bool = True):
+        """
+        Ajoute un composant
+
+        Args:
+            name: Nom du composant
+            init_fn: Fonction qui crée, charge et préchauffe le composant (lève une exception en cas d'échec)
+            required: Le démarrage échoue si ce composant échoue
+        """
+        self._tasks.append((name, init_fn, required))
+
+    def run(self) -> Dict[str, Any]:
+        """
+        Initialise tous les composants en parallèle
+
+        Returns:
+            Composants par nom (None pour ceux qui ont échoué, voir self.failed)
+        """
+        t0 = time.perf_counter()
+        components: Dict[str, Any] = {}
+
+        def timed(name: str, init_fn: Callable[[], Any]) -> Any:
+            entry = self.timeline[name]
+            entry['start'] = time.perf_counter() - t0
+            try:
+                return init_fn()
+            except Exception as e:
+                entry['error'] = str(e)
+                raise
+            finally:
+                entry['end'] = time.perf_counter() - t0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers or max(len(self._tasks), 1),
+                                thread_name_prefix="Init") as executor:
+            futures = {}
+            for name, init_fn, required in self._tasks:
+                self.timeline[name] = {'start': 0.0, 'end': 0.0, 'error': None, 'required': required}
+                futures[name] = executor.submit(timed, name, init_fn)
+
+            for name, _, required in self._tasks:
+                try:
+                    components[name] = futures[name].result()
+                except Exception as e:
+                    components[name] = None
+                    logger.error(f"Échec de l'initialisation de '{name}': {e}")
+                    if required:
+                        self.failed.append(name)
+
+        self.total_time = time.perf_counter() - t0
+        self.log_timeline()
+        return components
+
+    def log_timeline(self, width: int = 40):
+        """
+        Affiche la chronologie du démarrage (une barre par composant)
+
+        Args:
+            width: Largeur des barres en caractères
+        """
+        if not self.timeline:
+            return
+        scale = width / max(self.total_time, 1e-6)
+        logger.info(f"Démarrage en {self.total_time * 1000:.0f} ms:")
+        for name, entry in self.timeline.items():
+            offset = int(entry['start'] * scale)
+            length = max(int((entry['end'] - entry['start']) * scale), 1)
+            status = "" if entry['error'] is None else "  ÉCHEC"
+            logger.info(f"  {name:<10} |{' ' * offset}{'#' * length:<{width - offset}}| "
+                        f"{entry['start'] * 1000:6.0f} -> {entry['end'] * 1000:6.0f} ms{status}")
@@ -2,7 +2,8 @@
 Utilitaires pour SafeWay
 """
 import time
-from typing import List, Tuple
+from collections import deque
+from typing import List, Optional, Tuple
 import numpy as np
 
 def calculate_distance(point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
@@ -76,6 +77,47 @@ def calculate_mouth_aspect_ratio(mouth_landmarks: List) -> float:
     mar = (vertical_1 + vertical_2 + vertical_3) / (3.0 * horizontal)
     return mar
 
+def calculate_eye_aspect_ratio_batch(eye_points: np.ndarray) -> np.ndarray:
+    """
+    Calcule l'EAR de plusieurs visages en une seule opération vectorisée
+
+    Args:
+        eye_points: Tableau (N, 6, 2) des landmarks de l'œil pour N visages
+
+    Returns:
+        Tableau (N,) des ratios d'aspect (1.0 si la largeur de l'œil est nulle)
+    """
+    eye_points = np.asarray(eye_points, dtype=np.float64)
+    vertical_1 = np.linalg.norm(eye_points[:, 1] - eye_points[:, 5], axis=-1)
+    vertical_2 = np.linalg.norm(eye_points[:, 2] - eye_points[:, 4], axis=-1)
+    horizontal = np.linalg.norm(eye_points[:, 0] - eye_points[:, 3], axis=-1)
+
+    ear = np.ones(len(eye_points))
+    valid = horizontal > 0
+    ear[valid] = (vertical_1[valid] + vertical_2[valid]) / (2.0 * horizontal[valid])
+    return ear
+
+def calculate_mouth_aspect_ratio_batch(mouth_points: np.ndarray) -> np.ndarray:
+    """
+    Calcule le MAR de plusieurs visages en une seule opération vectorisée
+
+    Args:
+        mouth_points: Tableau (N, 8, 2) des landmarks de la bouche pour N visages
+
+    Returns:
+        Tableau (N,) des ratios d'aspect (0.0 si la largeur de la bouche est nulle)
+    """
+    mouth_points = np.asarray(mouth_points, dtype=np.float64)
+    vertical_1 = np.linalg.norm(mouth_points[:, 1] - mouth_points[:, 7], axis=-1)
+    vertical_2 = np.linalg.norm(mouth_points[:, 2] - mouth_points[:, 6], axis=-1)
+    vertical_3 = np.linalg.norm(mouth_points[:, 3] - mouth_points[:, 5], axis=-1)
+    horizontal = np.linalg.norm(mouth_points[:, 0] - mouth_points[:, 4], axis=-1)
+
+    mar = np.zeros(len(mouth_points))
+    valid = horizontal > 0
+    mar[valid] = (vertical_1[valid] + vertical_2[valid] + vertical_3[valid]) / (3.0 * horizontal[valid])
+    return mar
+
 def get_current_timestamp() -> float:
     """
     Retourne le timestamp actuel en secondes
@@ -85,3 +127,73 @@ def get_current_timestamp() -> float:
     """
     return time.time()
 
+def get_monotonic_timestamp() -> float:
+    """
+    Retourne un timestamp monotone en secondes (insensible aux changements d'heure)
+    
+    Horloge par défaut des analyses: seules les différences entre deux
+    timestamps ont un sens.
+    
+    Returns:
+        Timestamp monotone
+    """
+    return time.monotonic()
+
+class EventWindow:
+    """
+    Compteur d'événements sur une fenêtre glissante, mis à jour de façon incrémentale
+
+    Les événements expirés sont retirés en tête de file au fil de l'eau: chaque
+    événement entre et sort une seule fois, d'où un coût amorti O(1) par frame,
+    quelle que soit la durée de la fenêtre ou le FPS.
+    """
+
+    def __init__(self, window_s: Optional[float] = None, maxlen: Optional[int] = None):
+        """
+        Initialise la fenêtre
+
+        Args:
+            window_s: Durée de la fenêtre en secondes (None = pas d'expiration temporelle)
+            maxlen: Nombre maximum d'événements conservés (None = illimité)
+        """
+        self.window_s = window_s
+        self.timestamps: deque = deque(maxlen=maxlen)
+
+    def _expire(self, now: float):
+        """Retire les événements sortis de la fenêtre"""
+        if self.window_s is None:
+            return
+        timestamps = self.timestamps
+        while timestamps and now - timestamps[0] > self.window_s:
+            timestamps.popleft()
+
+    def add(self, timestamp: float):
+        """
+        Enregistre un événement
+
+        Args:
+            timestamp: Instant de l'événement (secondes)
+        """
+        self.timestamps.append(timestamp)
+        self._expire(timestamp)
+
+    def count(self, now: float) -> int:
+        """
+        Nombre d'événements dans la fenêtre
+
+        Args:
+            now: Instant courant (secondes)
+
+        Returns:
+            Nombre d'événements non expirés
+        """
+        self._expire(now)
+        return len(self.timestamps)
+
+    def oldest(self) -> Optional[float]:
+        """Instant du plus ancien événement conservé (None si vide)"""
+        return self.timestamps[0] if self.timestamps else None
+
+    def clear(self):
+        """Vide la fenêtre"""
+        self.timestamps.clear()
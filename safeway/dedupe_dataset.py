@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Déduplication du dataset SafeWay
+
+Les enregistrements de l'habitacle produisent des milliers de frames presque
+identiques. Ce script calcule en parallèle un hash perceptuel (dHash 64 bits)
+de chaque image, les indexe par blocs de bits pour retrouver rapidement les
+quasi-doublons, puis:
+- regroupe les quasi-doublons de chaque split autour de l'image conservée
+  (celle qui porte le plus d'annotations): chaque image retirée est à
+  distance <= max_distance de l'image gardée à sa place;
+- signale les images de train presque identiques à une image de val (fuite
+  qui fausse la validation).
+
+Par défaut, seul un rapport est produit; avec --prune, les doublons (et leurs
+labels) sont déplacés dans data/dataset/duplicates/ (réversible). Les
+quasi-doublons internes à val sont retirés comme ceux de train; en cas de
+fuite train/val, c'est la copie de train qui est retirée.
+"""
+import json
+import os
+import shutil
+import sys
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from core.dataset_shards import IMAGE_SUFFIXES, label_path_for, read_yolo_labels
+from core.logger import setup_logger
+
+logger = setup_logger("DedupeDataset")
+
+HASH_BITS = 64
+# Nombre de blocs de l'index: deux hashs à distance < INDEX_BANDS partagent au moins un bloc identique
+INDEX_BANDS = 8
+DEFAULT_MAX_DISTANCE = 4  # Distance de Hamming maximum entre quasi-doublons (sur 64 bits)
+HASH_CACHE_NAME = ".phash_cache.json"
+
+def dhash(image_path: Path) -> Optional[int]:
+    """
+    Hash perceptuel (différence horizontale sur une vignette 9x8 en niveaux de gris)
+
+    Args:
+        image_path: Chemin de l'image
+
+    Returns:
+        Hash 64 bits (None si l'image est illisible)
+    """
+    import cv2
+
+    image = cv2.imread(str(image_path), cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if image is None:
+        return None
+    thumbnail = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).flatten()
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+def hamming(a: int, b: int) -> int:
+    """Distance de Hamming entre deux hashs"""
+    return bin(a ^ b).count("1")
+
+def compute_hashes(images: List[Path], cache_path: Path, workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    Hashs perceptuels des images (en parallèle, avec cache incrémental)
+
+    Args:
+        images: Chemins des images
+        cache_path: Fichier de cache (hash réutilisé si l'image n'a pas changé)
+        workers: Threads de calcul (défaut: nombre de CPU)
+
+    Returns:
+        Hash par chemin d'image
+    """
+    cache = {}
+    if cache_path.exists():
+        cache = json.loads(cache_path.read_text())
+
+    hashes: Dict[str, int] = {}
+    todo = []
+    for path in images:
+        stat = path.stat()
+        entry = cache.get(str(path))
+        if entry is not None and entry[0] == [stat.st_mtime_ns, stat.st_size]:
+            hashes[str(path)] = entry[1]
+        else:
+            todo.append(path)
+
+    # cv2 libère le GIL pendant le décodage
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for path, value in zip(todo, executor.map(dhash, todo)):
+            if value is None:
+                logger.warning(f"Image illisible: {path}")
+                continue
+            hashes[str(path)] = value
+            stat = path.stat()
+            cache[str(path)] = [[stat.st_mtime_ns, stat.st_size], value]
+
+    if todo:
+        cache = {path: entry for path, entry in cache.items() if Path(path).exists()}
+        cache_path.write_text(json.dumps(cache))
+    logger.info(f"{len(hashes)} hashs ({len(todo)} calculés, {len(hashes) - len(todo)} en cache)")
+    return hashes
+
+class HashIndex:
+    """
+    Index des hashs par blocs de bits pour la recherche de quasi-doublons
+
+    Le hash est découpé en INDEX_BANDS blocs: deux hashs à distance d < INDEX_BANDS
+    ont au moins un bloc identique, seuls les hashs partageant un bloc sont comparés.
+    """
+
+    def __init__(self, bands: int = INDEX_BANDS):
+        self.bands = bands
+        self.band_bits = HASH_BITS // bands
+        self.buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self.hashes: List[int] = []
+
+    def _keys(self, value: int) -> List[Tuple[int, int]]:
+        mask = (1 << self.band_bits) - 1
+        return [(band, (value >> (band * self.band_bits)) & mask) for band in range(self.bands)]
+
+    def add(self, value: int) -> int:
+        """Ajoute un hash et retourne son identifiant"""
+        item = len(self.hashes)
+        self.hashes.append(value)
+        for key in self._keys(value):
+            self.buckets[key].append(item)
+        return item
+
+    def query(self, value: int, max_distance: int) -> List[int]:
+        """Identifiants des hashs à distance <= max_distance"""
+        candidates = set()
+        for key in self._keys(value):
+            candidates.update(self.buckets.get(key, ()))
+        return [item for item in candidates if hamming(self.hashes[item], value) <= max_distance]
+
+def _num_boxes(image_path: str) -> int:
+    return len(read_yolo_labels(label_path_for(Path(image_path))))
+
+def find_duplicates(
+    paths: List[str],
+    hashes: Dict[str, int],
+    max_distance: int,
+    excluded: Optional[Set[str]] = None
+) -> List[List[str]]:
+    """
+    Groupes de quasi-doublons d'un split
+
+    Les images sont parcourues par ordre de préférence (hors images exclues,
+    la plus annotée, puis la première par nom): chacune rejoint le groupe du
+    représentant conservé le plus proche s'il est à distance <= max_distance,
+    sinon elle devient le représentant d'un nouveau groupe. Une suite de
+    frames qui dérive lentement (panoramique) n'est donc pas réduite à une
+    seule image. Une image exclue (retirée de toute façon, ex: fuite vers val)
+    n'est conservée que si aucune image non exclue ne peut l'être à sa place.
+
+    Args:
+        paths: Images du split
+        hashes: Hash par image
+        max_distance: Distance de Hamming maximum à l'image conservée
+        excluded: Images à ne pas choisir comme image conservée
+
+    Returns:
+        Groupes d'au moins deux images; la première est celle à conserver
+    """
+    excluded = excluded or set()
+    index = HashIndex()
+    groups: List[List[str]] = []
+    for path in sorted(paths, key=lambda p: (p in excluded, -_num_boxes(p), p)):
+        value = hashes[path]
+        matches = index.query(value, max_distance)
+        if matches:
+            closest = min(matches, key=lambda item: (hamming(index.hashes[item], value), item))
+            groups[closest].append(path)
+        else:
+            index.add(value)
+            groups.append([path])
+    return [group for group in groups if len(group) > 1]
+
+def find_leaks(train: List[str], val: List[str], hashes: Dict[str, int], max_distance: int) -> List[Tuple[str, str, int]]:
+    """
+    Images de train presque identiques à une image de val
+
+    Returns:
+        Liste de (image train, image val, distance)
+    """
+    index = HashIndex()
+    for path in val:
+        index.add(hashes[path])
+    leaks = []
+    for path in train:
+        matches = index.query(hashes[path], max_distance)
+        if matches:
+            closest = min(matches, key=lambda item: hamming(index.hashes[item], hashes[path]))
+            leaks.append((path, val[closest], hamming(index.hashes[closest], hashes[path])))
+    return leaks
+
+def _move_duplicate(image_path: str, dataset_dir: Path, duplicates_dir: Path):
+    """Déplace une image et son label dans le dossier des doublons (arborescence conservée)"""
+    image_path = Path(image_path)
+    label_path = label_path_for(image_path)
+    for source in (image_path, label_path):
+        if source.exists():
+            target = duplicates_dir / source.relative_to(dataset_dir)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(source), str(target))
+
+def dedupe_dataset(
+    data_yaml: str = "data/dataset/dataset.yaml",
+    max_distance: int = DEFAULT_MAX_DISTANCE,
+    prune: bool = False,
+    workers: Optional[int] = None
+) -> Dict:
+    """
+    Recherche (et retire) les quasi-doublons et les fuites train/val
+
+    Args:
+        data_yaml: Chemin vers le fichier YAML de configuration du dataset
+        max_distance: Distance de Hamming maximum entre quasi-doublons (< INDEX_BANDS)
+        prune: Déplacer les doublons dans data/dataset/duplicates/
+        workers: Threads de calcul des hashs
+
+    Returns:
+        Rapport (groupes de doublons par split, fuites train/val, images retirées)
+    """
+    from train_yolo import dataset_split_dirs
+
+    if max_distance >= INDEX_BANDS:
+        raise ValueError(f"Distance maximum {max_distance} >= {INDEX_BANDS} (blocs de l'index)")
+    splits = dataset_split_dirs(data_yaml)
+    if not splits:
+        raise ValueError(f"Aucun dossier d'images trouvé pour {data_yaml}")
+    dataset_dir = next(iter(splits.values())).parent.parent
+
+    split_images = {split: sorted(str(path) for path in images_dir.rglob("*")
+                                  if path.suffix.lower() in IMAGE_SUFFIXES)
+                    for split, images_dir in splits.items()}
+    hashes = compute_hashes([Path(path) for paths in split_images.values() for path in paths],
+                            dataset_dir / HASH_CACHE_NAME, workers)
+    split_images = {split: [path for path in paths if path in hashes] for split, paths in split_images.items()}
+
+    report = {'max_distance': max_distance, 'duplicates': {}, 'leaks': [], 'removed': []}
+    to_remove = set()
+    # Fuites d'abord: une image de train retirée pour fuite ne peut pas être l'image conservée de son groupe
+    leaks = []
+    if 'train' in split_images and 'val' in split_images:
+        leaks = find_leaks(split_images['train'], split_images['val'], hashes, max_distance)
+    leaking = {train for train, _, _ in leaks}
+
+    for split, paths in split_images.items():
+        groups = find_duplicates(paths, hashes, max_distance, leaking)
+        report['duplicates'][split] = groups
+        removed = sum(len(group) - 1 for group in groups)
+        to_remove.update(path for group in groups for path in group[1:])
+        logger.info(f"{split}: {len(paths)} images, {len(groups)} groupes de quasi-doublons, "
+                    f"{removed} image(s) redondante(s) ({removed / max(len(paths), 1):.0%})")
+
+    if 'train' in split_images and 'val' in split_images:
+        report['leaks'] = [{'train': train, 'val': val, 'distance': distance} for train, val, distance in leaks]
+        to_remove.update(leaking)
+        logger.info(f"Fuites train/val: {len(leaks)} image(s) de train presque identiques à une image de val")
+        for train, val, distance in leaks[:10]:
+            logger.info(f"  {Path(train).name} ~ {Path(val).name} (distance {distance})")
+
+    report['removed'] = sorted(to_remove)
+    if prune and to_remove:
+        duplicates_dir = dataset_dir / "duplicates"
+        for path in report['removed']:
+            _move_duplicate(path, dataset_dir, duplicates_dir)
+        logger.info(f"{len(to_remove)} image(s) déplacée(s) dans {duplicates_dir}")
+    elif to_remove:
+        logger.info(f"{len(to_remove)} image(s) à retirer (relancer avec --prune pour les déplacer)")
+
+    report_path = dataset_dir / "dedupe_report.json"
+    report_path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    logger.info(f"Rapport: {report_path}")
+    return report
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Dédupliquer le dataset SafeWay (quasi-doublons, fuites train/val)")
+    parser.add_argument("--data", type=str, default="data/dataset/dataset.yaml",
+                       help="Chemin vers le fichier dataset.yaml")
+    parser.add_argument("--max-distance", type=int, default=DEFAULT_MAX_DISTANCE,
+                       help=f"Distance de Hamming maximum entre quasi-doublons (0-{INDEX_BANDS - 1})")
+    parser.add_argument("--prune", action="store_true",
+                       help="Déplacer les doublons dans data/dataset/duplicates/ (sinon: rapport seul)")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Threads de calcul des hashs")
+    args = parser.parse_args()
+
+    try:
+        dedupe_dataset(args.data, args.max_distance, args.prune, args.workers)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Comparaison précision / latence des modèles YOLO pour SafeWay
+
+Balaye les modèles (yolo11n, yolo11s, yolov8...), les tailles d'entrée, les
+backends (PyTorch, ONNX, OpenVINO) et les seuils de confiance sur le split de
+validation annoté. Pour chaque configuration: mAP de la classe téléphone et
+latence CPU par image. Les configurations sont évaluées en parallèle et la
+frontière de Pareto (meilleure précision pour une latence donnée) est affichée.
+
+La classe téléphone est résolue par son nom dans chaque modèle ('cell phone'
+pour COCO, 'telephone' pour les modèles SafeWay): modèles COCO et modèles
+entraînés sur le dataset sont comparés sur les mêmes labels.
+"""
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from core.logger import setup_logger
+
+logger = setup_logger("EvaluateModels")
+
+DEFAULT_MODELS = ("yolo11n.pt", "yolo11s.pt", "yolov8n.pt", "yolov8s.pt")
+DEFAULT_IMGSZ = (320, 480, 640)
+DEFAULT_CONFS = (0.25, 0.35, 0.45, 0.55)
+BACKENDS = ("pytorch", "onnx", "openvino")
+SWEEP_DIR = Path("runs/sweep")
+# Seuils IoU du mAP50-95
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+def load_validation_set(data_yaml: str, max_images: Optional[int] = None) -> Tuple[List[str], List[np.ndarray]]:
+    """
+    Images de validation et boîtes téléphone annotées
+
+    Args:
+        data_yaml: Chemin vers le fichier YAML de configuration du dataset
+        max_images: Nombre maximum d'images évaluées
+
+    Returns:
+        Tuple (chemins des images, boîtes téléphone normalisées (n, 4) x1 y1 x2 y2 par image)
+    """
+    import yaml
+    from ai.yolo_detector import PHONE_CLASS_NAMES
+    from core.dataset_shards import IMAGE_SUFFIXES, label_path_for, read_yolo_labels
+    from train_yolo import dataset_split_dirs
+
+    with open(data_yaml, encoding="utf-8") as f:
+        names = (yaml.safe_load(f) or {}).get('names') or {}
+    if isinstance(names, list):
+        names = dict(enumerate(names))
+    phone_classes = {int(class_id) for class_id, name in names.items() if name in PHONE_CLASS_NAMES}
+    if not phone_classes:
+        raise ValueError(f"Aucune classe téléphone ({', '.join(PHONE_CLASS_NAMES)}) dans {data_yaml}")
+
+    val_dir = dataset_split_dirs(data_yaml).get('val')
+    if val_dir is None:
+        raise ValueError(f"Split de validation introuvable pour {data_yaml}")
+    images = sorted(path for path in val_dir.rglob("*") if path.suffix.lower() in IMAGE_SUFFIXES)
+    if max_images:
+        images = images[:max_images]
+
+    boxes = []
+    for image_path in images:
+        labels = np.array([label for label in read_yolo_labels(label_path_for(image_path))
+                           if int(label[0]) in phone_classes], dtype=np.float32).reshape(-1, 5)
+        xy, wh = labels[:, 1:3], labels[:, 3:5]
+        boxes.append(np.concatenate([xy - wh / 2, xy + wh / 2], axis=1))
+    return [str(path) for path in images], boxes
+
+def box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """IoU d'une boîte x1 y1 x2 y2 avec un tableau de boîtes (n, 4)"""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return inter / np.maximum(area + areas - inter, 1e-9)
+
+def _match(detections: np.ndarray, ground_truth: List[np.ndarray], iou_threshold: float) -> np.ndarray:
+    """Vrais positifs des détections (triées par confiance décroissante), appariement glouton"""
+    matched = [np.zeros(len(boxes), dtype=bool) for boxes in ground_truth]
+    tp = np.zeros(len(detections), dtype=bool)
+    for k, detection in enumerate(detections):
+        image = int(detection[0])
+        boxes = ground_truth[image]
+        if not len(boxes):
+            continue
+        ious = box_iou(detection[2:6], boxes)
+        ious[matched[image]] = 0.0
+        best = int(ious.argmax())
+        if ious[best] >= iou_threshold:
+            tp[k] = True
+            matched[image][best] = True
+    return tp
+
+def average_precision(tp: np.ndarray, num_ground_truth: int) -> float:
+    """AP interpolée sur 101 points de rappel (comme COCO et ultralytics)"""
+    if num_ground_truth == 0:
+        return float('nan')
+    if len(tp) == 0:
+        # Sans détection, l'interpolation entre les sentinelles (0, 1) et (1, 0) donnerait 0.5
+        return 0.0
+    cum_tp = np.cumsum(tp)
+    recall = cum_tp / num_ground_truth
+    precision = cum_tp / np.arange(1, len(tp) + 1)
+    mrec = np.concatenate([[0.0], recall, [1.0]])
+    mpre = np.concatenate([[1.0], precision, [0.0]])
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    return float(np.trapz(np.interp(x, mrec, mpre), x))
+
+def compute_metrics(predictions: np.ndarray, ground_truth: List[np.ndarray], conf: float) -> Dict[str, float]:
+    """
+    Précision de la classe téléphone à un seuil de confiance
+
+    Args:
+        predictions: Détections téléphone (n, 6): image, confiance, x1 y1 x2 y2 normalisés
+        ground_truth: Boîtes annotées par image
+        conf: Seuil de confiance
+
+    Returns:
+        Dictionnaire avec map50, map50_95, precision et recall
+    """
+    detections = predictions[predictions[:, 1] >= conf]
+    detections = detections[np.argsort(-detections[:, 1], kind='stable')]
+    num_ground_truth = sum(len(boxes) for boxes in ground_truth)
+    aps = []
+    tp50 = None
+    for iou_threshold in IOU_THRESHOLDS:
+        tp = _match(detections, ground_truth, iou_threshold)
+        if tp50 is None:
+            tp50 = tp
+        aps.append(average_precision(tp, num_ground_truth))
+    true_positives = int(tp50.sum())
+    return {
+        'map50': aps[0],
+        'map50_95': float(np.mean(aps)),
+        'precision': true_positives / len(detections) if len(detections) else 0.0,
+        'recall': true_positives / num_ground_truth if num_ground_truth else float('nan')
+    }
+
+def pareto_front(results: List[Dict], metric: str = 'map50') -> List[int]:
+    """
+    Configurations non dominées (aucune autre n'est à la fois plus rapide et plus précise)
+
+    Args:
+        results: Résultats avec 'latency_ms' et la métrique
+        metric: Métrique de précision à maximiser
+
+    Returns:
+        Indices des configurations de la frontière, par latence croissante
+    """
+    order = sorted(range(len(results)), key=lambda i: (results[i]['latency_ms'], -results[i][metric]))
+    front = []
+    best = -np.inf
+    for i in order:
+        if results[i][metric] > best:
+            front.append(i)
+            best = results[i][metric]
+    return front
+
+def _load_backend(weights: str, backend: str, imgsz: int):
+    """Charge un modèle dans le backend demandé (export mis en cache dans SWEEP_DIR)"""
+    from ultralytics import YOLO
+
+    if backend == "pytorch":
+        return YOLO(weights)
+    # Un dossier par configuration: les exports parallèles ne s'écrasent pas
+    export_dir = SWEEP_DIR / f"{Path(weights).stem}_{imgsz}_{backend}"
+    export_dir.mkdir(parents=True, exist_ok=True)
+    local_weights = export_dir / Path(weights).name
+    if not local_weights.exists():
+        shutil.copy(weights, local_weights)
+    exported = YOLO(str(local_weights)).export(format=backend, imgsz=imgsz, verbose=False)
+    return YOLO(str(exported), task="detect")
+
+def _evaluate_config(
+    weights: str,
+    backend: str,
+    imgsz: int,
+    images: Sequence[str],
+    min_conf: float,
+    threads: int
+) -> Tuple[np.ndarray, float]:
+    """
+    Prédictions et latence d'une configuration (exécuté dans un processus du pool)
+
+    Returns:
+        Tuple (détections téléphone (n, 6) normalisées, latence médiane en ms)
+    """
+    import cv2
+    import torch
+    from ai.yolo_detector import PHONE_CLASS_NAMES
+
+    torch.set_num_threads(threads)
+    model = _load_backend(weights, backend, imgsz)
+    phone_classes = {int(class_id) for class_id, name in model.names.items() if name in PHONE_CLASS_NAMES}
+
+    def predict(frame):
+        return model.predict(frame, imgsz=imgsz, conf=min_conf, iou=0.45, device='cpu', verbose=False)[0]
+
+    # Préchauffage (allocations, compilation des noyaux)
+    for _ in range(3):
+        predict(np.zeros((imgsz, imgsz, 3), dtype=np.uint8))
+
+    predictions = []
+    timings = []
+    for index, image_path in enumerate(images):
+        frame = cv2.imread(image_path)
+        if frame is None:
+            continue
+        height, width = frame.shape[:2]
+        start = time.perf_counter()
+        result = predict(frame)
+        timings.append((time.perf_counter() - start) * 1000)
+        if result.boxes is None:
+            continue
+        classes = result.boxes.cls.cpu().numpy().astype(int)
+        confs = result.boxes.conf.cpu().numpy()
+        boxes = result.boxes.xyxy.cpu().numpy() / np.array([width, height, width, height])
+        for class_id, conf, box in zip(classes, confs, boxes):
+            if class_id in phone_classes:
+                predictions.append([index, conf, *box])
+    latency = float(np.median(timings)) if timings else float('nan')
+    return np.array(predictions, dtype=np.float64).reshape(-1, 6), latency
+
+def evaluate_model(
+    weights: str,
+    data_yaml: str = "data/dataset/dataset.yaml",
+    imgsz: int = 640,
+    conf: float = 0.001,
+    max_images: Optional[int] = None
+) -> Dict[str, float]:
+    """
+    Précision de la classe téléphone d'un modèle PyTorch sur le split val annoté
+
+    Args:
+        weights: Poids YOLO évalués
+        data_yaml: Chemin vers le fichier YAML de configuration du dataset
+        imgsz: Taille d'entrée
+        conf: Seuil de confiance (bas pour le mAP, comme la validation ultralytics)
+        max_images: Nombre maximum d'images de validation
+
+    Returns:
+        Dictionnaire avec map50, map50_95, precision, recall et latency_ms
+    """
+    images, ground_truth = load_validation_set(data_yaml, max_images)
+    predictions, latency = _evaluate_config(weights, "pytorch", imgsz, images, conf, os.cpu_count() or 1)
+    return {**compute_metrics(predictions, ground_truth, conf), 'latency_ms': latency}
+
+def run_sweep(
+    data_yaml: str = "data/dataset/dataset.yaml",
+    models: Sequence[str] = DEFAULT_MODELS,
+    imgsizes: Sequence[int] = DEFAULT_IMGSZ,
+    backends: Sequence[str] = ("pytorch",),
+    confs: Sequence[float] = DEFAULT_CONFS,
+    workers: Optional[int] = None,
+    max_images: Optional[int] = None,
+    metric: str = 'map50'
+) -> List[Dict]:
+    """
+    Évalue toutes les combinaisons modèle x taille x backend x seuil
+
+    Les prédictions sont calculées une fois par modèle, taille et backend (au
+    seuil le plus bas), puis filtrées pour chaque seuil de confiance. Chaque
+    processus du pool dispose de cpu_count / workers threads: la latence de
+    toutes les configurations est mesurée dans les mêmes conditions
+    (--workers 1 pour la latence d'un CPU entier).
+
+    Args:
+        data_yaml: Chemin vers le fichier YAML de configuration du dataset
+        models: Poids YOLO à comparer
+        imgsizes: Tailles d'entrée
+        backends: Backends d'inférence (pytorch, onnx, openvino)
+        confs: Seuils de confiance
+        workers: Configurations évaluées en parallèle
+        max_images: Nombre maximum d'images de validation
+        metric: Métrique de précision de la frontière de Pareto
+
+    Returns:
+        Résultats par configuration
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    from ultralytics import YOLO
+
+    images, ground_truth = load_validation_set(data_yaml, max_images)
+    logger.info(f"{len(images)} images de validation, "
+                f"{sum(len(boxes) for boxes in ground_truth)} téléphones annotés")
+
+    # Téléchargement des poids avant le pool (pas de téléchargements concurrents)
+    weights = {}
+    for model_name in models:
+        try:
+            weights[model_name] = str(YOLO(model_name).ckpt_path)
+        except Exception as e:
+            logger.warning(f"Modèle {model_name} ignoré: {e}")
+
+    configs = [(model_name, backend, imgsz) for model_name in weights for backend in backends for imgsz in imgsizes]
+    if not configs:
+        return []
+    workers = min(workers or max((os.cpu_count() or 1) // 4, 1), len(configs))
+    threads = max((os.cpu_count() or 1) // workers, 1)
+    logger.info(f"{len(configs)} configurations, {workers} en parallèle ({threads} threads chacune)")
+
+    results = []
+    SWEEP_DIR.mkdir(parents=True, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = {config: executor.submit(_evaluate_config, weights[config[0]], config[1], config[2],
+                                           images, min(confs), threads)
+                   for config in configs}
+        for (model_name, backend, imgsz), future in futures.items():
+            try:
+                predictions, latency = future.result()
+            except Exception as e:
+                logger.warning(f"{model_name} {backend} {imgsz}: échec ({e})")
+                continue
+            for conf in confs:
+                results.append({
+                    'model': model_name,
+                    'backend': backend,
+                    'imgsz': imgsz,
+                    'conf': conf,
+                    'latency_ms': latency,
+                    **compute_metrics(predictions, ground_truth, conf)
+                })
+
+    front = set(pareto_front(results, metric))
+    for i, result in enumerate(results):
+        result['pareto'] = i in front
+    report_path = SWEEP_DIR / "sweep_report.json"
+    report_path.write_text(json.dumps({'metric': metric, 'images': len(images), 'threads': threads,
+                                       'results': results}, indent=2))
+    print_report(results, metric)
+    logger.info(f"Rapport: {report_path}")
+    return results
+
+def print_report(results: List[Dict], metric: str = 'map50'):
+    """Affiche les résultats par latence croissante (* = frontière de Pareto)"""
+    logger.info(f"{'':2}{'Modèle':<14}{'Backend':<10}{'imgsz':>6}{'conf':>6}{'Latence':>11}"
+                f"{'mAP50':>8}{'mAP50-95':>10}{'P':>7}{'R':>7}")
+    for result in sorted(results, key=lambda r: (r['latency_ms'], -r[metric])):
+        logger.info(f"{'*' if result['pareto'] else ' ':2}{result['model']:<14}{result['backend']:<10}"
+                    f"{result['imgsz']:>6}{result['conf']:>6.2f}{result['latency_ms']:>8.1f} ms"
+                    f"{result['map50']:>8.3f}{result['map50_95']:>10.3f}"
+                    f"{result['precision']:>7.2f}{result['recall']:>7.2f}")
+    front = [result for result in results if result['pareto']]
+    logger.info(f"Frontière de Pareto ({metric}): " + ", ".join(
+        f"{r['model']}/{r['backend']}/{r['imgsz']}/{r['conf']:.2f}" for r in
+        sorted(front, key=lambda r: r['latency_ms'])))
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Comparer précision et latence des modèles YOLO")
+    parser.add_argument("--data", type=str, default="data/dataset/dataset.yaml",
+                       help="Chemin vers le fichier dataset.yaml (split val annoté)")
+    parser.add_argument("--models", type=str, nargs="+", default=list(DEFAULT_MODELS),
+                       help="Poids YOLO à comparer")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=list(DEFAULT_IMGSZ),
+                       help="Tailles d'entrée")
+    parser.add_argument("--backends", type=str, nargs="+", default=["pytorch"], choices=BACKENDS,
+                       help="Backends d'inférence")
+    parser.add_argument("--conf", type=float, nargs="+", default=list(DEFAULT_CONFS),
+                       help="Seuils de confiance")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Configurations évaluées en parallèle")
+    parser.add_argument("--max-images", type=int, default=None,
+                       help="Nombre maximum d'images de validation")
+    parser.add_argument("--metric", type=str, default="map50", choices=["map50", "map50_95"],
+                       help="Métrique de précision de la frontière de Pareto")
+    args = parser.parse_args()
+
+    try:
+        results = run_sweep(args.data, args.models, args.imgsz, args.backends, args.conf,
+                            args.workers, args.max_images, args.metric)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    sys.exit(0 if results else 1)
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Extraction d'exemples difficiles depuis les sessions enregistrées
+
+Les fausses alertes téléphone viennent presque toujours des mêmes objets
+(portefeuille, badge, étui à lunettes). Ce script parcourt en parallèle les
+vidéos enregistrées avec YOLODetector et HandDetector et conserve les frames:
+- dont une détection téléphone est proche du seuil de décision;
+- où un téléphone est détecté sans main qui le tienne (contradiction avec
+  l'état des mains).
+
+Les frames retenues sont exportées avec les boîtes du détecteur comme labels
+YOLO (data/dataset/hard_negatives/images + labels) et un manifeste
+candidates.json: les annotateurs corrigent les boîtes (une boîte supprimée
+fait de la frame un exemple négatif), puis déplacent les frames dans
+images/train pour le prochain entraînement.
+"""
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from config.settings import SAMPLES_DIR
+from core.logger import setup_logger
+
+logger = setup_logger("MineHardNegatives")
+
+VIDEO_SUFFIXES = ('.mp4', '.avi', '.mov', '.mkv')
+OUTPUT_DIR = Path("data/dataset/hard_negatives")
+# Marge autour des boîtes des mains pour considérer qu'un téléphone est tenu (fraction de l'image)
+HAND_MARGIN = 0.05
+
+# Détecteurs de chaque processus du pool
+_yolo = None
+_hands = None
+_class_map: Dict[int, int] = {}
+
+def _init_worker(model_path: Optional[str], phone_threshold: float, margin: float):
+    """Charge les détecteurs dans un processus du pool"""
+    global _yolo, _hands, _class_map
+    from ai.yolo_detector import YOLODetector
+    from ai.hand_detector import HandDetector
+    from annotate_images import label_class_map
+    try:
+        import torch
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    _yolo = YOLODetector(Path(model_path) if model_path else None)
+    if not _yolo.load_model():
+        raise RuntimeError("Impossible de charger le modèle YOLO")
+    # Détections sous le seuil conservées pour repérer les cas limites
+    _yolo.phone_threshold = phone_threshold
+    _yolo.conf_threshold = max(phone_threshold - margin, 0.01)
+    _hands = HandDetector()
+    _class_map = label_class_map(_yolo)
+
+def _hand_boxes(hand_results: Dict) -> List[Tuple[float, float, float, float]]:
+    """Boîtes normalisées des mains détectées (élargies de HAND_MARGIN)"""
+    boxes = []
+    for hand_landmarks in hand_results.get('hands_landmarks', ()):
+        (x1, y1), (x2, y2) = hand_landmarks.min(axis=0), hand_landmarks.max(axis=0)
+        boxes.append((float(x1) - HAND_MARGIN, float(y1) - HAND_MARGIN,
+                      float(x2) + HAND_MARGIN, float(y2) + HAND_MARGIN))
+    return boxes
+
+def _overlaps(box: Tuple[float, ...], other: Tuple[float, ...]) -> bool:
+    return box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]
+
+def classify_frame(
+    phone_detections: List[Dict],
+    hand_boxes: List[Tuple[float, float, float, float]],
+    width: int,
+    height: int,
+    phone_threshold: float,
+    margin: float
+) -> Tuple[Optional[str], float]:
+    """
+    Raison de retenir une frame comme exemple difficile
+
+    Args:
+        phone_detections: Détections de la classe téléphone (boîtes en pixels)
+        hand_boxes: Boîtes normalisées des mains
+        width: Largeur de la frame
+        height: Hauteur de la frame
+        phone_threshold: Seuil de décision téléphone
+        margin: Écart au seuil d'une détection ambiguë
+
+    Returns:
+        Tuple (raison: 'near_threshold', 'no_hand' ou None, score de priorité: plus petit = plus utile)
+    """
+    for detection in phone_detections:
+        if abs(detection['confidence'] - phone_threshold) <= margin:
+            return 'near_threshold', abs(detection['confidence'] - phone_threshold)
+    for detection in phone_detections:
+        if detection['confidence'] <= phone_threshold:
+            continue
+        x1, y1, x2, y2 = detection['bbox']
+        phone_box = (x1 / width, y1 / height, x2 / width, y2 / height)
+        if not any(_overlaps(phone_box, hand_box) for hand_box in hand_boxes):
+            # Téléphone détecté avec confiance mais aucune main ne le tient
+            return 'no_hand', 1.0 - detection['confidence']
+    return None, 0.0
+
+def _mine_video(
+    video_path: str,
+    output_dir: str,
+    every: int,
+    min_gap: float,
+    phone_threshold: float,
+    margin: float
+) -> List[Dict]:
+    """
+    Extrait les exemples difficiles d'une vidéo (exécuté dans un processus du pool)
+
+    Une seule frame est conservée par intervalle de min_gap secondes (la plus
+    ambiguë): les frames consécutives sont presque identiques.
+
+    Returns:
+        Entrées du manifeste des frames exportées
+    """
+    import cv2
+    from annotate_images import yolo_label_lines
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        logger.warning(f"Vidéo illisible: {video_path}")
+        return []
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    # Meilleur candidat de l'intervalle en cours: (score, entrée, frame, labels)
+    best: Optional[Tuple] = None
+    exported: List[Dict] = []
+    output_dir = Path(output_dir)
+    session = Path(video_path).stem
+
+    def export(candidate):
+        _, entry, frame, lines = candidate
+        name = f"{session}_{entry['frame_index']:06d}"
+        cv2.imwrite(str(output_dir / "images" / f"{name}.jpg"), frame)
+        (output_dir / "labels" / f"{name}.txt").write_text("\n".join(lines) + ("\n" if lines else ""))
+        entry['image'] = f"images/{name}.jpg"
+        exported.append(entry)
+
+    frame_index = -1
+    while True:
+        ret = capture.grab()
+        if not ret:
+            break
+        frame_index += 1
+        if frame_index % every:
+            continue
+        ret, frame = capture.retrieve()
+        if not ret:
+            break
+        height, width = frame.shape[:2]
+        timestamp = frame_index / fps
+
+        if best is not None and timestamp - best[1]['timestamp'] >= min_gap:
+            export(best)
+            best = None
+
+        yolo_results = _yolo.detect(frame)
+        phones = [d for d in yolo_results['all_detections'] if d['class_id'] == _yolo.phone_class_id]
+        if not phones:
+            continue
+        hand_results = _hands.detect(frame)
+        reason, score = classify_frame(phones, _hand_boxes(hand_results), width, height, phone_threshold, margin)
+        if reason is None or (best is not None and score >= best[0]):
+            continue
+        entry = {
+            'video': video_path,
+            'frame_index': frame_index,
+            'timestamp': round(timestamp, 3),
+            'reason': reason,
+            'phone_confidence': max(d['confidence'] for d in phones),
+            'hands_detected': hand_results['hands_detected']
+        }
+        best = (score, entry, frame.copy(), yolo_label_lines(phones, width, height, _class_map))
+
+    if best is not None:
+        export(best)
+    capture.release()
+    return exported
+
+def mine_hard_negatives(
+    sessions: List[str],
+    output_dir: Path = OUTPUT_DIR,
+    every: int = 5,
+    min_gap: float = 2.0,
+    phone_threshold: float = 0.5,
+    margin: float = 0.15,
+    workers: Optional[int] = None,
+    model_path: Optional[str] = None
+) -> List[Dict]:
+    """
+    Extrait les exemples difficiles de toutes les vidéos enregistrées
+
+    Args:
+        sessions: Vidéos ou dossiers de vidéos
+        output_dir: Dossier du jeu de candidats (images/, labels/, candidates.json)
+        every: Analyser une frame sur every
+        min_gap: Secondes minimum entre deux frames exportées d'une même vidéo
+        phone_threshold: Seuil de décision téléphone du détecteur
+        margin: Écart au seuil d'une détection ambiguë
+        workers: Vidéos traitées en parallèle (défaut: nombre de CPU)
+        model_path: Modèle YOLO déployé (défaut: celui de YOLODetector)
+
+    Returns:
+        Manifeste des frames exportées
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    videos = []
+    for session in sessions:
+        path = Path(session)
+        if path.is_dir():
+            videos.extend(sorted(p for p in path.rglob("*") if p.suffix.lower() in VIDEO_SUFFIXES))
+        elif path.exists():
+            videos.append(path)
+        else:
+            logger.warning(f"Session introuvable: {session}")
+    if not videos:
+        logger.error("Aucune vidéo à analyser")
+        return []
+
+    output_dir = Path(output_dir)
+    (output_dir / "images").mkdir(parents=True, exist_ok=True)
+    (output_dir / "labels").mkdir(parents=True, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, len(videos))
+    logger.info(f"{len(videos)} vidéo(s), {workers} processus")
+
+    manifest: List[Dict] = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(model_path, phone_threshold, margin)) as executor:
+        futures = {video: executor.submit(_mine_video, str(video), str(output_dir), every, min_gap,
+                                          phone_threshold, margin)
+                   for video in videos}
+        for video, future in futures.items():
+            try:
+                entries = future.result()
+            except Exception as e:
+                logger.warning(f"{video}: échec ({e})")
+                continue
+            manifest.extend(entries)
+            logger.info(f"{video.name}: {len(entries)} frame(s) retenue(s)")
+
+    # Manifeste fusionné avec celui des exécutions précédentes
+    manifest_path = output_dir / "candidates.json"
+    previous = json.loads(manifest_path.read_text()) if manifest_path.exists() else []
+    merged = {entry['image']: entry for entry in previous + manifest}
+    manifest_path.write_text(json.dumps(sorted(merged.values(), key=lambda e: e['image']), indent=2))
+
+    counts = {reason: sum(1 for entry in manifest if entry['reason'] == reason)
+              for reason in ('near_threshold', 'no_hand')}
+    logger.info(f"{len(manifest)} frames exportées dans {output_dir} "
+                f"({counts['near_threshold']} proches du seuil, {counts['no_hand']} sans main)")
+    logger.info("Corrigez les boîtes (python annotate_images.py --dataset ...) puis déplacez les frames "
+                "dans data/dataset/images/train et labels/train")
+    return manifest
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Extraire les exemples difficiles des sessions enregistrées")
+    parser.add_argument("sessions", type=str, nargs="*", default=[str(SAMPLES_DIR)],
+                       help="Vidéos ou dossiers de vidéos (défaut: data/samples)")
+    parser.add_argument("--output", type=str, default=str(OUTPUT_DIR),
+                       help="Dossier du jeu de candidats")
+    parser.add_argument("--every", type=int, default=5,
+                       help="Analyser une frame sur N")
+    parser.add_argument("--min-gap", type=float, default=2.0,
+                       help="Secondes minimum entre deux frames exportées d'une même vidéo")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                       help="Seuil de décision téléphone du détecteur")
+    parser.add_argument("--margin", type=float, default=0.15,
+                       help="Écart au seuil d'une détection ambiguë")
+    parser.add_argument("--workers", type=int, default=None,
+                       help="Vidéos traitées en parallèle")
+    parser.add_argument("--model", type=str, default=None,
+                       help="Modèle YOLO déployé (défaut: celui de YOLODetector)")
+    args = parser.parse_args()
+
+    manifest = mine_hard_negatives(args.sessions, Path(args.output), args.every, args.min_gap,
+                                   args.threshold, args.margin, args.workers, args.model)
+    sys.exit(0 if manifest else 1)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Test d'endurance mémoire de SafeWay
+
+Fait tourner l'étape de traitement de la démo (ai.frame_pipeline: contrôles
+qualité et changement, détecteurs, analyse, alertes et clips, annotations)
+puis le rendu, sans affichage, sur une vidéo rejouée en boucle ou sur la caméra, pendant la durée voulue,
+avec MemoryMonitor actif. La référence mémoire est prise après une période
+de préchauffage (caches de sprites, graphes MediaPipe, premiers clips). Le
+rapport JSON signale les composants dont la mémoire croît en continu; le
+code de sortie est 1 si un composant ou le RSS est signalé.
+"""
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+from config.settings import (
+    CLIP_RECORDING_ENABLED,
+    YOLO_FRAME_INTERVAL,
+    MEMORY_SAMPLE_INTERVAL,
+    MEMORY_REPORT_DIR
+)
+from core.logger import setup_logger
+from core.utils import get_monotonic_timestamp
+
+logger = setup_logger("SoakTest")
+
+def run_soak(
+    source: Union[str, int],
+    duration: float,
+    warmup: float = 120.0,
+    interval: float = MEMORY_SAMPLE_INTERVAL,
+    output: Optional[Path] = None,
+    yolo_interval: int = YOLO_FRAME_INTERVAL
+) -> Optional[Dict]:
+    """
+    Exécute la chaîne de traitement en boucle et mesure la croissance mémoire
+
+    Args:
+        source: Vidéo (rejouée en boucle) ou index de caméra
+        duration: Durée mesurée en secondes (après le préchauffage)
+        warmup: Secondes de traitement avant l'échantillon de référence
+        interval: Secondes entre deux échantillons mémoire
+        output: Fichier du rapport (défaut: MEMORY_REPORT_DIR/soak_<date>.json)
+        yolo_interval: Exécuter YOLO une frame analysée sur N (comme la démo)
+
+    Returns:
+        Rapport mémoire (None si la source ne peut pas être ouverte)
+    """
+    import cv2
+    from ai.face_detector import FaceDetector
+    from ai.hand_detector import HandDetector
+    from ai.yolo_detector import YOLODetector
+    from ai.alert_manager import AlertManager
+    from ai.clip_recorder import ClipRecorder
+    from ai.frame_pipeline import FramePipeline
+    from core.memory_monitor import MemoryMonitor
+    from core.overlay import OverlayCompositor
+
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        logger.error(f"Source illisible: {source}")
+        return None
+    looping = isinstance(source, str)
+
+    face_detector = FaceDetector()
+    hand_detector = HandDetector()
+    yolo_detector = YOLODetector()
+    if not yolo_detector.load_model():
+        logger.error("Impossible de charger le modèle YOLO")
+        capture.release()
+        face_detector.release()
+        hand_detector.release()
+        return None
+    alert_manager = AlertManager()
+    clip_recorder = alert_manager.add_sink(ClipRecorder()) if CLIP_RECORDING_ENABLED else None
+    pipeline = FramePipeline(face_detector, hand_detector, yolo_detector, alert_manager, clip_recorder,
+                             yolo_interval)
+    overlay = OverlayCompositor()
+    monitor = MemoryMonitor(interval=interval)
+
+    start = time.monotonic()
+    measure_start: Optional[float] = None
+    report = None
+    logger.info(f"Préchauffage {warmup:.0f} s puis mesure {duration / 3600:.2f} h sur {source}")
+
+    try:
+        while True:
+            now = time.monotonic()
+            if measure_start is None and now - start >= warmup:
+                monitor.start()
+                measure_start = now
+            if measure_start is not None and now - measure_start >= duration:
+                break
+
+            ret, frame = capture.read()
+            if not ret:
+                if looping:
+                    capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                logger.error("Lecture de la caméra interrompue")
+                break
+            # Horloge monotone: les durées restent cohérentes quand la vidéo reboucle
+            pipeline.process(frame, get_monotonic_timestamp(), overlay)
+            overlay.render(frame)
+    except KeyboardInterrupt:
+        logger.info("Interruption clavier: rapport sur la durée écoulée")
+    finally:
+        if measure_start is not None:
+            monitor.stop()
+            if output is None:
+                output = MEMORY_REPORT_DIR / f"soak_{time.strftime('%Y%m%d_%H%M%S')}.json"
+            report = monitor.write_report(output)
+            monitor.close()
+        capture.release()
+        pipeline.log_stats()
+        pipeline.release()
+        alert_manager.release()
+
+    elapsed = time.monotonic() - start
+    logger.info(f"{pipeline.frames} frames en {elapsed:.0f} s ({pipeline.frames / max(elapsed, 1e-9):.1f} FPS), "
+                f"{pipeline.detections} analysées, {pipeline.alerts} alertes")
+    if report is None:
+        logger.error("Durée inférieure au préchauffage: aucun rapport")
+    return report
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Test d'endurance mémoire de SafeWay")
+    parser.add_argument("source", type=str, nargs="?", default="0",
+                       help="Vidéo rejouée en boucle ou index de caméra (défaut: 0)")
+    parser.add_argument("--duration", type=float, default=60.0,
+                       help="Durée mesurée en minutes (un quart: 720)")
+    parser.add_argument("--warmup", type=float, default=120.0,
+                       help="Secondes de traitement avant la mesure de référence")
+    parser.add_argument("--interval", type=float, default=MEMORY_SAMPLE_INTERVAL,
+                       help="Secondes entre deux échantillons mémoire")
+    parser.add_argument("--output", type=str, default=None,
+                       help="Fichier du rapport JSON")
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    report = run_soak(source, args.duration * 60, args.warmup, args.interval,
+                      Path(args.output) if args.output else None)
+    if report is None:
+        sys.exit(1)
+    sys.exit(1 if report['flagged'] or report['rss']['flagged'] else 0)
@@ -0,0 +1,13 @@
+"""
+Configuration pytest: les modules SafeWay s'importent depuis la racine du projet
+(comme les scripts: python ai/..., python train_yolo.py)
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config.settings
+
+# Logs synchrones: le thread d'écriture survivrait à la capture de sortie de pytest
+config.settings.LOG_ASYNC = False
@@ -0,0 +1,49 @@
+"""
+Tests de l'analyse vectorisée (équivalence avec StateAnalyzer)
+"""
+import pytest
+from ai.batch_analyzer import BatchStateAnalyzer, generate_synthetic_timeline, verify_against_streaming
+from ai.rule_engine import DEFAULT_RULES
+
+FLEET_RULES = DEFAULT_RULES + [
+    {
+        'state': 'left_eye_closed',
+        'gate': 'face_detected',
+        'when': {'kind': 'duration', 'signal': 'left_eye_open', 'values': [False], 'min_ms': 800},
+        'alert': {'type': 'fatigue', 'message': 'Œil gauche fermé ({value:.0f} ms)', 'severity': 'low'}
+    },
+    {
+        'when': {'kind': 'edge_count', 'signal': 'phone_detected', 'edge': True, 'initial': False,
+                 'window_s': 120, 'min_count': 2},
+        'alert': {'type': 'phone', 'message': 'Téléphone saisi {value} fois', 'severity': 'medium'}
+    },
+    {
+        'state': 'looking_down',
+        'gate': 'face_detected',
+        'when': {'kind': 'flag', 'signal': 'head_position', 'values': ['down']},
+        'alert': {'type': 'distraction', 'message': 'Regard vers le bas ({value})', 'severity': 'low'}
+    },
+    {
+        'when': {'kind': 'changes', 'signal': 'face_detected', 'transitions': 20, 'min_changes': 2},
+        'alert': {'type': 'camera', 'message': 'Visage instable', 'severity': 'low'}
+    },
+]
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_default_rules_match_streaming(seed):
+    assert verify_against_streaming(generate_synthetic_timeline(20000, seed=seed))
+
+def test_fleet_rules_match_streaming():
+    columns = generate_synthetic_timeline(20000, seed=4)
+    alerts = BatchStateAnalyzer(FLEET_RULES).analyze(**columns)['alerts']
+    # Chaque règle de flotte se déclenche sur la timeline
+    messages = {alert['message'].split(' (')[0] for _, alert in alerts}
+    assert {'Œil gauche fermé', 'Regard vers le bas', 'Visage instable'} <= messages
+    assert any(message.startswith('Téléphone saisi') for message in messages)
+    assert verify_against_streaming(columns, FLEET_RULES)
+
+def test_unsupported_signal_rejected():
+    rules = [{'when': {'kind': 'flag', 'signal': 'hands_detected', 'values': [False]},
+              'alert': {'type': 'hands', 'message': 'Mains absentes', 'severity': 'low'}}]
+    with pytest.raises(ValueError, match="hands_detected"):
+        BatchStateAnalyzer(rules)
@@ -0,0 +1,31 @@
+"""
+Tests de l'enregistreur de clips (ai/clip_recorder.py)
+"""
+import json
+import numpy as np
+from ai.clip_recorder import ClipRecorder
+
+def _push_frames(recorder, start, stop, step=0.1):
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    t = start
+    while t < stop:
+        recorder.push(frame, round(t, 3))
+        t += step
+
+def test_alert_after_clip_end_keeps_previous_clip(tmp_path):
+    recorder = ClipRecorder(output_dir=tmp_path, pre_roll=1.0, post_roll=1.0, max_duration=10.0,
+                            fps=10, size=(64, 48))
+    _push_frames(recorder, 0.0, 1.0)
+    recorder.handle({'type': 'phone', 'timestamp': 1.0})
+    # Dernière frame retenue avant la fin du clip (2.0): le clip n'est pas clos par push
+    _push_frames(recorder, 1.0, 1.95)
+    recorder.handle({'type': 'fatigue', 'timestamp': 2.05})
+    _push_frames(recorder, 2.1, 3.5)
+    recorder.close()
+
+    assert recorder.clips_written == 2
+    descriptions = [json.loads(path.read_text()) for path in sorted(tmp_path.glob("*.json"))]
+    alerts = sorted(alert['type'] for description in descriptions for alert in description['alerts'])
+    assert alerts == ['fatigue', 'phone']
+    for description in descriptions:
+        assert description['frames'] > 0
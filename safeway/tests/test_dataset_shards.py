@@ -0,0 +1,71 @@
+"""
+Tests des shards de dataset: chaque image reste associée à ses labels quand
+le dataset réordonne ses images (mode rect de la validation)
+"""
+from pathlib import Path
+import cv2
+import numpy as np
+import pytest
+from core.dataset_shards import DatasetShards, prepare_shards
+
+# (hauteur, largeur) d'images de formats différents: le tri par format les réordonne
+SHAPES = [(40, 160), (160, 40), (100, 100), (60, 120), (120, 60), (80, 160)]
+
+@pytest.fixture
+def shards(tmp_path: Path) -> DatasetShards:
+    images_dir = tmp_path / "images" / "val"
+    labels_dir = tmp_path / "labels" / "val"
+    images_dir.mkdir(parents=True)
+    labels_dir.mkdir(parents=True)
+    for k, (h, w) in enumerate(SHAPES):
+        # Couleur et classe propres à chaque image
+        cv2.imwrite(str(images_dir / f"img_{k}.png"), np.full((h, w, 3), 20 * (k + 1), dtype=np.uint8))
+        (labels_dir / f"img_{k}.txt").write_text(f"{k} 0.5 0.5 0.2 0.2\n")
+    return DatasetShards(prepare_shards(images_dir, imgsz=64, shard_size=4, workers=1))
+
+def _rect_order(shapes):
+    """Ordre de YOLODataset.set_rectangle: tri par rapport hauteur / largeur"""
+    ar = np.array([h / w for h, w in shapes])
+    return ar.argsort()
+
+def test_index_of_after_rect_sort(shards: DatasetShards):
+    im_files = [str(shards.image_path(i)) for i in range(len(shards))]
+    labels = [shards.labels(shards.index_of(f)) for f in im_files]
+    shapes = [shards.entries[shards.index_of(f)]['shape0'] for f in im_files]
+    order = _rect_order(shapes)
+    assert list(order) != list(range(len(order)))
+    im_files = [im_files[j] for j in order]
+    labels = [labels[j] for j in order]
+
+    for im_file, boxes in zip(im_files, labels):
+        image, shape0 = shards.image(shards.index_of(im_file))
+        k = int(boxes[0, 0])
+        assert Path(im_file).name == f"img_{k}.png"
+        assert shape0 == SHAPES[k]
+        assert int(image[0, 0, 0]) == 20 * (k + 1)
+
+def test_sharded_dataset_rect_mode(shards: DatasetShards):
+    pytest.importorskip("ultralytics")
+    from ultralytics.cfg import get_cfg
+    from core.dataset_shards import build_sharded_trainer
+
+    dataset_class = build_sharded_trainer().dataset_class
+    dataset = dataset_class(
+        img_path=str(shards.images_dir),
+        imgsz=64,
+        batch_size=2,
+        augment=False,
+        hyp=get_cfg(),
+        rect=True,
+        stride=32,
+        pad=0.5,
+        data={'names': {k: str(k) for k in range(len(SHAPES))}, 'nc': len(SHAPES), 'channels': 3},
+        shards=shards
+    )
+    assert [Path(f).name for f in dataset.im_files] != sorted(Path(f).name for f in dataset.im_files)
+    for i, label in enumerate(dataset.labels):
+        k = int(label['cls'][0, 0])
+        image, shape0, _ = dataset.load_image(i)
+        assert Path(dataset.im_files[i]).name == f"img_{k}.png"
+        assert tuple(shape0) == SHAPES[k]
+        assert int(image[0, 0, 0]) == 20 * (k + 1)
@@ -0,0 +1,25 @@
+"""
+Tests du regroupement des quasi-doublons
+"""
+from dedupe_dataset import find_duplicates, find_leaks, hamming
+
+def test_slow_pan_is_not_chained():
+    # Chaque frame diffère de la précédente de 3 bits: une chaîne de 4 frames s'éloigne de 9 bits
+    hashes = {f"frame_{k}.jpg": (1 << (3 * k)) - 1 for k in range(4)}
+    groups = find_duplicates(sorted(hashes), hashes, max_distance=4)
+    assert groups == [["frame_0.jpg", "frame_1.jpg"], ["frame_2.jpg", "frame_3.jpg"]]
+    for group in groups:
+        kept = hashes[group[0]]
+        assert all(hamming(hashes[path], kept) <= 4 for path in group)
+
+def test_exact_duplicates_grouped():
+    hashes = {"a.jpg": 0xF0F0, "b.jpg": 0xF0F0, "c.jpg": 0xF0F1, "d.jpg": 0xFFFF_0000_0000}
+    assert find_duplicates(sorted(hashes), hashes, max_distance=2) == [["a.jpg", "b.jpg", "c.jpg"]]
+
+def test_leaking_image_is_not_kept():
+    # a.jpg (préféré par nom) fuit vers val: b.jpg doit être conservée à sa place
+    hashes = {"a.jpg": 0xF0F0, "b.jpg": 0xF0F1, "c.jpg": 0xF0F3, "val.jpg": 0xF0F0}
+    leaks = find_leaks(["a.jpg", "b.jpg", "c.jpg"], ["val.jpg"], hashes, max_distance=0)
+    assert [train for train, _, _ in leaks] == ["a.jpg"]
+    groups = find_duplicates(["a.jpg", "b.jpg", "c.jpg"], hashes, max_distance=2, excluded={"a.jpg"})
+    assert groups == [["b.jpg", "c.jpg", "a.jpg"]]
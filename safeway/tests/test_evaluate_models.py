@@ -0,0 +1,24 @@
+"""
+Tests des métriques de evaluate_models
+"""
+import numpy as np
+from evaluate_models import average_precision, compute_metrics
+
+GROUND_TRUTH = [np.array([[0.1, 0.1, 0.3, 0.3]]), np.array([[0.5, 0.5, 0.9, 0.9]])]
+
+def test_no_detections_scores_zero():
+    assert average_precision(np.zeros(0, dtype=bool), 2) == 0.0
+    metrics = compute_metrics(np.zeros((0, 6)), GROUND_TRUTH, 0.25)
+    assert metrics['map50'] == 0.0
+    assert metrics['map50_95'] == 0.0
+
+def test_detections_below_threshold_score_zero():
+    predictions = np.array([[0, 0.2, 0.1, 0.1, 0.3, 0.3]])
+    assert compute_metrics(predictions, GROUND_TRUTH, 0.25)['map50'] == 0.0
+
+def test_perfect_detections_score_one():
+    predictions = np.array([[0, 0.9, 0.1, 0.1, 0.3, 0.3], [1, 0.8, 0.5, 0.5, 0.9, 0.9]])
+    metrics = compute_metrics(predictions, GROUND_TRUTH, 0.25)
+    # Interpolation sur 101 points avec la sentinelle (1, 0): 0.995 comme ultralytics
+    assert np.isclose(metrics['map50'], 0.995)
+    assert np.isclose(metrics['map50_95'], 0.995)
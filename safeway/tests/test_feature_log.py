@@ -0,0 +1,91 @@
+"""
+Tests du journal de caractéristiques (core/feature_log.py): écriture, relecture mmap, anciens journaux
+"""
+import numpy as np
+import pytest
+from ai.batch_analyzer import BatchStateAnalyzer, columns_from_feature_log
+from core.feature_log import RECORD_DTYPE, FeatureLogWriter, _encode_header, decode_head_positions, read_feature_log
+
+HEADS = ('center', 'left', 'right', 'down')
+
+def _write_trip(path, frames: int = 10):
+    writer = FeatureLogWriter(path, chunk_size=4)
+    for k in range(frames):
+        face_results = {
+            'face_detected': k != 3,
+            'driver_id': 7 if k % 2 == 0 else None,
+            'eyes_open': k % 3 != 0,
+            'head_position': HEADS[k % 4],
+            'left_ear': 0.30 + 0.01 * k,
+            'right_ear': 0.25,
+            'mar': 0.1
+        }
+        if k == 5:
+            face_results = {'face_detected': False, 'frame_usable': False}
+        yolo_results = {'phone_detected': k >= 8, 'phone_confidence': 0.9 if k >= 8 else 0.0,
+                        'phone_bbox': [10, 20, 30, 40] if k >= 8 else None}
+        analysis = {'state': {'phone_detected': k >= 8}, 'alerts': [{'type': 'phone'}] if k == 9 else []}
+        writer.append(k, 0.1 * k, face_results, {'hands_detected': False}, yolo_results, analysis)
+    writer.close()
+    return writer
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "trip.swlog"
+    writer = _write_trip(path)
+    assert writer.records_written == 10
+
+    records = read_feature_log(path)
+    assert isinstance(records, np.memmap)
+    assert records.dtype == RECORD_DTYPE
+    np.testing.assert_array_equal(records['frame_index'], np.arange(10))
+    np.testing.assert_allclose(records['timestamp'], 0.1 * np.arange(10))
+    np.testing.assert_allclose(records['left_ear'][:3], [0.30, 0.31, 0.32], rtol=1e-6)
+    assert list(records['driver_id'][:2]) == [7, -1]
+    assert list(decode_head_positions(records['head_position'][:4])) == list(HEADS)
+    assert not records['face_detected'][3]
+    assert list(np.flatnonzero(~records['frame_usable'])) == [5]
+    assert records['phone_detected'][8] and records['state_phone_detected'][8]
+    np.testing.assert_allclose(records['phone_bbox'][8], [10, 20, 30, 40])
+    assert np.isnan(records['phone_bbox'][0]).all()
+    assert records['num_alerts'][9] == 1
+
+    columns = columns_from_feature_log(path)
+    assert list(np.flatnonzero(~columns['frame_usable'])) == [5]
+    np.testing.assert_allclose(columns['timestamps'], 0.1 * np.arange(10))
+
+def test_reopen_appends_after_partial_record(tmp_path):
+    path = tmp_path / "trip.swlog"
+    _write_trip(path, frames=3)
+    # Arrêt brutal: enregistrement partiel en fin de fichier
+    with open(path, "ab") as f:
+        f.write(b"\x00" * (RECORD_DTYPE.itemsize // 2))
+    assert len(read_feature_log(path)) == 3
+
+    _write_trip(path, frames=2)
+    assert list(read_feature_log(path)['frame_index']) == [0, 1, 2, 0, 1]
+
+def test_legacy_log_without_frame_usable(tmp_path):
+    # Journal écrit avant l'ajout de la colonne frame_usable
+    legacy_dtype = np.dtype([(name, RECORD_DTYPE.fields[name][0]) for name in RECORD_DTYPE.names
+                             if name != 'frame_usable'])
+    records = np.zeros(6, dtype=legacy_dtype)
+    records['timestamp'] = 0.5 * np.arange(6)
+    records['frame_index'] = np.arange(6)
+    records['face_detected'] = True
+    records['left_ear'] = 0.3
+    path = tmp_path / "legacy.swlog"
+    path.write_bytes(_encode_header(legacy_dtype) + records.tobytes())
+
+    loaded = read_feature_log(path)
+    assert 'frame_usable' not in loaded.dtype.names
+    np.testing.assert_array_equal(loaded['frame_index'], np.arange(6))
+
+    columns = columns_from_feature_log(path)
+    assert 'frame_usable' not in columns
+    np.testing.assert_allclose(columns['timestamps'], 0.5 * np.arange(6))
+    assert columns['face_detected'].all()
+    assert len(BatchStateAnalyzer().analyze(**columns)['state']['fatigue_detected']) == 6
+
+    # Pas d'ajout au format courant dans un ancien journal
+    with pytest.raises(ValueError):
+        FeatureLogWriter(path)
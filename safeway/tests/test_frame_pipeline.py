@@ -0,0 +1,53 @@
+"""
+Tests de l'étape de traitement partagée par la démo et le test d'endurance
+"""
+import numpy as np
+from ai.frame_pipeline import FramePipeline
+from core.overlay import OverlayCompositor
+
+class _Detector:
+    """Détecteur factice: compte les appels et retourne un résultat fixe"""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = 0
+
+    def detect(self, frame):
+        self.calls += 1
+        return dict(self.results)
+
+    def add_overlay(self, overlay, results, *args):
+        pass
+
+    def release(self):
+        pass
+
+def _pipeline():
+    face = _Detector({'face_detected': False})
+    hands = _Detector({'hands_detected': False})
+    yolo = _Detector({'phone_detected': False})
+    return FramePipeline(face, hands, yolo, yolo_interval=3), face, yolo
+
+def _textured_frame(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+def test_unusable_frame_skips_detectors():
+    pipeline, face, _ = _pipeline()
+    result = pipeline.process(np.zeros((480, 640, 3), dtype=np.uint8), 0.0, OverlayCompositor())
+    assert face.calls == 0
+    assert result['analysis']['unknown']
+
+def test_changed_frames_run_detectors_and_yolo_interval():
+    pipeline, face, yolo = _pipeline()
+    for k in range(6):
+        pipeline.process(_textured_frame(k), k / 15)
+    assert face.calls == pipeline.detections == 6
+    assert yolo.calls == 2
+
+def test_unchanged_frames_reuse_results():
+    pipeline, face, _ = _pipeline()
+    frame = _textured_frame(0)
+    for k in range(3):
+        result = pipeline.process(frame, k / 30)
+    assert face.calls == 1
+    assert not result['analysis']['unknown']
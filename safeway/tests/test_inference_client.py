@@ -0,0 +1,38 @@
+"""
+Tests du protocole du démon d'inférence (tailles de message bornées)
+"""
+import socket
+from threading import Thread
+import numpy as np
+import pytest
+from ai.inference_client import MAGIC, _HEADER, recv_message, send_message
+from config.settings import FRAME_HEIGHT, FRAME_WIDTH, INFERENCE_MAX_PAYLOAD_BYTES
+
+def test_frame_round_trip():
+    frame = np.arange(FRAME_HEIGHT * FRAME_WIDTH * 3, dtype=np.uint32).astype(np.uint8)
+    left, right = socket.socketpair()
+    with left, right:
+        left.settimeout(5.0)
+        right.settimeout(5.0)
+        header = {'op': 'analyze', 'shape': [FRAME_HEIGHT, FRAME_WIDTH, 3]}
+        sender = Thread(target=send_message, args=(left, header, frame.tobytes()))
+        sender.start()
+        received, payload = recv_message(right)
+        sender.join()
+    assert received == header
+    assert payload == frame.tobytes()
+
+@pytest.mark.parametrize("meta_len, payload_len", [(2**32 - 1, 0), (2, INFERENCE_MAX_PAYLOAD_BYTES + 1)])
+def test_oversized_lengths_rejected(meta_len, payload_len):
+    left, right = socket.socketpair()
+    with left, right:
+        right.settimeout(5.0)
+        left.sendall(_HEADER.pack(MAGIC, meta_len, payload_len) + b"{}")
+        with pytest.raises(ConnectionError, match="trop volumineux"):
+            recv_message(right)
+
+def test_oversized_send_refused():
+    left, right = socket.socketpair()
+    with left, right:
+        with pytest.raises(ValueError):
+            send_message(left, {'op': 'analyze'}, bytes(INFERENCE_MAX_PAYLOAD_BYTES + 1))
@@ -0,0 +1,63 @@
+"""
+Tests des logs asynchrones et de la limitation des messages répétés (core/logger.py)
+"""
+import logging
+import subprocess
+import sys
+from pathlib import Path
+import core.logger
+from core.logger import RateLimitFilter
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Processus neuf en mode asynchrone: les messages émis juste avant la sortie doivent être écrits
+_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import config.settings
+config.settings.LOG_ASYNC = True
+config.settings.LOG_FILE = {log_file!r}
+config.settings.ensure_data_dirs = lambda: None
+from core.logger import setup_logger
+logger = setup_logger("Shutdown")
+for k in range({count}):
+    logger.info(f"message {{k}}")
+"""
+
+def test_async_messages_flushed_at_exit(tmp_path):
+    log_file = tmp_path / "safeway.log"
+    count = 2000
+    code = _SCRIPT.format(root=str(ROOT), log_file=str(log_file), count=count)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=60)
+    assert output.returncode == 0, output.stderr
+    lines = log_file.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == count
+    assert lines[-1].endswith(f"message {count - 1}")
+    assert f"message {count - 1}" in output.stdout
+
+def _record(message: str, level: int = logging.WARNING) -> logging.LogRecord:
+    return logging.LogRecord("Test", level, __file__, 42, message, None, None)
+
+def test_rate_limit_suppresses_then_reports(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(core.logger.time, "monotonic", lambda: now[0])
+    rate_limit = RateLimitFilter(interval=1.0)
+
+    assert rate_limit.filter(_record("Frame illisible"))
+    for _ in range(5):
+        now[0] += 0.1
+        assert not rate_limit.filter(_record("Frame illisible"))
+    # Autre message et erreur critique jamais retenus
+    assert rate_limit.filter(_record("Caméra déconnectée"))
+    assert rate_limit.filter(_record("Frame illisible", logging.CRITICAL))
+
+    now[0] += 1.0
+    record = _record("Frame illisible")
+    assert rate_limit.filter(record)
+    assert record.getMessage() == "Frame illisible (5 messages identiques supprimés)"
+
+    # Compteur remis à zéro après le rapport
+    now[0] += 1.0
+    record = _record("Frame illisible")
+    assert rate_limit.filter(record)
+    assert record.getMessage() == "Frame illisible"
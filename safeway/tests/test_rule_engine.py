@@ -0,0 +1,39 @@
+"""
+Tests des règles de flotte (signaux supplémentaires, validation au chargement)
+"""
+import pytest
+from ai.rule_engine import load_rules
+from ai.state_analyzer import StateAnalyzer
+
+WINK_RULE = {
+    'state': 'left_eye_closed',
+    'gate': 'face_detected',
+    'when': {'kind': 'duration', 'signal': 'left_eye_open', 'values': [False], 'min_ms': 1000},
+    'alert': {'type': 'fatigue', 'message': 'Œil gauche fermé', 'severity': 'medium'}
+}
+
+def test_fleet_rule_on_extra_signal():
+    analyzer = StateAnalyzer(rules=[WINK_RULE])
+    face = {'face_detected': True, 'left_eye_open': False, 'mar': 0.2}
+    alerts = []
+    for k in range(30):
+        alerts = analyzer.analyze(face, {}, {}, k / 15)['alerts']
+    assert [alert['message'] for alert in alerts] == ['Œil gauche fermé']
+
+def test_load_rules_rejects_unknown_signal(tmp_path):
+    path = tmp_path / "rules.yaml"
+    path.write_text("- include_defaults: true\n"
+                    "- state: seatbelt_off\n"
+                    "  when: {kind: flag, signal: seatbelt, values: [false]}\n")
+    with pytest.raises(ValueError, match="seatbelt"):
+        load_rules(path)
+
+def test_load_rules_with_defaults(tmp_path):
+    path = tmp_path / "rules.yaml"
+    path.write_text("- include_defaults: true\n"
+                    "- state: hands_fidgeting\n"
+                    "  gate: face_detected\n"
+                    "  when: {kind: changes, signal: num_hands, transitions: 4, min_changes: 2}\n")
+    rules = load_rules(path)
+    assert rules[-1]['state'] == 'hands_fidgeting'
+    StateAnalyzer(rules=rules).analyze({'face_detected': True}, {'num_hands': 1}, {}, 0.0)
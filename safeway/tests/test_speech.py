@@ -0,0 +1,96 @@
+"""
+Tests de la file de synthèse vocale (ai/speech.py) avec un moteur TTS factice
+"""
+import sys
+import threading
+import time
+import types
+import pytest
+import ai.speech
+from ai.speech import SpeechWorker
+
+class _FakeEngine:
+    """Moteur pyttsx3 factice: chaque énonciation attend l'ouverture de la barrière"""
+
+    def __init__(self):
+        self.spoken = []
+        self.gate = threading.Event()
+
+    def getProperty(self, name):
+        return []
+
+    def setProperty(self, name, value):
+        pass
+
+    def say(self, message):
+        self.spoken.append(message)
+
+    def runAndWait(self):
+        self.gate.wait(timeout=5.0)
+
+    def stop(self):
+        self.gate.set()
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = _FakeEngine()
+    monkeypatch.setitem(sys.modules, "pyttsx3", types.SimpleNamespace(init=lambda: engine))
+    monkeypatch.setattr(ai.speech.platform, "system", lambda: "Linux")
+    return engine
+
+def _wait_spoken(engine, count):
+    deadline = time.monotonic() + 5.0
+    while len(engine.spoken) < count and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return engine.spoken
+
+def _busy_worker(engine, **kwargs):
+    """Worker occupé à énoncer un premier message: les suivants restent en file"""
+    worker = SpeechWorker(**kwargs)
+    assert worker.method == 'pyttsx3'
+    worker.say("premier", 'low')
+    assert _wait_spoken(engine, 1) == ["premier"]
+    return worker
+
+def test_priority_order(engine):
+    worker = _busy_worker(engine, max_pending=4)
+    worker.say("bas 1", 'low')
+    worker.say("moyen", 'medium')
+    worker.say("haut", 'high')
+    worker.say("bas 2", 'low')
+    engine.gate.set()
+    assert _wait_spoken(engine, 5) == ["premier", "haut", "moyen", "bas 1", "bas 2"]
+    worker.stop()
+
+def test_full_queue_drops_least_urgent(engine):
+    worker = _busy_worker(engine, max_pending=2)
+    worker.say("bas", 'low')
+    worker.say("haut", 'high')
+    worker.say("moyen", 'medium')
+    assert worker.dropped_messages == 1
+    engine.gate.set()
+    assert _wait_spoken(engine, 3) == ["premier", "haut", "moyen"]
+    worker.stop()
+
+def test_supersede_keeps_latest_occurrence(engine):
+    worker = _busy_worker(engine, max_pending=4)
+    worker.say("téléphone", 'medium')
+    worker.say("fatigue", 'medium')
+    worker.say("téléphone", 'medium')
+    engine.gate.set()
+    assert _wait_spoken(engine, 3) == ["premier", "fatigue", "téléphone"]
+    time.sleep(0.05)
+    assert engine.spoken.count("téléphone") == 1
+    worker.stop()
+
+def test_expired_messages_not_spoken(engine):
+    worker = _busy_worker(engine, max_pending=4, max_age=0.1)
+    worker.say("ancien", 'high')
+    time.sleep(0.2)
+    worker.say("récent", 'low')
+    engine.gate.set()
+    assert _wait_spoken(engine, 2) == ["premier", "récent"]
+    time.sleep(0.05)
+    assert engine.spoken == ["premier", "récent"]
+    assert worker.dropped_messages == 1
+    worker.stop()
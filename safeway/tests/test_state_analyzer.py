@@ -0,0 +1,49 @@
+"""
+Tests de StateAnalyzer: frames inexploitables (état inconnu, horloge des règles suspendue)
+"""
+from config.settings import ABSENCE_TIME_MS
+from ai.batch_analyzer import generate_synthetic_timeline, verify_against_streaming
+from ai.state_analyzer import StateAnalyzer
+
+FPS = 15.0
+ABSENCE_S = ABSENCE_TIME_MS / 1000
+NO_FACE = {'face_detected': False}
+UNUSABLE = {'face_detected': False, 'frame_usable': False}
+
+def _alert_times(frames):
+    """Rejoue (timestamp, face_results) et retourne les instants des alertes d'absence"""
+    analyzer = StateAnalyzer()
+    times = []
+    for t, face_results in frames:
+        analysis = analyzer.analyze(face_results, {}, {'phone_detected': False}, t)
+        times.extend(t for alert in analysis['alerts'] if alert['type'] == 'driver_absent')
+    return times
+
+def test_absence_fires_without_unknown_frames():
+    frames = [(i / FPS, NO_FACE) for i in range(int(10 * FPS))]
+    times = _alert_times(frames)
+    assert times and times[0] < ABSENCE_S + 0.2
+
+def test_unknown_time_does_not_count_toward_absence():
+    # Luminosité à la limite du seuil: 9 frames sur 10 inexploitables, les autres sans visage
+    frames = [(i / FPS, NO_FACE if i % 10 == 0 else UNUSABLE) for i in range(int(10 * FPS))]
+    assert _alert_times(frames) == []
+
+def test_absence_resumes_after_unknown_gap():
+    # 2 s sans visage, 5 s inconnues, puis sans visage: seul le temps connu compte
+    frames = [(i / FPS, NO_FACE) for i in range(int(2 * FPS))]
+    frames += [(2 + i / FPS, UNUSABLE) for i in range(int(5 * FPS))]
+    frames += [(7 + i / FPS, NO_FACE) for i in range(int(3 * FPS))]
+    times = _alert_times(frames)
+    assert times and 7 + ABSENCE_S - 2 < times[0] < 7 + ABSENCE_S - 2 + 0.2
+
+def test_unknown_frames_report_unknown_state():
+    analyzer = StateAnalyzer()
+    analysis = analyzer.analyze(UNUSABLE, {}, {}, 0.0)
+    assert analysis['unknown'] and analysis['alerts'] == []
+    assert not any(analysis['state'].values())
+
+def test_batch_matches_streaming_with_unusable_frames():
+    columns = generate_synthetic_timeline(20000, seed=3)
+    assert not columns['frame_usable'].all()
+    assert verify_against_streaming(columns)
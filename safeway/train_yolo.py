@@ -1,21 +1,80 @@
 #!/usr/bin/env python3
 """
 Script d'entraînement pour YOLOv11 sur données personnalisées SafeWay
+
+Par défaut, les images sont d'abord pré-traitées en shards memmap à la taille
+d'entraînement (core/dataset_shards.py): le chargement des données ne décode
+plus les JPEG à chaque époque.
+
+Avec --distill, entraîne un modèle étudiant étroit limité aux classes SafeWay
+à partir des annotations du modèle courant (professeur) sur le split train.
 """
+import json
 import sys
+import time
 from pathlib import Path
-from ultralytics import YOLO
-from config.settings import MODELS_DIR
+from typing import Dict, Optional
+from config.settings import MODELS_DIR, YOLO_MODEL_PATH, YOLO_IMGSZ, ensure_data_dirs
 from core.logger import setup_logger
 
 logger = setup_logger("TrainYOLO")
 
+# Modèle étudiant distillé (exporté dans MODELS_DIR avec son rapport)
+STUDENT_MODEL_NAME = "yolo11_safeway_student"
+
+def dataset_split_dirs(data_yaml: str) -> Dict[str, Path]:
+    """
+    Dossiers d'images des splits déclarés dans dataset.yaml
+
+    Args:
+        data_yaml: Chemin vers le fichier YAML de configuration du dataset
+
+    Returns:
+        Dossier d'images par split ('train', 'val', 'test') existant
+    """
+    import yaml
+
+    data_path = Path(data_yaml)
+    with open(data_path, encoding="utf-8") as f:
+        config = yaml.safe_load(f) or {}
+    root = Path(config.get('path') or data_path.parent)
+    if not root.is_absolute() and not root.exists():
+        root = data_path.parent / root
+    splits = {}
+    for split in ('train', 'val', 'test'):
+        if isinstance(config.get(split), str) and (root / config[split]).is_dir():
+            splits[split] = root / config[split]
+    return splits
+
+def prepare_dataset(data_yaml: str = "data/dataset/dataset.yaml", imgsz: int = 640) -> bool:
+    """
+    Prépare (ou met à jour) les shards de tous les splits du dataset
+    
+    Args:
+        data_yaml: Chemin vers le fichier YAML de configuration du dataset
+        imgsz: Taille des images d'entraînement
+        
+    Returns:
+        True si au moins un split a été préparé
+    """
+    from core.dataset_shards import prepare_shards
+    
+    splits = dataset_split_dirs(data_yaml)
+    if not splits:
+        logger.error(f"Aucun dossier d'images trouvé pour {data_yaml}")
+        return False
+    for split, images_dir in splits.items():
+        logger.info(f"Préparation des shards '{split}' ({images_dir})...")
+        prepare_shards(images_dir, imgsz)
+    return True
+
 def train_model(
     data_yaml: str = "data/dataset/dataset.yaml",
     epochs: int = 100,
     imgsz: int = 640,
     batch: int = 16,
-    model_size: str = "n"  # n, s, m, l, x
+    model_size: str = "n",  # n, s, m, l, x
+    use_shards: bool = True
 ):
     """
     Entraîne un modèle YOLOv11 personnalisé
@@ -26,6 +85,7 @@ def train_model(
         imgsz: Taille des images (640 recommandé)
         batch: Taille du batch
         model_size: Taille du modèle (n=nano, s=small, m=medium, l=large, x=xlarge)
+        use_shards: Lire les images depuis les shards pré-traités (préparés si nécessaire)
     """
     logger.info("=" * 60)
     logger.info("ENTRAÎNEMENT YOLOv11 POUR SAFEWAY")
@@ -42,7 +102,9 @@ def train_model(
         logger.info("4. Créez data/dataset/dataset.yaml (voir exemple ci-dessous)")
         return False
     
-    # Charger le modèle de base YOLOv11
+    # Charger le modèle de base YOLOv11 (import différé: ultralytics/torch sont lourds)
+    from ultralytics import YOLO
+    
     model_name = f"yolo11{model_size}.pt"
     logger.info(f"Chargement du modèle de base: {model_name}")
     
@@ -53,17 +115,25 @@ def train_model(
         logger.info("Tentative avec yolo11n.pt...")
         model = YOLO("yolo11n.pt")
     
+    # Shards pré-traités: seules les images modifiées depuis la dernière fois sont décodées
+    trainer = None
+    if use_shards and prepare_dataset(data_yaml, imgsz):
+        from core.dataset_shards import build_sharded_trainer
+        trainer = build_sharded_trainer()
+    
     # Paramètres d'entraînement optimisés
     logger.info(f"\nParamètres d'entraînement:")
     logger.info(f"  - Époques: {epochs}")
     logger.info(f"  - Taille images: {imgsz}")
     logger.info(f"  - Batch size: {batch}")
     logger.info(f"  - Dataset: {data_yaml}")
+    logger.info(f"  - Shards pré-traités: {'oui' if trainer else 'non'}")
     
     try:
         # Lancer l'entraînement
         results = model.train(
             data=data_yaml,
+            trainer=trainer,
             epochs=epochs,
             imgsz=imgsz,
             batch=batch,
@@ -101,6 +171,7 @@ def train_model(
         best_model = Path("runs/detect/safeway_custom/weights/best.pt")
         if best_model.exists():
             import shutil
+            ensure_data_dirs()
             custom_model_path = MODELS_DIR / "yolo11_custom.pt"
             shutil.copy(best_model, custom_model_path)
             logger.info(f"Modèle personnalisé copié vers: {custom_model_path}")
@@ -111,6 +182,234 @@ def train_model(
         logger.error(f"Erreur lors de l'entraînement: {e}", exc_info=True)
         return False
 
+def measure_latency(model, imgsz: int, runs: int = 30, warmup: int = 5) -> float:
+    """
+    Mesure la latence d'inférence CPU d'un modèle
+    
+    Args:
+        model: Modèle ultralytics.YOLO
+        imgsz: Taille d'entrée
+        runs: Nombre d'inférences mesurées
+        warmup: Inférences de préchauffage non mesurées
+        
+    Returns:
+        Latence médiane en millisecondes
+    """
+    import numpy as np
+    
+    frame = np.random.default_rng(0).integers(0, 255, (imgsz, imgsz, 3), dtype=np.uint8)
+    timings = []
+    for i in range(warmup + runs):
+        start = time.perf_counter()
+        model.predict(frame, imgsz=imgsz, device='cpu', verbose=False)
+        if i >= warmup:
+            timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def count_parameters(model) -> int:
+    """Nombre de paramètres d'un modèle ultralytics.YOLO"""
+    return sum(p.numel() for p in model.model.parameters())
+
+def build_student_config(num_classes: int, width: float = 0.125, depth: float = 0.33,
+                         max_channels: int = 256) -> Path:
+    """
+    Crée l'architecture de l'étudiant: YOLOv11 plus étroit que yolo11n
+    
+    Args:
+        num_classes: Nombre de classes SafeWay
+        width: Multiplicateur de largeur des couches (yolo11n: 0.25)
+        depth: Multiplicateur de profondeur (yolo11n: 0.50)
+        max_channels: Nombre maximum de canaux par couche
+        
+    Returns:
+        Chemin du fichier YAML de l'architecture
+    """
+    import yaml
+    from ultralytics.nn.tasks import yaml_model_load
+    
+    config = yaml_model_load("yolo11n.yaml")
+    config['nc'] = num_classes
+    config['scales'] = {'n': [depth, width, max_channels]}
+    config.pop('scale', None)
+    config.pop('yaml_file', None)
+    
+    ensure_data_dirs()
+    config_path = MODELS_DIR / f"{STUDENT_MODEL_NAME}.yaml"
+    with open(config_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(config, f, sort_keys=False)
+    return config_path
+
+def prune_model(model, amount: float) -> float:
+    """
+    Met à zéro les filtres de convolution de plus faible norme L1 (sparsité structurée)
+    
+    La tête de détection n'est pas modifiée. Les filtres sont seulement mis à
+    zéro: la forme des couches, le nombre de paramètres et la latence d'un
+    runtime dense ne changent pas. Le gain n'existe qu'avec un runtime qui
+    exploite la sparsité; pour un modèle plus rapide sur CPU, réduire plutôt
+    la largeur de l'étudiant (--student-width).
+    
+    Args:
+        model: Modèle ultralytics.YOLO
+        amount: Fraction des filtres mis à zéro par convolution (0-1)
+        
+    Returns:
+        Fraction des poids de convolution mis à zéro
+    """
+    import torch
+    from torch.nn.utils import prune
+    
+    head = model.model.model[-1]
+    head_convs = {id(module) for module in head.modules()}
+    zeros = total = 0
+    for module in model.model.modules():
+        if isinstance(module, torch.nn.Conv2d) and id(module) not in head_convs and module.out_channels > 1:
+            prune.ln_structured(module, name="weight", amount=amount, n=1, dim=0)
+            prune.remove(module, "weight")
+            zeros += int((module.weight == 0).sum())
+            total += module.weight.numel()
+    return zeros / max(total, 1)
+
+def distill_model(
+    data_yaml: str = "data/dataset/dataset.yaml",
+    teacher: Optional[str] = None,
+    epochs: int = 100,
+    imgsz: int = 320,
+    batch: int = 16,
+    width: float = 0.125,
+    prune_amount: float = 0.0,
+    use_shards: bool = True
+) -> bool:
+    """
+    Distille le modèle courant dans un étudiant étroit limité aux classes SafeWay
+    
+    1. Le professeur pré-annote les images d'entraînement sans label à jour
+       (les corrections manuelles sont conservées): l'étudiant apprend ses
+       prédictions. Le split val n'est pas annoté par le professeur: il reste
+       la vérité terrain humaine sur laquelle les deux modèles sont comparés.
+    2. L'étudiant (architecture YOLOv11 plus étroite, une sortie par classe
+       SafeWay au lieu de 80 classes COCO) est entraîné sur ces annotations.
+    3. Sparsité optionnelle (filtres de plus faible norme mis à zéro, voir prune_model).
+    4. Export dans MODELS_DIR avec un rapport latence/précision du professeur
+       et de l'étudiant (classe téléphone, même split val, chacun à sa taille
+       d'entrée).
+    
+    Args:
+        data_yaml: Chemin vers le fichier YAML de configuration du dataset
+        teacher: Modèle professeur (défaut: modèle de YOLODetector)
+        epochs: Nombre d'époques d'entraînement de l'étudiant
+        imgsz: Taille des images de l'étudiant
+        batch: Taille du batch
+        width: Multiplicateur de largeur de l'étudiant (yolo11n: 0.25)
+        prune_amount: Fraction des filtres mis à zéro (0 = aucune)
+        use_shards: Lire les images depuis les shards pré-traités
+        
+    Returns:
+        True si l'étudiant a été exporté
+    """
+    import shutil
+    import yaml
+    from annotate_images import auto_annotate
+    
+    logger.info("=" * 60)
+    logger.info("DISTILLATION D'UN DÉTECTEUR SAFEWAY COMPACT")
+    logger.info("=" * 60)
+    
+    splits = dataset_split_dirs(data_yaml) if Path(data_yaml).exists() else {}
+    if 'train' not in splits or 'val' not in splits:
+        logger.error(f"Dataset incomplet (splits train et val requis): {data_yaml}")
+        return False
+    with open(data_yaml, encoding="utf-8") as f:
+        names = (yaml.safe_load(f) or {}).get('names') or {}
+    
+    # 1. Annotations du professeur (train seulement: val reste annoté à la main)
+    logger.info("Annotations du professeur pour 'train'...")
+    auto_annotate(str(splits['train']), model_path=teacher)
+    
+    # 2. Entraînement de l'étudiant
+    from ultralytics import YOLO
+    
+    student = YOLO(str(build_student_config(len(names), width=width)))
+    trainer = None
+    if use_shards and prepare_dataset(data_yaml, imgsz):
+        from core.dataset_shards import build_sharded_trainer
+        trainer = build_sharded_trainer()
+    logger.info(f"Étudiant: largeur {width}, {count_parameters(student):,} paramètres, "
+                f"{len(names)} classes, imgsz {imgsz}")
+    try:
+        student.train(data=data_yaml, trainer=trainer, epochs=epochs, imgsz=imgsz, batch=batch,
+                      name=STUDENT_MODEL_NAME, project="runs/detect", patience=50, device='cpu',
+                      workers=4, plots=True, verbose=True)
+    except Exception as e:
+        logger.error(f"Erreur lors de l'entraînement de l'étudiant: {e}", exc_info=True)
+        return False
+    best_path = Path(student.trainer.best)
+    if not best_path.exists():
+        logger.error("Aucun poids d'étudiant produit")
+        return False
+    
+    # 3. Sparsité optionnelle
+    ensure_data_dirs()
+    output_path = MODELS_DIR / f"{STUDENT_MODEL_NAME}.pt"
+    student = YOLO(str(best_path))
+    sparsity = 0.0
+    if prune_amount > 0:
+        sparsity = prune_model(student, prune_amount)
+        logger.info(f"Sparsité: {prune_amount:.0%} des filtres, {sparsity:.1%} des poids à zéro "
+                    f"(forme et latence dense inchangées)")
+        student.save(str(output_path))
+    else:
+        shutil.copy(best_path, output_path)
+    
+    # 4. Rapport latence/précision (même split val et même métrique pour les deux modèles)
+    from evaluate_models import evaluate_model
+    
+    student = YOLO(str(output_path))
+    metrics = student.val(data=data_yaml, imgsz=imgsz, batch=batch, device='cpu', plots=False, verbose=False)
+    teacher_path = str(teacher or YOLO_MODEL_PATH)
+    teacher_model = YOLO(teacher_path)
+    teacher_metrics = evaluate_model(teacher_path, data_yaml, YOLO_IMGSZ)
+    student_metrics = evaluate_model(str(output_path), data_yaml, imgsz)
+    report = {
+        'teacher': {
+            'model': teacher_path,
+            'imgsz': YOLO_IMGSZ,
+            'parameters': count_parameters(teacher_model),
+            'latency_ms': measure_latency(teacher_model, YOLO_IMGSZ),
+            'map50': teacher_metrics['map50'],
+            'map50_95': teacher_metrics['map50_95']
+        },
+        'student': {
+            'model': str(output_path),
+            'width': width,
+            'imgsz': imgsz,
+            'classes': names,
+            'parameters': count_parameters(student),
+            'zeroed_filters': prune_amount,
+            'sparsity': sparsity,
+            'latency_ms': measure_latency(student, imgsz),
+            'map50': student_metrics['map50'],
+            'map50_95': student_metrics['map50_95'],
+            # Toutes les classes SafeWay (le professeur COCO n'est comparable que sur le téléphone)
+            'map50_all_classes': float(metrics.box.map50),
+            'map50_95_all_classes': float(metrics.box.map)
+        }
+    }
+    report['speedup'] = report['teacher']['latency_ms'] / max(report['student']['latency_ms'], 1e-6)
+    report_path = MODELS_DIR / f"{STUDENT_MODEL_NAME}_report.json"
+    report_path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    
+    logger.info("\n" + "=" * 60)
+    logger.info(f"{'Modèle':<12}{'imgsz':>6}{'Paramètres':>14}{'Latence CPU':>14}{'mAP50 tél.':>12}")
+    for label, key in (("Professeur", 'teacher'), ("Étudiant", 'student')):
+        logger.info(f"{label:<12}{report[key]['imgsz']:>6}{report[key]['parameters']:>14,}"
+                    f"{report[key]['latency_ms']:>11.1f} ms{report[key]['map50']:>12.3f}")
+    logger.info(f"Accélération: x{report['speedup']:.1f}")
+    logger.info(f"Étudiant exporté: {output_path}")
+    logger.info(f"Rapport: {report_path}")
+    logger.info(f"Utilisation: YOLODetector(model_path=MODELS_DIR / \"{STUDENT_MODEL_NAME}.pt\", imgsz={imgsz})")
+    return True
+
 def create_dataset_template():
     """Crée un template pour le fichier dataset.yaml"""
     template = """# Configuration du dataset SafeWay
@@ -161,19 +460,47 @@ if __name__ == "__main__":
                        help="Taille du modèle (n=nano, s=small, m=medium, l=large, x=xlarge)")
     parser.add_argument("--create-template", action="store_true",
                        help="Créer un template pour dataset.yaml")
+    parser.add_argument("--prepare", action="store_true",
+                       help="Préparer les shards du dataset sans entraîner")
+    parser.add_argument("--no-shards", action="store_true",
+                       help="Lire les images JPEG directement (sans shards pré-traités)")
+    parser.add_argument("--distill", action="store_true",
+                       help="Distiller le modèle courant dans un étudiant compact (classes SafeWay)")
+    parser.add_argument("--teacher", type=str, default=None,
+                       help="Modèle professeur pour --distill (défaut: modèle de YOLODetector)")
+    parser.add_argument("--student-width", type=float, default=0.125,
+                       help="Multiplicateur de largeur de l'étudiant (yolo11n: 0.25)")
+    parser.add_argument("--prune", type=float, default=0.0,
+                       help="Fraction des filtres mis à zéro après distillation (sparsité seulement: "
+                            "taille et latence dense inchangées)")
     
     args = parser.parse_args()
     
     if args.create_template:
         create_dataset_template()
         logger.info("\nTemplate créé! Configurez votre dataset et relancez l'entraînement.")
+    elif args.prepare:
+        sys.exit(0 if prepare_dataset(args.data, args.imgsz) else 1)
+    elif args.distill:
+        success = distill_model(
+            data_yaml=args.data,
+            teacher=args.teacher,
+            epochs=args.epochs,
+            imgsz=args.imgsz,
+            batch=args.batch,
+            width=args.student_width,
+            prune_amount=args.prune,
+            use_shards=not args.no_shards
+        )
+        sys.exit(0 if success else 1)
     else:
         success = train_model(
             data_yaml=args.data,
             epochs=args.epochs,
             imgsz=args.imgsz,
             batch=args.batch,
-            model_size=args.model
+            model_size=args.model,
+            use_shards=not args.no_shards
         )
         sys.exit(0 if success else 1)
 
@@ -1,26 +1,45 @@
 """
 Démonstration CLI de SafeWay
+
+Les sous-commandes sans modèle (template de dataset, analyse de trajet)
+n'importent ni OpenCV ni les détecteurs: elles démarrent immédiatement.
+La sous-commande daemon garde les modèles chargés pour les clients
+d'ai/inference_client.py.
 """
 import sys
-import cv2
 import time
 from pathlib import Path
 
 # Ajouter le répertoire parent au path pour les imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from ai.video_stream import VideoStream
-from ai.face_detector import FaceDetector
-from ai.hand_detector import HandDetector
-from ai.yolo_detector import YOLODetector
-from ai.state_analyzer import StateAnalyzer
-from ai.alert_manager import AlertManager
+from config.settings import (
+    FEATURE_LOG_ENABLED,
+    FEATURE_LOG_DIR,
+    CLIP_RECORDING_ENABLED,
+    MEMORY_MONITOR_ENABLED,
+    MEMORY_REPORT_DIR
+)
 from core.logger import setup_logger
 
 logger = setup_logger("CLIDemo")
 
-def main():
-    """Fonction principale de la démo"""
+def run_demo():
+    """Démo temps réel: caméra, détections, analyse et alertes"""
+    # Imports lourds (OpenCV, détecteurs) chargés uniquement pour la démo
+    import cv2
+    from ai.video_stream import VideoStream
+    from ai.face_detector import FaceDetector
+    from ai.hand_detector import HandDetector
+    from ai.yolo_detector import YOLODetector
+    from ai.alert_manager import AlertManager
+    from ai.clip_recorder import ClipRecorder
+    from ai.frame_pipeline import FramePipeline
+    from core.feature_log import FeatureLogWriter
+    from core.memory_monitor import MemoryMonitor
+    from core.overlay import OverlayCompositor
+    from core.startup import ParallelInitializer
+    
     print("=" * 60)
     print("SafeWay - Système de détection de fatigue et distraction")
     print("=" * 60)
@@ -29,37 +48,77 @@ def main():
     print("- La caméra va s'ouvrir et analyser votre état")
     print("- Les alertes apparaîtront automatiquement\n")
     
-    # Initialiser les composants
+    # Initialiser les composants en parallèle (modèles préchauffés par une inférence à vide)
     logger.info("Initialisation des composants...")
     
-    video_stream = VideoStream()
-    face_detector = FaceDetector()
-    hand_detector = HandDetector()
-    yolo_detector = YOLODetector()
-    state_analyzer = StateAnalyzer()
-    alert_manager = AlertManager()
+    def init_face() -> FaceDetector:
+        detector = FaceDetector()
+        detector.warmup()
+        return detector
     
-    # Cache pour résultats YOLO (optimisation performance)
-    last_yolo_results = {'phone_detected': False}
+    def init_hands() -> HandDetector:
+        detector = HandDetector()
+        detector.warmup()
+        return detector
     
-    # Charger le modèle YOLO
-    logger.info("Chargement du modèle YOLO...")
-    if not yolo_detector.load_model():
-        logger.error("Impossible de charger le modèle YOLO")
-        return
+    def init_yolo() -> YOLODetector:
+        detector = YOLODetector()
+        if not detector.load_model():
+            raise RuntimeError("Impossible de charger le modèle YOLO")
+        detector.warmup()
+        return detector
+    
+    def init_camera() -> VideoStream:
+        stream = VideoStream()
+        if not stream.start():
+            logger.error("Vérifiez que:")
+            logger.error("  1. La caméra n'est pas utilisée par une autre application")
+            logger.error("  2. Les permissions de caméra sont accordées")
+            logger.error("  3. La caméra est bien connectée")
+            raise RuntimeError("Impossible d'ouvrir la caméra")
+        return stream
     
-    # Ouvrir la caméra
-    logger.info("Ouverture de la caméra...")
-    if not video_stream.start():
-        logger.error("Impossible d'ouvrir la caméra")
-        logger.error("Vérifiez que:")
-        logger.error("  1. La caméra n'est pas utilisée par une autre application")
-        logger.error("  2. Les permissions de caméra sont accordées")
-        logger.error("  3. La caméra est bien connectée")
+    initializer = ParallelInitializer()
+    initializer.add("camera", init_camera)
+    initializer.add("face", init_face)
+    initializer.add("hands", init_hands)
+    initializer.add("yolo", init_yolo)
+    initializer.add("alerts", AlertManager)
+    components = initializer.run()
+    if initializer.failed:
+        # Libérer les composants déjà initialisés (caméra ouverte, graphes MediaPipe...)
+        for component in components.values():
+            if component is not None and hasattr(component, 'release'):
+                component.release()
         return
     
+    video_stream = components["camera"]
+    alert_manager = components["alerts"]
+    
+    # Clips vidéo autour des alertes (anneau pré-alerte en mémoire, encodage en arrière-plan)
+    clip_recorder = None
+    if CLIP_RECORDING_ENABLED:
+        clip_recorder = alert_manager.add_sink(ClipRecorder())
+    
+    # Contrôles de frames, détecteurs, analyse et annotations (étape partagée avec soak_test.py)
+    pipeline = FramePipeline(components["face"], components["hands"], components["yolo"],
+                             alert_manager, clip_recorder)
+    
+    # Suivi mémoire du trajet (référence prise après l'initialisation des modèles)
+    memory_monitor = None
+    if MEMORY_MONITOR_ENABLED:
+        memory_monitor = MemoryMonitor()
+        memory_monitor.start()
+    
+    # Compositeur unique pour toutes les annotations (un seul tampon de sortie)
+    overlay = OverlayCompositor()
+    
+    # Journal binaire des caractéristiques pour l'analyse après trajet
+    feature_log = None
+    if FEATURE_LOG_ENABLED:
+        feature_log = FeatureLogWriter(FEATURE_LOG_DIR / f"trip_{time.strftime('%Y%m%d_%H%M%S')}.swlog")
+    
     try:
-        frame_count = 0
         consecutive_failures = 0
         max_failures = 10
         
@@ -82,93 +141,16 @@ def main():
             # Réinitialiser le compteur d'échecs si on a réussi
             consecutive_failures = 0
             
-            frame_count += 1
+            # Détections et analyse horodatées à la capture de la frame (les durées restent exactes)
+            timestamp = video_stream.last_timestamp
+            result = pipeline.process(frame, timestamp, overlay)
             
-            try:
-                # Détections optimisées (YOLO seulement toutes les 3 frames pour performance)
-                face_results = face_detector.detect(frame)
-                hand_results = hand_detector.detect(frame)
-                
-                # YOLO moins fréquent pour meilleure fluidité (optimisation)
-                if frame_count % 3 == 0:  # Toutes les 3 frames
-                    yolo_results = yolo_detector.detect(frame)
-                    last_yolo_results = yolo_results
-                else:
-                    # Réutiliser les résultats précédents
-                    yolo_results = last_yolo_results
-                
-                # Analyse de l'état
-                analysis = state_analyzer.analyze(face_results, hand_results, yolo_results)
-            except Exception as e:
-                logger.error(f"Erreur lors des détections: {e}", exc_info=True)
-                # Continuer avec des résultats vides
-                face_results = {'face_detected': False}
-                hand_results = {'hands_detected': False}
-                yolo_results = {'phone_detected': False}
-                analysis = {'state': {}, 'alerts': []}
+            if feature_log is not None:
+                feature_log.append(pipeline.frames, timestamp, result['face'], result['hands'],
+                                   result['yolo'], result['analysis'])
             
-            # Dessiner les annotations
-            annotated_frame = frame.copy()
-            
-            # Dessiner les landmarks du visage
-            if face_results['face_detected']:
-                annotated_frame = face_detector.draw_landmarks(annotated_frame, face_results)
-                
-                # Afficher les informations
-                info_y = 30
-                cv2.putText(annotated_frame, f"Visage: Detecte", (10, info_y),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                info_y += 25
-                
-                eye_status = "Ouverts" if face_results['eyes_open'] else "Fermes"
-                eye_color = (0, 255, 0) if face_results['eyes_open'] else (0, 0, 255)
-                cv2.putText(annotated_frame, f"Yeux: {eye_status}", (10, info_y),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, eye_color, 2)
-                info_y += 25
-                
-                mouth_status = "Ouverte" if face_results['mouth_open'] else "Fermee"
-                cv2.putText(annotated_frame, f"Bouche: {mouth_status}", (10, info_y),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
-                info_y += 25
-                
-                cv2.putText(annotated_frame, f"Tete: {face_results['head_position']}", (10, info_y),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
-            else:
-                cv2.putText(annotated_frame, "Visage: Non detecte", (10, 30),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
-            
-            # Dessiner les détections YOLO
-            if yolo_results['phone_detected']:
-                annotated_frame = yolo_detector.draw_detections(annotated_frame, yolo_results)
-            
-            # Gérer les alertes
-            if analysis['alerts']:
-                for alert in analysis['alerts']:
-                    annotated_frame = alert_manager.trigger_alert(alert, annotated_frame)
-            
-            # Afficher l'état
-            state = analysis['state']
-            state_y = annotated_frame.shape[0] - 100
-            
-            if state['fatigue_detected']:
-                cv2.putText(annotated_frame, "ETAT: FATIGUE DETECTEE", (10, state_y),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-            elif state['distraction_detected']:
-                cv2.putText(annotated_frame, "ETAT: DISTRACTION DETECTEE", (10, state_y),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
-            elif state['phone_detected']:
-                cv2.putText(annotated_frame, "ETAT: TELEPHONE DETECTE", (10, state_y),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-            elif state['driver_absent']:
-                cv2.putText(annotated_frame, "ETAT: CONDUCTEUR ABSENT", (10, state_y),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-            else:
-                cv2.putText(annotated_frame, "ETAT: NORMAL", (10, state_y),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            
-            # Afficher le FPS (simplifié)
-            cv2.putText(annotated_frame, f"Frame: {frame_count}", (10, annotated_frame.shape[0] - 20),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            # Une seule copie de la frame pour toutes les annotations
+            annotated_frame = overlay.render(frame)
             
             # Afficher la frame
             cv2.imshow('SafeWay - Detection en temps reel', annotated_frame)
@@ -185,14 +167,50 @@ def main():
         logger.error(f"Erreur lors de l'exécution: {e}", exc_info=True)
     finally:
         # Nettoyage
+        if memory_monitor is not None:
+            memory_monitor.stop()
+            memory_monitor.write_report(MEMORY_REPORT_DIR / f"trip_{time.strftime('%Y%m%d_%H%M%S')}.json")
+            memory_monitor.close()
+        pipeline.log_stats()
         logger.info("Nettoyage des ressources...")
         video_stream.release()
-        face_detector.release()
-        hand_detector.release()
+        pipeline.release()
         alert_manager.release()
+        if feature_log is not None:
+            feature_log.close()
         cv2.destroyAllWindows()
         print("\nSafeWay ferme. Au revoir!")
 
+def main():
+    """Point d'entrée: démo par défaut, ou sous-commande"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="SafeWay - détection de fatigue et distraction")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("demo", help="Lancer la démo temps réel (par défaut)")
+    subparsers.add_parser("template", help="Créer le template data/dataset/dataset.yaml")
+    analyze_parser = subparsers.add_parser("analyze-log", help="Analyser un trajet enregistré (journal .swlog)")
+    analyze_parser.add_argument("log", type=str, help="Chemin du journal de caractéristiques")
+    daemon_parser = subparsers.add_parser("daemon", help="Lancer le démon d'inférence (modèles résidents)")
+    daemon_parser.add_argument("--socket", type=str, default=None, help="Chemin de la socket Unix")
+    args = parser.parse_args()
+    
+    if args.command == "template":
+        from train_yolo import create_dataset_template
+        create_dataset_template()
+    elif args.command == "analyze-log":
+        if not Path(args.log).exists():
+            logger.error(f"Journal introuvable: {args.log}")
+            sys.exit(1)
+        from ai.batch_analyzer import summarize_feature_log
+        summarize_feature_log(args.log)
+    elif args.command == "daemon":
+        from ai.inference_daemon import serve
+        if not (serve(Path(args.socket)) if args.socket else serve()):
+            sys.exit(1)
+    else:
+        run_demo()
+
 if __name__ == "__main__":
     main()
 